@@ -0,0 +1,105 @@
+# cartao_vacinacao_api/alteracoes.py
+# Feed de alterações para sincronização incremental (GET /changes).
+# Gatilhos do SQLite registram em `alteracoes` cada inclusão, atualização e exclusão em pessoas,
+# vacinas e vacinacoes, inclusive INSERTs em lote, exclusões em cascata e escritas feitas fora
+# da API. O seq é AUTOINCREMENT (crescente, nunca reutilizado) e, como o SQLite tem um único
+# escritor por vez, a ordem dos seq é a ordem dos commits.
+#
+# INSERT OR REPLACE na chave (tabela, registro_id) mantém só a alteração mais recente de cada
+# registro: o feed cresce com o número de registros, não de escritas, e um cliente atrasado recebe
+# cada registro uma única vez, já no estado atual. Por isso uma vacinação pode vir antes de uma
+# alteração posterior da sua pessoa; o cliente deve aplicar a sincronização inteira antes de
+# validar as referências.
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db, FORMATO_DATA_APLICACAO, Pessoa, Vacina, Vacinacao
+from queries import COLUNAS_PESSOA, COLUNAS_VACINA, COLUNAS_VACINACAO, alteracoes_query
+from serializers import CAMPOS_PESSOA, CAMPOS_VACINA, CAMPOS_VACINACAO
+
+# Tabelas acompanhadas, na ordem do preenchimento inicial (referenciadas antes das que referenciam),
+# com os campos de saída, as colunas e a chave primária de cada uma
+TABELAS = {
+    'vacinas': (CAMPOS_VACINA, COLUNAS_VACINA, Vacina.id),
+    'pessoas': (CAMPOS_PESSOA, COLUNAS_PESSOA, Pessoa.id),
+    'vacinacoes': (CAMPOS_VACINACAO, COLUNAS_VACINACAO, Vacinacao.id),
+}
+
+_REGISTRAR = "INSERT OR REPLACE INTO alteracoes(tabela, registro_id, operacao) VALUES ('{tabela}', {linha}.id, '{operacao}');"
+
+FEED_DDL = tuple(
+    f"""CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela}_{sufixo} AFTER {evento} ON {tabela} BEGIN
+        {_REGISTRAR.format(tabela=tabela, linha=linha, operacao=operacao)}
+    END"""
+    for tabela in TABELAS
+    for sufixo, evento, linha, operacao in (('ai', 'INSERT', 'new', 'upsert'),
+                                           ('au', 'UPDATE', 'new', 'upsert'),
+                                           ('ad', 'DELETE', 'old', 'delete'))
+)
+
+
+def criar_feed(commit=True):
+    """
+    Cria os gatilhos do feed de alterações, se ainda não existirem (só no SQLite).
+
+    Na primeira vez, os registros já existentes entram no feed como 'upsert', para que um
+    cliente que sincroniza do zero receba o banco inteiro. Com `commit=False`, fica na transação
+    de quem chamou (migrações). Retorna True se o feed foi criado agora.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    existia = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'alteracoes_vacinas_ai'")
+    ).first() is not None
+    if not existia:
+        for tabela in TABELAS:
+            db.session.execute(text(
+                f"INSERT OR IGNORE INTO alteracoes(tabela, registro_id, operacao) SELECT '{tabela}', id, 'upsert' FROM {tabela}"
+            ))
+    for ddl in FEED_DDL:
+        db.session.execute(text(ddl))
+    if commit:
+        db.session.commit()
+    return not existia
+
+
+def _dados(campos, linha):
+    dados = dict(zip(campos, linha))
+    if isinstance(dados.get('data_aplicacao'), datetime):
+        dados['data_aplicacao'] = dados['data_aplicacao'].strftime(FORMATO_DATA_APLICACAO)
+    return dados
+
+
+def pagina_alteracoes(since, limit):
+    """
+    Até `limit` alterações com seq > `since`: uma consulta ao feed e uma por tabela (IN) para o estado
+    atual dos registros incluídos ou alterados. Retorna (itens, seq do cursor seguinte, tem_mais).
+    """
+    linhas = alteracoes_query(since, limit + 1).all()
+    tem_mais = len(linhas) > limit
+    linhas = linhas[:limit]
+
+    pendentes = {}
+    for _, tabela, registro_id, operacao in linhas:
+        if operacao == 'upsert':
+            pendentes.setdefault(tabela, []).append(registro_id)
+    registros = {}
+    for tabela, ids in pendentes.items():
+        campos, colunas, chave = TABELAS[tabela]
+        registros[tabela] = {
+            linha.id: _dados(campos, linha)
+            for linha in db.session.query(*colunas).filter(chave.in_(ids))
+        }
+
+    itens = []
+    for _, tabela, registro_id, operacao in linhas:
+        item = {"tabela": tabela, "id": registro_id, "operacao": operacao}
+        if operacao == 'upsert':
+            dados = registros[tabela].get(registro_id)
+            if dados is None:
+                item["operacao"] = 'delete' # Excluído depois da leitura do feed (a marca virá com um seq maior)
+            else:
+                item["dados"] = dados
+        itens.append(item)
+    return itens, (linhas[-1].seq if linhas else since), tem_mais
@@ -1,29 +1,40 @@
 # cartao_vacinacao_api/app.py
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Blueprint, Response, current_app, request, jsonify, render_template, stream_with_context, url_for
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from config import Config
-from models import db, Vacina, Pessoa, Vacinacao, User # Importado User
+from models import db, Vacina, Pessoa, Vacinacao, User, DOSES_VALIDAS, FORMATO_DATA_APLICACAO # Importado User
 from schemas import ma, VacinaSchema, PessoaSchema, VacinacaoSchema, UserSchema # Importado UserSchema
+from pagination import encode_cursor, decode_cursor, parse_limit, parametros_pagina_pessoas, resposta_pagina_pessoas
+from serializers import CAMPOS_PESSOA, json_bytes, linhas_para_dicts, resposta_json
+from queries import cartao_query, vacinacao_existente_query, pessoa_query, pessoas_pagina_query, pessoas_busca_query
+from busca import expressao_busca
+from catalog import catalogo_vacinas, resposta_condicional
+from cartao import cartao_cache, corpo_cartoes, resposta_cartao, resposta_cartao_em_cache
+from bulk import registrar_vacinacoes_em_lote
+from export import gerar_csv_pessoa, gerar_csv_populacao
+from commands import register_commands
+from hashing import password_hasher, HashingIndisponivel
+from metrics import metricas, formatar_metrica
+import database
+import estatisticas
+from faltosos import SITUACOES, pagina_faltosos
+from alteracoes import pagina_alteracoes
+from async_api import leituras_async
+from assets import assets
+from compressao import compressao_respostas
+from logs import registro_logs
+from replica import roteamento_replica, somente_leitura, primario
 from datetime import datetime, timedelta
 import os
-import logging
+from werkzeug.utils import secure_filename
 from sqlalchemy.exc import IntegrityError # Para tratar erros de unicidade
 from marshmallow import ValidationError # Para tratar erros de validação de schema
 
-app = Flask(__name__)
-app.config.from_object(Config)
+# Todas as rotas ficam neste blueprint, registrado por create_app()
+api = Blueprint('api', __name__)
 
-# Configurar logging básico para erros
-if not app.debug:
-    file_handler = logging.FileHandler('error.log')
-    file_handler.setLevel(logging.WARNING)
-    app.logger.addHandler(file_handler)
-
-db.init_app(app)
-ma.init_app(app)
-
-# Inicializa JWTManager
-jwt = JWTManager(app)
+# Inicializa JWTManager (associado ao app em create_app)
+jwt = JWTManager()
 
 # Definir a sessão do SQLAlchemy para os schemas
 VacinaSchema.Meta.sqla_session = db.session
@@ -40,55 +51,44 @@ vacinacao_schema = VacinacaoSchema()
 vacinacoes_schema = VacinacaoSchema(many=True) # CORRIGIDO AQUI: De VacinacoesSchema para VacinacaoSchema
 user_schema = UserSchema() # Instancia o UserSchema
 
-# Cria as tabelas no banco de dados se elas não existirem e popula vacinas iniciais
-with app.app_context():
-    db.create_all()
-
-    initial_vacinas_data = [
-        {"nome": "BCG", "categoria": "Nacional"},
-        {"nome": "HEPATITE B", "categoria": "Nacional"},
-        {"nome": "ANTI-POLIO (SABIN)", "categoria": "Nacional"},
-        {"nome": "TETRA VALENTE", "categoria": "Nacional"},
-        {"nome": "TRIPLICE BACTERIANA (DPT)", "categoria": "Nacional"},
-        {"nome": "HAEMOPHILUS INFLUENZAE", "categoria": "Nacional"},
-        {"nome": "TRIPLICE ACELULAR", "categoria": "Nacional"},
-        {"nome": "PNEUMO 10 VALENTE", "categoria": "Nacional"},
-        {"nome": "MENINGO C", "categoria": "Nacional"},
-        {"nome": "ROTAVIRUS", "categoria": "Nacional"},
-        {"nome": "Anti Rábica Humana", "categoria": "Anti Rábica"},
-        {"nome": "BCG Contato", "categoria": "BCG de Contato"},
-        {"nome": "Gripe Quadrivalente", "categoria": "Vacinas Particulares"},
-        {"nome": "HPV Nonavalente", "categoria": "Vacinas Particulares"},
-        {"nome": "Meningocócica ACWY", "categoria": "Vacinas Particulares"},
-        {"nome": "Febre Amarela (Reforço)", "categoria": "Outra Vacina"},
-        {"nome": "Dengue Qdenga", "categoria": "Outra Vacina"},
-    ]
-
-    for vacina_info in initial_vacinas_data:
-        vacina_nome = vacina_info["nome"]
-        vacina_categoria = vacina_info["categoria"]
-        
-        existing_vacina = Vacina.query.filter_by(nome=vacina_nome).first()
-        if existing_vacina:
-            if existing_vacina.categoria != vacina_categoria:
-                existing_vacina.categoria = vacina_categoria
-                db.session.add(existing_vacina)
-                print(f"Vacina '{vacina_nome}' categoria atualizada para '{vacina_categoria}'.")
-        else:
-            new_vacina = Vacina(nome=vacina_nome, categoria=vacina_categoria)
-            db.session.add(new_vacina)
-            print(f"Vacina '{vacina_nome}' adicionada ao banco de dados com categoria '{vacina_categoria}'.")
-    db.session.commit()
-    print("Vacinas iniciais populadas ou atualizadas.")
+
+def create_app(config_overrides=None):
+    """
+    Cria e configura o app. Não toca no banco: as tabelas são criadas com `flask init-db`
+    e o catálogo inicial de vacinas com `flask seed-vacinas`.
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
+    if app.testing and 'LOG_ARQUIVO' not in (config_overrides or {}):
+        app.config['LOG_ARQUIVO'] = '' # Testes não gravam no error.log do projeto; para testar os logs, passe LOG_ARQUIVO
+
+    registro_logs.init_app(app) # Logs JSON gravados fora das threads de requisição e cabeçalho X-Request-ID
+    database.init_app(app) # db.init_app com as opções de pool e os PRAGMAs do SQLite
+    roteamento_replica.init_app(app) # Leituras na réplica, com DATABASE_REPLICA_URI
+    metricas.init_app(app) # Primeiro, para que o tempo medido inclua os before_request das demais extensões
+    ma.init_app(app)
+    jwt.init_app(app)
+    catalogo_vacinas.init_app(app)
+    password_hasher.init_app(app)
+    cartao_cache.init_app(app)
+    compressao_respostas.init_app(app)
+    assets.init_app(app) # Minifica e versiona static/ e registra /assets
+
+    app.register_blueprint(api)
+    leituras_async.init_app(app) # Registra o blueprint /async quando ASYNC_READS está ativo
+    register_commands(app)
+    return app
 
 # --- Manipulador de Erro Global (APRIMORADO) ---
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_server_error(e):
-    app.logger.exception("Ocorreu uma exceção não tratada durante uma requisição.")
+    current_app.logger.exception("Ocorreu uma exceção não tratada durante uma requisição.")
     return jsonify({"message": "Ocorreu um erro interno no servidor. Por favor, tente novamente mais tarde."}), 500
 
-@app.errorhandler(422) # Erros de validação do Marshmallow (Unprocessable Entity)
-@app.errorhandler(400) # Bad Request (JSON malformado, etc.)
+@api.app_errorhandler(422) # Erros de validação do Marshmallow (Unprocessable Entity)
+@api.app_errorhandler(400) # Bad Request (JSON malformado, etc.)
 def handle_validation_error(err):
     # Tenta extrair a mensagem de erro do Marshmallow ou JSON inválido
     if hasattr(err, 'messages') and isinstance(err.messages, dict):
@@ -106,11 +106,19 @@ def handle_validation_error(err):
     else:
         final_message = "Erro de validação ou requisição inválida. Verifique os campos."
 
-    app.logger.error(f"Erro de validação/requisição inválida: {final_message}")
+    # Aviso de alto volume sob rajadas de entradas inválidas: amostrado conforme LOG_AMOSTRAGEM
+    current_app.logger.warning("Erro de validação/requisição inválida: %s", final_message, extra={'classe': 'validacao'})
     return jsonify({"message": final_message}), 422
 
+@api.app_errorhandler(HashingIndisponivel)
+def handle_hashing_indisponivel(err):
+    current_app.logger.warning("Pool de hash de senhas saturado; requisição recusada com 503.", extra={'classe': 'hash_indisponivel'})
+    response = jsonify({"message": "Servidor ocupado. Tente novamente em instantes."})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # --- Rotas de Autenticação ---
-@app.route('/register', methods=['POST'])
+@api.route('/register', methods=['POST'])
 def register():
     username = request.json.get('username', None)
     password = request.json.get('password', None)
@@ -122,34 +130,43 @@ def register():
         return jsonify({"message": "Usuário já existe"}), 409 # Conflict
 
     new_user = User(username=username)
-    new_user.set_password(password) # Hash da senha
+    new_user.password_hash = password_hasher.gerar_hash(password) # Hash da senha (no pool dedicado)
     
     db.session.add(new_user)
     db.session.commit()
     
     return jsonify({"message": "Usuário registrado com sucesso"}), 201
 
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login():
     username = request.json.get('username', None)
     password = request.json.get('password', None)
 
     user = User.query.filter_by(username=username).first()
 
-    if user is None or not user.check_password(password):
+    if user is None or not password_hasher.verificar(user.password_hash, password):
         return jsonify({"message": "Username ou password inválidos"}), 401 # Unauthorized
 
+    # Atualiza de forma transparente hashes gerados com método/custo antigos
+    if password_hasher.precisa_rehash(user.password_hash):
+        user.password_hash = password_hasher.gerar_hash(password)
+        db.session.commit()
+
     access_token = create_access_token(identity=str(user.id)) # CONVERTIDO PARA STRING
     return jsonify(access_token=access_token), 200
 
 # --- Rotas da API ---
 
-@app.route('/')
+@api.route('/')
 def serve_index():
-    return render_template('index.html')
+    # Revalidado a cada carga (ETag), para que nomes novos de assets cheguem logo ao navegador
+    response = current_app.response_class(render_template('index.html'), mimetype='text/html')
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
 
 # Rotas de Vacinas
-@app.route('/vacinas', methods=['POST'])
+@api.route('/vacinas', methods=['POST'])
 @jwt_required() 
 def add_vacina():
     try:
@@ -166,29 +183,29 @@ def add_vacina():
         new_vacina = Vacina(nome=nome, categoria=categoria)
         db.session.add(new_vacina)
         db.session.commit()
+        catalogo_vacinas.invalidate()
         return vacina_schema.jsonify(new_vacina), 201
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Erro ao cadastrar vacina: {str(e)}")
+        current_app.logger.error("Erro ao cadastrar vacina: %s", e)
         return jsonify({"message": f"Erro ao cadastrar vacina: {str(e)}"}), 500
 
-@app.route('/vacinas', methods=['GET'])
+@api.route('/vacinas', methods=['GET'])
 def get_vacinas():
+    # Servido do catálogo em memória; responde 304 se o cliente já tem esta versão (If-None-Match)
     categoria = request.args.get('categoria')
-    if categoria:
-        all_vacinas = Vacina.query.filter_by(categoria=categoria).all()
-    else:
-        all_vacinas = Vacina.query.all()
-    return vacinas_schema.jsonify(all_vacinas), 200
+    body, etag = catalogo_vacinas.lista(categoria)
+    return resposta_condicional(body, etag)
 
-@app.route('/vacinas/<int:id>', methods=['GET'])
+@api.route('/vacinas/<int:id>', methods=['GET'])
 def get_vacina(id):
-    vacina = Vacina.query.get(id)
-    if not vacina:
+    cached = catalogo_vacinas.vacina(id)
+    if not cached:
         return jsonify({"message": "Vacina não encontrada."}), 404
-    return vacina_schema.jsonify(vacina), 200
+    body, etag = cached
+    return resposta_condicional(body, etag)
 
-@app.route('/vacinas/<int:id>', methods=['DELETE'])
+@api.route('/vacinas/<int:id>', methods=['DELETE'])
 @jwt_required() 
 def delete_vacina(id):
     vacina = Vacina.query.get(id)
@@ -196,17 +213,20 @@ def delete_vacina(id):
         return jsonify({"message": "Vacina não encontrada."}), 404
 
     try:
+        # Vacinações, contagens e esquema saem em cascata no banco (ON DELETE CASCADE), sem carregar nada no ORM
         db.session.delete(vacina)
         db.session.commit()
+        catalogo_vacinas.invalidate()
+        cartao_cache.invalidate_vacina(id)
         return jsonify({"message": "Vacina removida com sucesso."}), 200
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Erro ao remover vacina com ID {id}: {str(e)}")
+        current_app.logger.error("Erro ao remover vacina com ID %s: %s", id, e)
         return jsonify({"message": f"Erro ao remover vacina: {str(e)}"}), 500
 
 
 # Rotas de Pessoas
-@app.route('/pessoas', methods=['POST'])
+@api.route('/pessoas', methods=['POST'])
 @jwt_required() 
 def add_pessoa():
     try:
@@ -225,30 +245,55 @@ def add_pessoa():
         return pessoa_schema.jsonify(new_pessoa), 201
     except ValidationError as err: 
         db.session.rollback()
-        app.logger.error(f"Erro de validação Marshmallow ao cadastrar pessoa: {err.messages}")
+        current_app.logger.warning("Erro de validação Marshmallow ao cadastrar pessoa: %s", err.messages, extra={'classe': 'validacao'})
         return jsonify({"message": err.messages}), 422 # UNPROCESSABLE ENTITY
     except IntegrityError as e: 
         db.session.rollback()
-        app.logger.error(f"Erro de integridade ao cadastrar pessoa: {str(e)}")
+        current_app.logger.error("Erro de integridade ao cadastrar pessoa: %s", e)
         return jsonify({"message": "Não foi possível cadastrar a pessoa devido a um problema de dados (ex: identificação duplicada)."}), 409 # CONFLICT
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Erro inesperado ao cadastrar pessoa: {str(e)}")
+        current_app.logger.error("Erro inesperado ao cadastrar pessoa: %s", e)
         return jsonify({"message": f"Erro inesperado ao cadastrar pessoa: {str(e)}"}), 500
 
-@app.route('/pessoas', methods=['GET'])
+@api.route('/pessoas', methods=['GET'])
 def get_pessoas():
-    all_pessoas = Pessoa.query.all()
-    return pessoas_schema.jsonify(all_pessoas), 200
+    # Paginação por cursor (keyset sobre Pessoa.id): o custo de cada página não cresce com a tabela.
+    # O corpo continua sendo uma lista; o cursor da próxima página vai no cabeçalho X-Next-Cursor.
+    try:
+        limit, after, nome = parametros_pagina_pessoas()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # Busca um registro a mais para saber se existe próxima página
+    pessoas = pessoas_pagina_query(limit, after=after, nome=nome).all()
+    return resposta_pagina_pessoas(pessoas, limit, nome, 'api.get_pessoas'), 200
 
-@app.route('/pessoas/<int:id>', methods=['GET'])
+@api.route('/pessoas/search', methods=['GET'])
+def search_pessoas():
+    # Busca textual (FTS5) por nome ou identificação: por prefixo, sem diferenciar acentos, ordenada por relevância
+    try:
+        limit = parse_limit(request.args.get('limit'),
+                            current_app.config['BUSCA_PAGE_SIZE'],
+                            current_app.config['BUSCA_MAX_PAGE_SIZE'])
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    expressao = expressao_busca(request.args.get('q'))
+    if expressao is None:
+        return jsonify({"message": "Parâmetro 'q' é obrigatório."}), 400
+
+    pessoas = pessoas_busca_query(expressao, limit).all()
+    return resposta_json(json_bytes(linhas_para_dicts(CAMPOS_PESSOA, pessoas))), 200
+
+@api.route('/pessoas/<int:id>', methods=['GET'])
 def get_pessoa(id):
     pessoa = Pessoa.query.get(id)
     if not pessoa:
         return jsonify({"message": "Pessoa não encontrada."}), 404
     return pessoa_schema.jsonify(pessoa), 200
 
-@app.route('/pessoas/<int:id>', methods=['DELETE'])
+@api.route('/pessoas/<int:id>', methods=['DELETE'])
 @jwt_required() 
 def delete_pessoa(id):
     pessoa = Pessoa.query.get(id)
@@ -256,17 +301,20 @@ def delete_pessoa(id):
         return jsonify({"message": "Pessoa não encontrada."}), 404
 
     try:
+        # As vacinações saem em cascata no banco; as estatísticas são descontadas com uma consulta agrupada
+        estatisticas.descontar(Vacinacao.pessoa_id == id)
         db.session.delete(pessoa)
         db.session.commit()
+        cartao_cache.invalidate_pessoa(id)
         return jsonify({"message": "Pessoa e seu cartão de vacinação removidos com sucesso."}), 200
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Erro ao remover pessoa com ID {id}: {str(e)}")
+        current_app.logger.error("Erro ao remover pessoa com ID %s: %s", id, e)
         return jsonify({"message": f"Erro ao remover pessoa: {str(e)}"}), 500
 
 
 # Rotas para Vacinações
-@app.route('/vacinacoes', methods=['POST'])
+@api.route('/vacinacoes', methods=['POST'])
 @jwt_required() 
 def add_vacinacao():
     try:
@@ -289,23 +337,18 @@ def add_vacinacao():
             return jsonify({"message": "Vacina não encontrada."}), 404
 
         # Validação da dose (exemplo básico, pode ser mais complexo)
-        doses_validas = ["1a Dose", "2a Dose", "3a Dose", "Reforco", "Dose Unica", "BCG", "Faltoso", "4a Dose", "5a Dose", "1a Reforco", "2a Reforco"]
-        if dose_aplicada not in doses_validas:
-             return jsonify({"message": f"Dose '{dose_aplicada}' inválida. Doses válidas: {', '.join(doses_validas)}"}), 400
+        if dose_aplicada not in DOSES_VALIDAS:
+             return jsonify({"message": f"Dose '{dose_aplicada}' inválida. Doses válidas: {', '.join(DOSES_VALIDAS)}"}), 400
 
         # Verifica se já existe uma vacinação com a mesma pessoa, vacina e dose
-        existing_vacinacao = Vacinacao.query.filter_by(
-            pessoa_id=pessoa_id,
-            vacina_id=vacina_id,
-            dose_aplicada=dose_aplicada
-        ).first()
+        existing_vacinacao = vacinacao_existente_query(pessoa_id, vacina_id, dose_aplicada).first()
 
         if existing_vacinacao:
             return jsonify({"message": f"Essa dose ('{dose_aplicada}') da vacina '{vacina.nome}' já foi registrada para esta pessoa."}), 409
 
         if data_aplicacao_str:
             try:
-                data_aplicacao = datetime.strptime(data_aplicacao_str, '%Y-%m-%dT%H:%M:%S')
+                data_aplicacao = datetime.strptime(data_aplicacao_str, FORMATO_DATA_APLICACAO)
             except ValueError:
                 return jsonify({"message": "Formato de data inválido. Use%Y-%m-%dT%H:%M:%S"}), 400
         else:
@@ -318,56 +361,234 @@ def add_vacinacao():
             dose_aplicada=dose_aplicada
         )
         db.session.add(new_vacinacao)
+        estatisticas.ajustar(estatisticas.contagens([new_vacinacao]))
         db.session.commit()
+        cartao_cache.invalidate_pessoa(pessoa_id)
         return vacinacao_schema.jsonify(new_vacinacao), 201
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Erro ao cadastrar vacinação: {str(e)}")
+        current_app.logger.error("Erro ao cadastrar vacinação: %s", e)
         return jsonify({"message": f"Erro ao cadastrar vacinação: {str(e)}"}), 500
 
-@app.route('/pessoas/<int:pessoa_id>/cartao_vacinacao', methods=['GET'])
+@api.route('/vacinacoes/bulk', methods=['POST'])
+@jwt_required() 
+def add_vacinacoes_bulk():
+    data = request.get_json()
+    if not isinstance(data, list) or not data:
+        return jsonify({"message": "Dados inválidos: envie uma lista de vacinações."}), 400
+
+    max_registros = current_app.config['BULK_MAX_REGISTROS']
+    if len(data) > max_registros:
+        return jsonify({"message": f"Lote muito grande: máximo de {max_registros} vacinações por requisição."}), 413
+
+    try:
+        resultados = registrar_vacinacoes_em_lote(data, current_app.config['BULK_BATCH_SIZE'])
+        db.session.commit()
+        cartao_cache.invalidate_pessoas({data[r["indice"]]["pessoa_id"] for r in resultados if r["status"] == 201})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Erro ao cadastrar vacinações em lote: %s", e)
+        return jsonify({"message": f"Erro ao cadastrar vacinações em lote: {str(e)}"}), 500
+
+    inseridos = sum(1 for resultado in resultados if resultado["status"] == 201)
+    return jsonify({
+        "inseridos": inseridos,
+        "rejeitados": len(resultados) - inseridos,
+        "resultados": resultados
+    }), 200
+
+@api.route('/pessoas/<int:pessoa_id>/cartao_vacinacao', methods=['GET'])
 @jwt_required() 
 def get_cartao_vacinacao(pessoa_id):
     current_user_id = get_jwt_identity() 
-    
+
+    cartao_cache.sincronizar()
+    response = resposta_cartao_em_cache(pessoa_id)
+    if response is not None:
+        return response
+
+    versao_cache = cartao_cache.versao
+    with primario(cartao_cache.ativo): # O cartão vai para o cache: não pode vir de uma réplica atrasada
+        pessoa = pessoa_query(pessoa_id).first()
+        if not pessoa:
+            return jsonify({"message": "Pessoa não encontrada."}), 404
+        vacinacoes = cartao_query(pessoa_id).all()
+
+    return resposta_cartao(pessoa_id, pessoa, vacinacoes, versao_cache)
+
+@api.route('/cartoes/batch', methods=['POST'])
+@jwt_required() 
+@somente_leitura
+def get_cartoes_batch():
+    # Cartões de várias pessoas (uma turma, uma família) numa só requisição, com consultas em lote
+    data = request.get_json(silent=True)
+    pessoa_ids = data.get('pessoa_ids') if isinstance(data, dict) else None
+    if not isinstance(pessoa_ids, list) or not pessoa_ids \
+            or not all(isinstance(pessoa_id, int) and not isinstance(pessoa_id, bool) for pessoa_id in pessoa_ids):
+        return jsonify({"message": "Dados inválidos: envie 'pessoa_ids' como uma lista de ids."}), 400
+
+    pessoa_ids = list(dict.fromkeys(pessoa_ids)) # Remove repetidos, mantendo a ordem
+    max_pessoas = current_app.config['CARTOES_BATCH_MAX']
+    if len(pessoa_ids) > max_pessoas:
+        return jsonify({"message": f"Lote muito grande: máximo de {max_pessoas} pessoas por requisição."}), 413
+
+    return resposta_json(corpo_cartoes(pessoa_ids)), 200
+
+@api.route('/cartoes/cache', methods=['GET'])
+@jwt_required() 
+def get_cartao_cache_stats():
+    return jsonify(cartao_cache.stats()), 200
+
+# Cobertura vacinal a partir da tabela pré-agregada (custo proporcional ao número de grupos)
+@api.route('/estatisticas', methods=['GET'])
+@jwt_required() 
+def get_estatisticas():
+    agrupar = list(dict.fromkeys(
+        dimensao.strip() for dimensao in request.args.get('agrupar', 'vacina').split(',') if dimensao.strip()
+    ))
+    invalidas = [dimensao for dimensao in agrupar if dimensao not in estatisticas.DIMENSOES]
+    if invalidas:
+        return jsonify({"message": f"Agrupamento inválido: {', '.join(invalidas)}. Use: {', '.join(estatisticas.DIMENSOES)}"}), 400
+
+    vacina_id = request.args.get('vacina_id')
+    if vacina_id is not None:
+        if not vacina_id.isdigit():
+            return jsonify({"message": "Parâmetro 'vacina_id' deve ser um número inteiro."}), 400
+        vacina_id = int(vacina_id)
+    de, ate = request.args.get('de'), request.args.get('ate')
+    for mes in (de, ate):
+        if mes and not estatisticas.FORMATO_MES.match(mes):
+            return jsonify({"message": "Parâmetros 'de' e 'ate' devem estar no formato AAAA-MM."}), 400
+
+    dose_aplicada = request.args.get('dose_aplicada')
+    if dose_aplicada and dose_aplicada not in DOSES_VALIDAS:
+        return jsonify({"message": f"Dose '{dose_aplicada}' inválida. Doses válidas: {', '.join(DOSES_VALIDAS)}"}), 400
+
+    grupos = estatisticas.consultar(agrupar, vacina_id=vacina_id, categoria=request.args.get('categoria'),
+                                    dose_aplicada=dose_aplicada, de=de, ate=ate)
+    return jsonify({
+        "agrupar": agrupar,
+        "total": sum(grupo["total"] for grupo in grupos),
+        "grupos": grupos
+    }), 200
+
+# Doses pendentes e atrasadas de toda a população, pelo esquema vacinal de cada vacina (paginado por pessoa)
+@api.route('/relatorios/faltosos', methods=['GET'])
+@jwt_required() 
+def get_relatorio_faltosos():
+    try:
+        limit = parse_limit(request.args.get('limit'),
+                            current_app.config['FALTOSOS_PAGE_SIZE'],
+                            current_app.config['FALTOSOS_MAX_PAGE_SIZE'])
+        after = decode_cursor(request.args.get('after'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    hoje = request.args.get('hoje')
+    if hoje:
+        try:
+            hoje = datetime.strptime(hoje, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({"message": "Parâmetro 'hoje' deve estar no formato AAAA-MM-DD."}), 400
+
+    vacina_id = request.args.get('vacina_id')
+    if vacina_id is not None:
+        if not vacina_id.isdigit():
+            return jsonify({"message": "Parâmetro 'vacina_id' deve ser um número inteiro."}), 400
+        vacina_id = int(vacina_id)
+    situacao = request.args.get('situacao')
+    if situacao and situacao not in SITUACOES:
+        return jsonify({"message": f"Situação '{situacao}' inválida. Use: {', '.join(SITUACOES)}"}), 400
+
+    pendencias, proxima = pagina_faltosos(
+        limit, hoje=hoje, tolerancia=current_app.config['FALTOSOS_TOLERANCIA_DIAS'], vacina_id=vacina_id,
+        situacao=situacao, apos=after, lote=current_app.config['FALTOSOS_LOTE'],
+        max_linhas=current_app.config['FALTOSOS_MAX_LINHAS']
+    )
+    # Nomes das pessoas da página numa consulta; os das vacinas vêm do catálogo em memória
+    nomes = dict(db.session.execute(
+        db.select(Pessoa.id, Pessoa.nome).where(Pessoa.id.in_({p["pessoa_id"] for p in pendencias}))
+    ).all()) if pendencias else {}
+    vacinas = {vacina["id"]: vacina["nome"] for vacina in catalogo_vacinas.vacinas()}
+    for pendencia in pendencias:
+        pendencia["nome"] = nomes.get(pendencia["pessoa_id"])
+        pendencia["nome_vacina"] = vacinas.get(pendencia["vacina_id"])
+
+    response = resposta_json(json_bytes(pendencias))
+    if proxima is not None:
+        next_cursor = encode_cursor(proxima)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = '<{}>; rel="next"'.format(url_for(
+            'api.get_relatorio_faltosos', limit=limit, after=next_cursor, vacina_id=vacina_id,
+            situacao=situacao, hoje=request.args.get('hoje') or None
+        ))
+    return response, 200
+
+# Feed de alterações para sincronização incremental: o que mudou em pessoas, vacinas e vacinações desde o cursor
+@api.route('/changes', methods=['GET'])
+@jwt_required()
+def get_changes():
+    try:
+        limit = parse_limit(request.args.get('limit'),
+                            current_app.config['ALTERACOES_PAGE_SIZE'],
+                            current_app.config['ALTERACOES_MAX_PAGE_SIZE'])
+        since = decode_cursor(request.args.get('since')) or 0
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    alteracoes, ultimo_seq, tem_mais = pagina_alteracoes(since, limit)
+    # O cursor sempre volta, mesmo sem alterações: é o ponto de partida da próxima sincronização
+    cursor = encode_cursor(ultimo_seq)
+    response = resposta_json(json_bytes({"alteracoes": alteracoes, "cursor": cursor, "tem_mais": tem_mais}))
+    if tem_mais:
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = '<{}>; rel="next"'.format(url_for('api.get_changes', limit=limit, since=cursor))
+    return response, 200
+
+# Métricas no formato texto do Prometheus (por processo)
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    linhas = metricas.exposicao()
+    cache = cartao_cache.stats()
+    linhas += formatar_metrica('cartao_cache_hits_total', 'counter', 'Acertos do cache de cartões.', cache['hits'])
+    linhas += formatar_metrica('cartao_cache_misses_total', 'counter', 'Faltas do cache de cartões.', cache['misses'])
+    linhas += formatar_metrica('cartao_cache_entries', 'gauge', 'Cartões em cache.', cache['tamanho'])
+    descartados = registro_logs.descartados()
+    linhas += formatar_metrica('logs_descartados_amostragem_total', 'counter', 'Registros de log descartados pela amostragem.', descartados['amostragem'])
+    replica = roteamento_replica.situacao()
+    if replica is not None:
+        linhas += formatar_metrica('replica_disponivel', 'gauge', 'Réplica de leitura em uso (1) ou fora (0).', int(replica['disponivel']))
+        linhas += formatar_metrica('replica_atraso_alteracoes', 'gauge', 'Alterações do feed ainda não aplicadas na réplica (-1 = inacessível).',
+                                   -1 if replica['atraso'] is None else replica['atraso'])
+    linhas += formatar_metrica('logs_descartados_fila_cheia_total', 'counter', 'Registros de log descartados com a fila cheia.', descartados['fila_cheia'])
+    return Response('\n'.join(linhas) + '\n', mimetype='text/plain; version=0.0.4')
+
+# Exportação CSV (streaming) dos cartões de vacinação
+@api.route('/pessoas/<int:pessoa_id>/cartao_vacinacao.csv', methods=['GET'])
+@jwt_required() 
+def export_cartao_vacinacao_csv(pessoa_id):
     pessoa = Pessoa.query.get(pessoa_id)
     if not pessoa:
         return jsonify({"message": "Pessoa não encontrada."}), 404
 
-    vacinacoes = db.session.query(Vacinacao, Vacina.nome, Vacina.id.label('vacina_db_id'), Vacina.categoria)\
-                           .join(Vacina)\
-                           .filter(Vacinacao.pessoa_id == pessoa_id)\
-                           .order_by(Vacinacao.data_aplicacao.asc())\
-                           .all()
-
-    cartao_vacinacao_data = {
-        "pessoa": pessoa_schema.dump(pessoa),
-        "vacinas_registradas": []
-    }
-
-    vacinas_agrupadas = {}
-    for vacinacao_obj, vacina_nome, vacina_db_id, vacina_categoria in vacinacoes:
-        if vacina_nome not in vacinas_agrupadas:
-            vacinas_agrupadas[vacina_nome] = {
-                "id_vacina": vacina_db_id,
-                "nome_vacina": vacina_nome,
-                "categoria_vacina": vacina_categoria,
-                "doses": []
-            }
-        vacinas_agrupadas[vacina_nome]["doses"].append({
-            "id_vacinacao": vacinacao_obj.id,
-            "data_aplicacao": vacinacao_obj.data_aplicacao.isoformat(),
-            "dose_aplicada": vacinacao_obj.dose_aplicada
-        })
-
-    for vacina_nome, data in vacinas_agrupadas.items():
-        cartao_vacinacao_data["vacinas_registradas"].append(data)
-
-
-    return jsonify(cartao_vacinacao_data), 200
+    vacinas = catalogo_vacinas.vacinas(request.args.get('categoria'))
+    return csv_response(gerar_csv_pessoa(pessoa, vacinas),
+                        f"cartao_vacinacao_{pessoa.nome.replace(' ', '_')}_{pessoa.id}.csv")
+
+@api.route('/vacinacoes/export.csv', methods=['GET'])
+@jwt_required() 
+def export_vacinacoes_csv():
+    vacinas = catalogo_vacinas.vacinas(request.args.get('categoria'))
+    return csv_response(gerar_csv_populacao(vacinas), "cartoes_vacinacao.csv")
+
+def csv_response(gerador, filename):
+    # stream_with_context mantém o contexto (e a sessão do banco) vivo enquanto o gerador é consumido
+    response = Response(stream_with_context(gerador), mimetype='text/csv')
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename="{secure_filename(filename)}"'
+    return response
 
 # Excluir registro de vacinação específico
-@app.route('/vacinacoes/<int:id>', methods=['DELETE'])
+@api.route('/vacinacoes/<int:id>', methods=['DELETE'])
 @jwt_required() 
 def delete_vacinacao(id):
     vacinacao = Vacinacao.query.get(id)
@@ -375,56 +596,46 @@ def delete_vacinacao(id):
         return jsonify({"message": "Registro de vacinação não encontrado."}), 404
 
     try:
+        pessoa_id = vacinacao.pessoa_id
+        estatisticas.ajustar(estatisticas.contagens([vacinacao], -1))
         db.session.delete(vacinacao)
         db.session.commit()
+        cartao_cache.invalidate_pessoa(pessoa_id)
         return jsonify({"message": "Registro de vacinação removido com sucesso."}), 200
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Erro no backend ao remover vacinação com ID {id}: {str(e)}")
+        current_app.logger.error("Erro no backend ao remover vacinação com ID %s: %s", id, e)
         return jsonify({"message": "Falha ao remover o registro de vacinação. Tente novamente."}), 500
 
+# Excluir em lote as vacinações de uma pessoa, de uma vacina ou de uma pessoa numa vacina (uma única instrução DELETE)
+@api.route('/vacinacoes', methods=['DELETE'])
+@jwt_required() 
+def delete_vacinacoes():
+    filtros = {}
+    for campo in ('pessoa_id', 'vacina_id'):
+        valor = request.args.get(campo)
+        if valor is not None:
+            if not valor.isdigit():
+                return jsonify({"message": f"Parâmetro '{campo}' deve ser um número inteiro."}), 400
+            filtros[campo] = int(valor)
+    if not filtros:
+        return jsonify({"message": "Informe pessoa_id, vacina_id ou ambos."}), 400
+
+    criterios = [getattr(Vacinacao, campo) == valor for campo, valor in filtros.items()]
+    try:
+        estatisticas.descontar(*criterios)
+        removidas = db.session.execute(db.delete(Vacinacao).where(*criterios)).rowcount
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Erro ao remover vacinações em lote (%s): %s", filtros, e)
+        return jsonify({"message": "Falha ao remover as vacinações. Tente novamente."}), 500
+
+    if 'pessoa_id' in filtros:
+        cartao_cache.invalidate_pessoa(filtros['pessoa_id'])
+    else:
+        cartao_cache.invalidate_vacina(filtros['vacina_id'])
+    return jsonify({"message": f"{removidas} registro(s) de vacinação removido(s).", "removidas": removidas}), 200
+
 if __name__ == '__main__':
-    app.run(debug=True)
-
-from flask_marshmallow import Marshmallow
-from models import Vacina, Pessoa, Vacinacao, User # NOVA IMPORTAÇÃO: User
-from datetime import datetime
-from marshmallow import fields # Importado para usar fields.DateTime e outros tipos de campo
-
-ma = Marshmallow()
-
-class VacinaSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = Vacina
-        load_instance = True
-        sqla_session = None # Será definido no app.py
-
-class PessoaSchema(ma.SQLAlchemyAutoSchema):
-    # NOVO: Define os campos explicitamente e marca como obrigatórios
-    id = fields.Int(dump_only=True) # ID apenas para saída
-    nome = fields.Str(required=True) # Campo nome é obrigatório
-    numero_identificacao = fields.Str(required=True) # Campo numero_identificacao é obrigatório
-
-    class Meta:
-        model = Pessoa
-        load_instance = True
-        sqla_session = None # Será definido no app.py
-        # Não precisa de 'fields' aqui se já definiu acima, mas se usar, deve ser uma tupla:
-        # fields = ("id", "nome", "numero_identificacao") 
-
-class VacinacaoSchema(ma.SQLAlchemyAutoSchema):
-    data_aplicacao = fields.DateTime(format='%Y-%m-%dT%H:%M:%S')
-
-    class Meta:
-        model = Vacinacao
-        load_instance = True
-        sqla_session = None
-
-# Esquema para o modelo de Usuário
-class UserSchema(ma.SQLAlchemyAutoSchema):
-    class Meta:
-        model = User
-        load_instance = True
-        sqla_session = None
-        load_only = ("password",) 
-        dump_only = ("id", "username",) 
+    create_app().run(debug=True)
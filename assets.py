@@ -0,0 +1,122 @@
+# cartao_vacinacao_api/assets.py
+# Arquivos estáticos sem etapa de build: na criação do app, cada .js e .css de static/ é minificado,
+# ganha um nome com o hash do conteúdo (script.3f2a9c1d0b4e.js) e tem as versões gzip (e brotli,
+# se o pacote estiver instalado) geradas uma única vez e guardadas em memória.
+# Os nomes com hash são servidos em /assets/<nome> com Cache-Control immutable: conteúdo novo
+# ganha outro nome, então o navegador nunca precisa revalidar. O index.html referencia os arquivos
+# por asset_url('script.js'); /static/<nome> continua servindo os originais.
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Blueprint, abort, current_app, request, url_for
+
+from compressao import codificacao_aceita, codificacoes_disponiveis, comprimir
+
+assets_bp = Blueprint('assets', __name__)
+
+# Níveis de compressão dos arquivos estáticos: feita uma vez por processo, pode ser a máxima
+NIVEIS_ESTATICOS = {'gzip': 9, 'br': 11}
+
+_COMENTARIO_CSS = re.compile(r'/\*.*?\*/', re.S)
+_ESPACOS = re.compile(r'\s+')
+_ESPACO_CSS = re.compile(r' ?([{};,>]) ?')
+
+
+def minificar_css(texto):
+    """Remove comentários e espaços dispensáveis (em volta de { } ; , > e depois de :)."""
+    texto = _ESPACOS.sub(' ', _COMENTARIO_CSS.sub('', texto))
+    texto = _ESPACO_CSS.sub(r'\1', texto).replace(': ', ':').replace(';}', '}')
+    return texto.strip() + '\n'
+
+
+def _console_log(linha):
+    # Só chamadas completas numa linha, sem outra instrução depois (nenhum ';' antes do final)
+    return linha.startswith('console.log(') and linha.rstrip(';').endswith(')') and ';' not in linha.rstrip(';')
+
+
+def minificar_js(texto):
+    """
+    Minificação conservadora, linha a linha: tira a indentação, as linhas vazias, os comentários de
+    linha inteira e as chamadas console.log. As quebras de linha ficam (inserção automática de ';').
+    """
+    linhas = (linha.strip() for linha in texto.splitlines())
+    return '\n'.join(linha for linha in linhas if linha and not linha.startswith('//') and not _console_log(linha)) + '\n'
+
+
+MINIFICADORES = {'.js': minificar_js, '.css': minificar_css}
+
+
+class Asset:
+    __slots__ = ('nome', 'mimetype', 'etag', 'variantes')
+
+    def __init__(self, nome, mimetype, etag, variantes):
+        self.nome = nome # Nome com o hash do conteúdo
+        self.mimetype = mimetype
+        self.etag = etag
+        self.variantes = variantes # codificação (None = sem compressão) -> bytes
+
+
+def montar_asset(caminho, minificar=True):
+    """Asset de um arquivo de static/: minificado, com nome versionado e as variantes comprimidas menores que o original."""
+    raiz, extensao = os.path.splitext(os.path.basename(caminho))
+    with open(caminho, encoding='utf-8') as arquivo:
+        texto = arquivo.read()
+    if minificar:
+        texto = MINIFICADORES[extensao](texto)
+    corpo = texto.encode('utf-8')
+    etag = hashlib.sha256(corpo).hexdigest()[:12]
+    variantes = {None: corpo}
+    for codificacao in codificacoes_disponiveis():
+        comprimido = comprimir(corpo, codificacao, NIVEIS_ESTATICOS[codificacao])
+        if len(comprimido) < len(corpo):
+            variantes[codificacao] = comprimido
+    return Asset(f"{raiz}.{etag}{extensao}", mimetypes.guess_type(caminho)[0], etag, variantes)
+
+
+class Assets:
+    """Monta os assets de app.static_folder em init_app (por app, em app.extensions) e registra /assets e asset_url."""
+
+    def init_app(self, app):
+        por_original, por_nome = {}, {}
+        for nome in sorted(os.listdir(app.static_folder)):
+            if os.path.splitext(nome)[1] in MINIFICADORES:
+                asset = montar_asset(os.path.join(app.static_folder, nome), app.config['ASSETS_MINIFICAR'])
+                por_original[nome] = por_nome[asset.nome] = asset
+        app.extensions['assets'] = (por_original, por_nome)
+        app.add_template_global(asset_url)
+        app.register_blueprint(assets_bp)
+
+
+def asset_url(nome):
+    """URL versionada de um arquivo de static/ (o original em /static se ele não passou pelo pipeline)."""
+    asset = current_app.extensions['assets'][0].get(nome)
+    if asset is None:
+        return url_for('static', filename=nome)
+    return url_for('assets.get_asset', nome=asset.nome)
+
+
+@assets_bp.route('/assets/<nome>', methods=['GET'])
+def get_asset(nome):
+    asset = current_app.extensions['assets'][1].get(nome)
+    if asset is None:
+        abort(404)
+    codificacao = codificacao_aceita([codificacao for codificacao in asset.variantes if codificacao])
+    etag = f"{asset.etag}-{codificacao}" if codificacao else asset.etag
+    # O If-None-Match pode chegar sem o sufixo da codificação (compressao.py o retira antes das rotas)
+    if request.if_none_match.contains(etag) or request.if_none_match.contains(asset.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(asset.variantes[codificacao], mimetype=asset.mimetype)
+        if codificacao:
+            response.headers['Content-Encoding'] = codificacao
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['ASSETS_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
+
+
+assets = Assets()
@@ -0,0 +1,117 @@
+# cartao_vacinacao_api/async_api.py
+# Caminho de leitura assíncrono (opcional): versões async de GET /pessoas, GET /vacinas e do
+# cartão de vacinação, em /async/..., sobre o engine asyncio do SQLAlchemy com o driver aiosqlite.
+# Usam as mesmas consultas (queries.py), a mesma montagem de resposta, o mesmo cache de cartões
+# e os mesmos tratadores de erro das rotas síncronas. Ativado por ASYNC_READS=1.
+#
+# O Flask (WSGI) executa cada view async num event loop próprio, dentro da thread da requisição:
+# por isso o engine usa NullPool (conexões não podem ser compartilhadas entre loops). Ganho real de
+# concorrência exige servir essas rotas por um servidor ASGI; compare com benchmarks.bench_async.
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from cartao import cartao_cache, resposta_cartao, resposta_cartao_em_cache
+from catalog import catalogo_vacinas, resposta_condicional
+from database import registrar_pragmas
+from metrics import metricas
+from pagination import parametros_pagina_pessoas, resposta_pagina_pessoas
+from queries import cartao_query, pessoa_query, pessoas_pagina_query
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:
+    create_async_engine = None
+
+# Só verificadas, não importadas: aiosqlite é carregado pelo dialeto sqlite+aiosqlite e asgiref pelo
+# Flask ao executar views async (flask[async])
+DEPENDENCIAS_ASYNC = create_async_engine is not None and all(
+    importlib.util.find_spec(modulo) is not None for modulo in ('aiosqlite', 'asgiref'))
+
+api_async = Blueprint('api_async', __name__, url_prefix='/async')
+
+# Driver assíncrono correspondente a cada driver síncrono
+DRIVERS_ASYNC = {'sqlite': 'sqlite+aiosqlite', 'sqlite+pysqlite': 'sqlite+aiosqlite'}
+
+
+def uri_async(uri):
+    """URI do engine assíncrono equivalente a SQLALCHEMY_DATABASE_URI."""
+    url = make_url(uri)
+    if url.drivername not in DRIVERS_ASYNC:
+        raise ValueError(f"Sem driver assíncrono conhecido para '{url.drivername}'; defina ASYNC_DATABASE_URI.")
+    return url.set(drivername=DRIVERS_ASYNC[url.drivername]).render_as_string(hide_password=False)
+
+
+class LeiturasAsync:
+
+    def init_app(self, app):
+        if not app.config['ASYNC_READS']:
+            return
+        if not DEPENDENCIAS_ASYNC:
+            raise RuntimeError("ASYNC_READS exige aiosqlite e flask[async] (pip install aiosqlite 'flask[async]').")
+
+        uri = app.config['ASYNC_DATABASE_URI'] or uri_async(app.config['SQLALCHEMY_DATABASE_URI'])
+        engine = create_async_engine(uri, poolclass=NullPool)
+        registrar_pragmas(engine.sync_engine, app.config)
+        metricas.instrumentar_engine(engine.sync_engine)
+        # A primeira conexão inicializa o dialeto sob um lock asyncio, preso ao loop de quem o criou;
+        # feita aqui, requisições concorrentes (cada uma com seu loop) nunca disputam esse lock
+        asyncio.run(self._primeira_conexao(engine))
+
+        app.extensions['leituras_async'] = async_sessionmaker(engine, expire_on_commit=False)
+        app.register_blueprint(api_async)
+
+    @staticmethod
+    async def _primeira_conexao(engine):
+        async with engine.connect():
+            pass
+
+    @asynccontextmanager
+    async def sessao(self):
+        async with current_app.extensions['leituras_async']() as sessao:
+            yield sessao
+
+
+leituras_async = LeiturasAsync()
+
+
+@api_async.route('/pessoas', methods=['GET'])
+async def get_pessoas():
+    try:
+        limit, after, nome = parametros_pagina_pessoas()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    async with leituras_async.sessao() as sessao:
+        pessoas = (await sessao.execute(pessoas_pagina_query(limit, after=after, nome=nome).statement)).all()
+    return resposta_pagina_pessoas(pessoas, limit, nome, 'api_async.get_pessoas'), 200
+
+
+@api_async.route('/vacinas', methods=['GET'])
+async def get_vacinas():
+    async with leituras_async.sessao() as sessao:
+        body, etag = await catalogo_vacinas.lista_async(sessao, request.args.get('categoria'))
+    return resposta_condicional(body, etag)
+
+
+@api_async.route('/pessoas/<int:pessoa_id>/cartao_vacinacao', methods=['GET'])
+@jwt_required()
+async def get_cartao_vacinacao(pessoa_id):
+    async with leituras_async.sessao() as sessao:
+        await cartao_cache.sincronizar_async(sessao)
+        response = resposta_cartao_em_cache(pessoa_id)
+        if response is not None:
+            return response
+
+        versao_cache = cartao_cache.versao
+        pessoa = (await sessao.execute(pessoa_query(pessoa_id).statement)).first()
+        if not pessoa:
+            return jsonify({"message": "Pessoa não encontrada."}), 404
+        vacinacoes = (await sessao.execute(cartao_query(pessoa_id).statement)).all()
+
+    return resposta_cartao(pessoa_id, pessoa, vacinacoes, versao_cache)
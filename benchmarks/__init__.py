@@ -0,0 +1,9 @@
+# cartao_vacinacao_api/benchmarks
+# Scripts de medição de desempenho. Execute a partir da raiz do projeto, ex.:
+#   python -m benchmarks.dados --pessoas 10000 --banco sqlite:///bench.db   (dados sintéticos)
+#   python -m benchmarks.bench_endpoints --saida base.json                 (micro-benchmarks)
+#   python -m benchmarks.carga --concorrencia 8 --duracao 30               (carga concorrente)
+#   python -m benchmarks.bench_sqlite                                     (SQLite padrão x ajustado)
+#   python -m benchmarks.bench_async                                      (leituras sync x async)
+#   python -m benchmarks.bench_doses                                      (tamanho: dose em texto x dose_id)
+#   python -m benchmarks.bench_serializacao
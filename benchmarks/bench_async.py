@@ -0,0 +1,96 @@
+# cartao_vacinacao_api/benchmarks/bench_async.py
+# Vazão com requisições concorrentes nas rotas de leitura síncronas x assíncronas (/async/...),
+# por HTTP num servidor werkzeug com threads, sobre o mesmo banco gerado por benchmarks.dados.
+# O cache de cartões fica desativado para que toda leitura do cartão vá ao banco.
+#   python -m benchmarks.bench_async --concorrencia 16 --duracao 10
+import argparse
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from benchmarks import resultados
+from benchmarks.carga import Cliente, autenticar
+from benchmarks.dados import criar_app_benchmark
+
+# Caminhos medidos (o prefixo /async é acrescentado no modo assíncrono)
+ROTAS = {
+    "cartao_vacinacao": lambda rng, ids: f'/pessoas/{rng.choice(ids)}/cartao_vacinacao',
+    "pessoas": lambda rng, ids: '/pessoas?limit=50',
+    "vacinas": lambda rng, ids: '/vacinas',
+}
+
+
+def medir(url, token, prefixo, rota, pessoa_ids, concorrencia, duracao, semente):
+    fim = time.monotonic() + duracao
+    amostras = []
+    lock = threading.Lock()
+
+    def trabalhador(indice):
+        rng = random.Random(semente + indice)
+        cliente = Cliente(url, token)
+        medidas = []
+        while time.monotonic() < fim:
+            caminho = prefixo + ROTAS[rota](rng, pessoa_ids)
+            inicio = time.perf_counter()
+            status, _, _ = cliente.requisitar('GET', caminho)
+            medidas.append((time.perf_counter() - inicio, status))
+        cliente.fechar()
+        with lock:
+            amostras.extend(medidas)
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(concorrencia)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    resumo = resultados.estatisticas([latencia for latencia, _ in amostras], time.perf_counter() - inicio)
+    resumo["erros"] = sum(1 for _, status in amostras if status >= 400)
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotas de leitura síncronas x assíncronas sob concorrência.")
+    parser.add_argument('--pessoas', type=int, default=5000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--duracao', type=float, default=10, help="Segundos por rota e modo")
+    parser.add_argument('--saida', default='bench_async.json')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = 'sqlite:///' + os.path.join(diretorio, 'async.db')
+        app, pessoa_ids = criar_app_benchmark(banco, args.pessoas, args.semente, config={
+            'ASYNC_READS': True, 'CARTAO_CACHE_MAX': 0
+        })
+        servidor = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{servidor.server_port}"
+        try:
+            token = autenticar(url, 'benchmark', 'benchmark')
+            medidos = {}
+            for rota in ROTAS:
+                for modo, prefixo in (('sync', ''), ('async', '/async')):
+                    medidos[f"{rota} {modo}"] = medir(url, token, prefixo, rota, pessoa_ids,
+                                                      args.concorrencia, args.duracao, args.semente)
+        finally:
+            servidor.shutdown()
+
+    resultados.imprimir(medidos)
+    for rota in ROTAS:
+        sync, assincrono = medidos[f"{rota} sync"], medidos[f"{rota} async"]
+        print(f"{rota}: sync {sync['rps']:.1f} req/s, async {assincrono['rps']:.1f} req/s "
+              f"({assincrono['rps'] / sync['rps']:.2f}x)")
+    resultados.salvar(args.saida, resultados.metadados(
+        pessoas=args.pessoas, semente=args.semente, concorrencia=args.concorrencia, duracao=args.duracao
+    ), medidos)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# cartao_vacinacao_api/benchmarks/bench_doses.py
+# Espaço ocupado por vacinacoes e seus índices com a dose gravada como texto (esquema antigo,
+# dose_aplicada VARCHAR) e como id do catálogo de doses (dose_id), medido pelo dbstat do SQLite
+# sobre o mesmo banco gerado por benchmarks.dados, antes e depois de `flask migrar-doses`.
+#   python -m benchmarks.bench_doses --pessoas 50000
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from benchmarks import resultados
+from benchmarks.dados import criar_app_benchmark
+from commands import converter_doses_para_texto, migrar_doses
+from models import db
+
+# Objetos medidos: tabela e índices de vacinacoes
+OBJETOS = ('vacinacoes', 'sqlite_autoindex_vacinacoes_1', 'ix_vacinacoes_pessoa_data', 'ix_vacinacoes_vacina_id')
+
+
+def vacuum():
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+        conexao.execute(text("VACUUM"))
+
+
+def tamanhos():
+    """Bytes ocupados (páginas) por objeto de OBJETOS e no total, segundo o dbstat."""
+    linhas = dict(db.session.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all())
+    medidos = {nome: linhas.get(nome, 0) for nome in OBJETOS}
+    medidos['total vacinacoes'] = sum(medidos.values())
+    medidos['arquivo'] = sum(linhas.values())
+    return medidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho de vacinacoes e índices: dose em texto x dose_id.")
+    parser.add_argument('--pessoas', type=int, default=50000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default='bench_doses.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = 'sqlite:///' + os.path.join(diretorio, 'doses.db')
+        app, _ = criar_app_benchmark(banco, args.pessoas, args.semente)
+        with app.app_context():
+            converter_doses_para_texto()
+            vacuum()
+            antes = tamanhos()
+
+            inicio = time.perf_counter()
+            migradas = migrar_doses()
+            duracao = time.perf_counter() - inicio
+            vacuum()
+            depois = tamanhos()
+            db.engine.dispose()
+
+    print(f"{migradas} vacinações migradas em {duracao:.1f} s")
+    print(f"{'objeto':<32}{'texto (KiB)':>14}{'dose_id (KiB)':>16}{'redução':>10}")
+    for nome in antes:
+        reducao = 1 - depois[nome] / antes[nome] if antes[nome] else 0
+        print(f"{nome:<32}{antes[nome] / 1024:>14.0f}{depois[nome] / 1024:>16.0f}{reducao:>10.1%}")
+    resultados.salvar(args.saida, resultados.metadados(pessoas=args.pessoas, semente=args.semente), {
+        "texto": antes, "dose_id": depois, "migracao": {"vacinacoes": migradas, "segundos": duracao}
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# cartao_vacinacao_api/benchmarks/bench_endpoints.py
+# Micro-benchmarks de cada endpoint pelo test client do Flask (sem rede), sobre um banco
+# gerado por benchmarks.dados. Grava p50/p95/p99 por cenário em JSON e, com --baseline,
+# compara com uma execução anterior (código de saída 1 se algum p95 piorar além da tolerância).
+#   python -m benchmarks.bench_endpoints --pessoas 10000 --saida bench_endpoints.json
+#   python -m benchmarks.bench_endpoints --baseline bench_endpoints.json
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks import resultados
+from benchmarks.dados import criar_app_benchmark, token_benchmark
+from cartao import cartao_cache
+from models import DOSES_VALIDAS, FORMATO_DATA_APLICACAO, db, Vacina
+from pagination import encode_cursor
+
+
+def medir(client, requisicao, iteracoes, aquecimento, antes=None):
+    """Executa `requisicao(i)` `aquecimento + iteracoes` vezes; só as últimas `iteracoes` são medidas."""
+    latencias = []
+    for i in range(aquecimento + iteracoes):
+        if antes is not None:
+            antes(i)
+        inicio = time.perf_counter()
+        resposta = requisicao(i)
+        decorrido = time.perf_counter() - inicio
+        if resposta.status_code >= 400:
+            raise RuntimeError(f"status {resposta.status_code}: {resposta.get_data(as_text=True)[:200]}")
+        if i >= aquecimento:
+            latencias.append(decorrido)
+    return resultados.estatisticas(latencias, sum(latencias))
+
+
+def cenarios(client, pessoa_ids, pessoas_livres, vacina_ids, semente):
+    """Cenários medidos: nome -> (requisição, preparação não medida ou None)."""
+    rng = random.Random(semente)
+    amostra = [rng.choice(pessoa_ids) for _ in range(1000)]
+    meio = encode_cursor(pessoa_ids[len(pessoa_ids) // 2])
+    etag_vacinas = client.get('/vacinas').headers['ETag']
+    data_aplicacao = time.strftime(FORMATO_DATA_APLICACAO)
+    # Combinações (pessoa, vacina, dose) ainda livres para POST /vacinacoes
+    livres = itertools.product(pessoas_livres, vacina_ids, DOSES_VALIDAS)
+
+    def cartao(i):
+        return client.get(f'/pessoas/{amostra[i % len(amostra)]}/cartao_vacinacao')
+
+    def cartao_repetido(i):
+        # Poucas pessoas, todas já vistas no aquecimento
+        return client.get(f'/pessoas/{amostra[i % 20]}/cartao_vacinacao')
+
+    def lote(i):
+        return amostra[(i * 50) % len(amostra):][:50]
+
+    def nova_vacinacao(_):
+        pessoa_id, vacina_id, dose = next(livres)
+        return client.post('/vacinacoes', json={
+            "pessoa_id": pessoa_id, "vacina_id": vacina_id,
+            "dose_aplicada": dose, "data_aplicacao": data_aplicacao
+        })
+
+    return {
+        "GET /vacinas": (lambda _: client.get('/vacinas'), None),
+        "GET /vacinas?categoria": (lambda _: client.get('/vacinas?categoria=Nacional'), None),
+        "GET /vacinas (304)": (lambda _: client.get('/vacinas', headers={'If-None-Match': etag_vacinas}), None),
+        "GET /pessoas": (lambda _: client.get('/pessoas'), None),
+        "GET /pessoas?after": (lambda _: client.get(f'/pessoas?after={meio}'), None),
+        "GET /pessoas?nome": (lambda _: client.get('/pessoas?nome=Lima'), None),
+        "GET /pessoas/<id>": (lambda i: client.get(f'/pessoas/{amostra[i % len(amostra)]}'), None),
+        "GET cartao_vacinacao (miss)": (cartao, lambda i: cartao_cache.invalidate_pessoa(amostra[i % len(amostra)])),
+        "GET cartao_vacinacao (hit)": (cartao_repetido, None),
+        "POST /cartoes/batch (50, miss)": (lambda i: client.post('/cartoes/batch', json={"pessoa_ids": lote(i)}),
+                                           lambda i: cartao_cache.invalidate_pessoas(lote(i))),
+        "POST /vacinacoes": (nova_vacinacao, None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks dos endpoints pelo test client.")
+    parser.add_argument('--pessoas', type=int, default=10000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--iteracoes', type=int, default=500)
+    parser.add_argument('--aquecimento', type=int, default=50)
+    parser.add_argument('--cenario', action='append', help="Mede só os cenários indicados (pode repetir)")
+    parser.add_argument('--saida', default='bench_endpoints.json')
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Piora máxima aceita no p95 (fração)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = 'sqlite:///' + os.path.join(diretorio, 'bench.db')
+        # Pessoas sem vacinações suficientes para todos os POST /vacinacoes medidos
+        sem_vacinacoes = max(1, (args.aquecimento + args.iteracoes) // 50)
+        app, pessoa_ids = criar_app_benchmark(banco, args.pessoas, args.semente, sem_vacinacoes)
+
+        with app.app_context(), app.test_client() as client:
+            client.environ_base['HTTP_AUTHORIZATION'] = token_benchmark(client)
+            vacina_ids = db.session.scalars(db.select(Vacina.id).order_by(Vacina.id)).all()
+            todos = cenarios(client, pessoa_ids, pessoa_ids[-sem_vacinacoes:], vacina_ids, args.semente)
+
+            medidos = {}
+            for nome, (requisicao, antes) in todos.items():
+                if args.cenario and nome not in args.cenario:
+                    continue
+                medidos[nome] = medir(client, requisicao, args.iteracoes, args.aquecimento, antes)
+
+    resultados.imprimir(medidos)
+    # Compara antes de gravar: --saida pode ser o próprio arquivo de baseline
+    regressoes = resultados.comparar(medidos, args.baseline, args.tolerancia) if args.baseline else []
+    resultados.salvar(args.saida, resultados.metadados(
+        pessoas=args.pessoas, semente=args.semente, iteracoes=args.iteracoes, aquecimento=args.aquecimento
+    ), medidos)
+    print(f"\nResultados gravados em {args.saida}.")
+    if regressoes:
+        print(f"p95 piorou mais de {args.tolerancia:.0%} em: {', '.join(regressoes)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
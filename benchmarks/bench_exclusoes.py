@@ -0,0 +1,99 @@
+# cartao_vacinacao_api/benchmarks/bench_exclusoes.py
+# Exclusão da vacina mais usada do banco gerado por benchmarks.dados: cascata pelo ORM (a coleção
+# Vacina.vacinacoes carregada na sessão e excluída objeto a objeto, como antes do ON DELETE CASCADE)
+# x cascata pelo banco (passive_deletes). Cada estratégia roda numa cópia nova do mesmo banco;
+# mede o tempo da exclusão (o lock de escrita fica preso durante todo ele) e, numa segunda cópia,
+# o pico de memória alocada pelo Python (tracemalloc).
+#   python -m benchmarks.bench_exclusoes --pessoas 50000
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import func, select
+
+from app import create_app
+from benchmarks import resultados
+from benchmarks.dados import criar_app_benchmark
+from models import db, Vacina, Vacinacao
+
+
+def excluir_pelo_orm(vacina_id):
+    vacina = db.session.get(Vacina, vacina_id)
+    len(vacina.vacinacoes) # Carrega a coleção: o ORM passa a excluir cada vacinação
+    db.session.delete(vacina)
+    db.session.commit()
+
+
+def excluir_pelo_banco(vacina_id):
+    db.session.delete(db.session.get(Vacina, vacina_id))
+    db.session.commit()
+
+
+ESTRATEGIAS = {'orm': excluir_pelo_orm, 'banco': excluir_pelo_banco}
+
+
+def vacina_mais_usada():
+    """(vacina_id, quantidade de vacinações) da vacina com mais vacinações."""
+    return db.session.execute(
+        select(Vacinacao.vacina_id, func.count()).group_by(Vacinacao.vacina_id).order_by(func.count().desc()).limit(1)
+    ).one()
+
+
+def medir(base, diretorio, estrategia, vacina_id, memoria=False):
+    """Segundos (ou pico de bytes alocados, com `memoria`) da exclusão numa cópia nova de `base`."""
+    copia = os.path.join(diretorio, f'{estrategia}.db')
+    shutil.copyfile(base, copia)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + copia})
+    with app.app_context():
+        if memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        ESTRATEGIAS[estrategia](vacina_id)
+        duracao = time.perf_counter() - inicio
+        if memoria:
+            duracao = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        restantes = db.session.scalar(select(func.count()).select_from(Vacinacao).where(Vacinacao.vacina_id == vacina_id))
+        assert restantes == 0, restantes
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(copia)
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exclusão da vacina mais usada: cascata pelo ORM x pelo banco.")
+    parser.add_argument('--pessoas', type=int, default=50000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default='bench_exclusoes.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        base = os.path.join(diretorio, 'base.db')
+        app, _ = criar_app_benchmark('sqlite:///' + base, args.pessoas, args.semente)
+        with app.app_context():
+            vacina_id, vacinacoes = vacina_mais_usada()
+            db.engine.dispose()
+
+        medidas = {
+            estrategia: {
+                "segundos": medir(base, diretorio, estrategia, vacina_id),
+                "pico_memoria": medir(base, diretorio, estrategia, vacina_id, memoria=True),
+            }
+            for estrategia in ESTRATEGIAS
+        }
+
+    print(f"Vacina {vacina_id}: {vacinacoes} vacinações")
+    print(f"{'estratégia':<12}{'tempo (s)':>12}{'pico de memória (MiB)':>24}")
+    for estrategia, medida in medidas.items():
+        print(f"{estrategia:<12}{medida['segundos']:>12.2f}{medida['pico_memoria'] / 2**20:>24.1f}")
+    resultados.salvar(args.saida, resultados.metadados(pessoas=args.pessoas, semente=args.semente), {
+        "vacina_id": vacina_id, "vacinacoes": vacinacoes, **medidas
+    })
+
+
+if __name__ == '__main__':
+    main()
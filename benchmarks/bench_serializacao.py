@@ -0,0 +1,67 @@
+# cartao_vacinacao_api/benchmarks/bench_serializacao.py
+# Compara a serialização original (objetos do ORM + marshmallow AutoSchema + jsonify) com o
+# caminho rápido (tuplas de colunas + serializers.json_bytes, com e sem orjson) em listas grandes.
+#   python -m benchmarks.bench_serializacao --linhas 100000
+import argparse
+import statistics
+import time
+
+from sqlalchemy import insert
+
+import serializers
+from app import create_app, pessoas_schema
+from commands import init_db
+from models import db, Pessoa
+from queries import COLUNAS_PESSOA
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        db.session.expunge_all()
+        inicio = time.perf_counter()
+        body = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        init_db()
+        db.session.execute(insert(Pessoa), [
+            {"nome": f"Pessoa Benchmark {i} João", "numero_identificacao": f"{i:011d}"} for i in range(args.linhas)
+        ])
+        db.session.commit()
+
+        def original():
+            return pessoas_schema.jsonify(Pessoa.query.order_by(Pessoa.id).all()).get_data()
+
+        def rapido():
+            linhas = db.session.query(*COLUNAS_PESSOA).order_by(Pessoa.id).all()
+            return serializers.json_bytes(serializers.linhas_para_dicts(serializers.CAMPOS_PESSOA, linhas))
+
+        t_original, body_original = medir(original, args.repeticoes)
+        print(f"original (ORM + marshmallow): {t_original * 1000:8.1f} ms")
+
+        orjson = serializers.orjson
+        serializers.orjson = None
+        t_stdlib, body_stdlib = medir(rapido, args.repeticoes)
+        print(f"rápido (tuplas + json):       {t_stdlib * 1000:8.1f} ms  ({t_original / t_stdlib:.1f}x)")
+        assert body_stdlib == body_original, "saída diferente da original"
+
+        serializers.orjson = orjson
+        if orjson is not None:
+            t_orjson, body_orjson = medir(rapido, args.repeticoes)
+            print(f"rápido (tuplas + orjson):     {t_orjson * 1000:8.1f} ms  ({t_original / t_orjson:.1f}x)")
+            assert body_orjson == body_original, "saída diferente da original"
+        print(f"{args.linhas} linhas, {len(body_original)} bytes, saídas idênticas.")
+
+
+if __name__ == '__main__':
+    main()
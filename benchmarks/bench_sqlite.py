@@ -0,0 +1,124 @@
+# cartao_vacinacao_api/benchmarks/bench_sqlite.py
+# Escritores (POST /vacinacoes) e leitores (GET do cartão) em paralelo sobre um banco SQLite em
+# arquivo, com a configuração padrão do SQLite (journal DELETE, synchronous FULL) e com a
+# configuração de database.py (WAL, synchronous NORMAL, busy_timeout, mmap, cache).
+# Conta erros (500 / "database is locked") e compara a vazão.
+#   python -m benchmarks.bench_sqlite --escritores 4 --leitores 4 --operacoes 200
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks import resultados
+from benchmarks.dados import criar_app_benchmark, token_benchmark
+from models import db, DOSES_VALIDAS, FORMATO_DATA_APLICACAO
+
+# Configuração padrão do SQLite (o que o app usava antes de database.py)
+CONFIG_PADRAO = {
+    'SQLITE_JOURNAL_MODE': '', 'SQLITE_SYNCHRONOUS': '', 'SQLITE_BUSY_TIMEOUT': '',
+    'SQLITE_MMAP_SIZE': '', 'SQLITE_CACHE_SIZE': '',
+}
+CONFIG_AJUSTADA = {} # Valores do Config
+
+
+def executar_concorrencia(app, pessoa_ids, pessoas_livres, escritores, leitores, operacoes, semente=42):
+    """
+    Dispara `escritores` threads com `operacoes` POST /vacinacoes cada (em pessoas de `pessoas_livres`,
+    uma por escritor) e `leitores` threads com `operacoes` GET do cartão cada.
+    Retorna {'escrita': [...], 'leitura': [...]} com (latência, status) de cada requisição e a duração total.
+    """
+    with app.test_client() as client:
+        token = token_benchmark(client)
+    vacina_ids = range(1, 18)
+    amostras = {'escrita': [], 'leitura': []}
+    lock = threading.Lock()
+    barreira = threading.Barrier(escritores + leitores)
+
+    def escritor(pessoa_id):
+        combinacoes = itertools.product(vacina_ids, DOSES_VALIDAS)
+        medidas = []
+        with app.test_client() as client:
+            client.environ_base['HTTP_AUTHORIZATION'] = token
+            barreira.wait()
+            for _ in range(operacoes):
+                vacina_id, dose = next(combinacoes)
+                inicio = time.perf_counter()
+                response = client.post('/vacinacoes', json={
+                    "pessoa_id": pessoa_id, "vacina_id": vacina_id, "dose_aplicada": dose,
+                    "data_aplicacao": time.strftime(FORMATO_DATA_APLICACAO)
+                })
+                medidas.append((time.perf_counter() - inicio, response.status_code))
+        with lock:
+            amostras['escrita'].extend(medidas)
+
+    def leitor(indice):
+        rng = random.Random(semente + indice)
+        medidas = []
+        with app.test_client() as client:
+            client.environ_base['HTTP_AUTHORIZATION'] = token
+            barreira.wait()
+            for _ in range(operacoes):
+                inicio = time.perf_counter()
+                response = client.get(f'/pessoas/{rng.choice(pessoa_ids)}/cartao_vacinacao')
+                medidas.append((time.perf_counter() - inicio, response.status_code))
+        with lock:
+            amostras['leitura'].extend(medidas)
+
+    threads = [threading.Thread(target=escritor, args=(pessoas_livres[i],)) for i in range(escritores)]
+    threads += [threading.Thread(target=leitor, args=(i,)) for i in range(leitores)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return amostras, time.perf_counter() - inicio
+
+
+def resumir(amostras, duracao):
+    resumo = {}
+    for tipo, medidas in amostras.items():
+        resumo[tipo] = resultados.estatisticas([latencia for latencia, _ in medidas], duracao)
+        resumo[tipo]["erros"] = sum(1 for _, status in medidas if status >= 400)
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escritores e leitores concorrentes no SQLite, padrão x ajustado.")
+    parser.add_argument('--pessoas', type=int, default=5000)
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--leitores', type=int, default=4)
+    parser.add_argument('--operacoes', type=int, default=200, help="Requisições por thread (máximo 187 por escritor)")
+    parser.add_argument('--saida', default='bench_sqlite.json')
+    args = parser.parse_args()
+
+    medidos = {}
+    for nome, config in (('padrao', CONFIG_PADRAO), ('ajustado', CONFIG_AJUSTADA)):
+        with tempfile.TemporaryDirectory() as diretorio:
+            banco = 'sqlite:///' + os.path.join(diretorio, 'bench.db')
+            app, pessoa_ids = criar_app_benchmark(banco, args.pessoas, sem_vacinacoes=args.escritores, config={
+                **config, 'CARTAO_CACHE_MAX': 0 # Leitores sempre vão ao banco
+            })
+            operacoes = min(args.operacoes, len(DOSES_VALIDAS) * 17)
+            amostras, duracao = executar_concorrencia(
+                app, pessoa_ids, pessoa_ids[-args.escritores:], args.escritores, args.leitores, operacoes
+            )
+            with app.app_context():
+                db.engine.dispose()
+        for tipo, resumo in resumir(amostras, duracao).items():
+            medidos[f"{nome} {tipo}"] = resumo
+
+    resultados.imprimir(medidos)
+    for tipo in ('escrita', 'leitura'):
+        padrao, ajustado = medidos[f"padrao {tipo}"], medidos[f"ajustado {tipo}"]
+        print(f"{tipo}: {padrao['rps']:.1f} -> {ajustado['rps']:.1f} req/s "
+              f"({ajustado['rps'] / padrao['rps']:.1f}x), erros {padrao['erros']} -> {ajustado['erros']}")
+    resultados.salvar(args.saida, resultados.metadados(
+        pessoas=args.pessoas, escritores=args.escritores, leitores=args.leitores, operacoes=args.operacoes
+    ), medidos)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# cartao_vacinacao_api/benchmarks/bench_workers.py
+# Vazão por quantidade de workers do servidor de produção (gunicorn.conf.py + wsgi.py), sobre o
+# mesmo banco gerado por benchmarks.dados: para cada quantidade, uma cópia nova do banco, o gunicorn
+# num processo à parte, a espera até todos os workers terem aquecido e a mistura de benchmarks.carga.
+# O gerador de carga roda neste processo e disputa CPU com os workers: a vazão só escala enquanto
+# houver núcleos livres para os dois (o número de núcleos é gravado junto dos resultados).
+#   python -m benchmarks.bench_workers --workers 1 2 4 8 --concorrencia 16 --duracao 20
+import argparse
+import http.client
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import carga, resultados
+from benchmarks.dados import criar_app_benchmark
+from models import db
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def aguardar_workers(log, workers, url, processo, limite=60):
+    """Espera os `workers` aquecerem (linha do post_worker_init no log do gunicorn) e a porta responder."""
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise SystemExit(f"gunicorn terminou com código {processo.returncode}; veja {log}")
+        with open(log, encoding='utf-8', errors='replace') as arquivo:
+            prontos = arquivo.read().count('Worker aquecido')
+        if prontos >= workers:
+            try:
+                carga.Cliente(url).requisitar('GET', '/vacinas')
+                return
+            except (http.client.HTTPException, OSError):
+                pass
+        time.sleep(0.1)
+    raise SystemExit(f"{workers} workers não ficaram prontos em {limite} s; veja {log}")
+
+
+def medir(base, diretorio, workers, args, pessoa_ids):
+    copia = os.path.join(diretorio, f'workers-{workers}.db')
+    shutil.copyfile(base, copia)
+    porta = porta_livre()
+    url = f"http://127.0.0.1:{porta}"
+    log = os.path.join(diretorio, f'gunicorn-{workers}.log')
+    ambiente = {
+        **os.environ,
+        'DATABASE_URL': 'sqlite:///' + copia,
+        'WEB_BIND': f'127.0.0.1:{porta}',
+        'WEB_WORKERS': str(workers),
+        'WEB_THREADS': str(args.threads),
+        'LOG_ARQUIVO': os.path.join(diretorio, f'api-{workers}.log'),
+    }
+    with open(log, 'w', encoding='utf-8') as saida:
+        processo = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                    cwd=RAIZ, env=ambiente, stdout=saida, stderr=subprocess.STDOUT)
+    try:
+        aguardar_workers(log, workers, url, processo)
+        token = carga.autenticar(url, 'benchmark', 'benchmark')
+        return carga.executar(url, token, pessoa_ids, args.concorrencia, args.duracao, carga.MISTURA, args.semente)
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        processo.wait(timeout=60)
+        os.remove(copia)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão da API sob o gunicorn com 1, 2, 4 e 8 workers.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--threads', type=int, default=4, help="Threads por worker (WEB_THREADS)")
+    parser.add_argument('--pessoas', type=int, default=10000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--concorrencia', type=int, default=16, help="Conexões simultâneas do gerador de carga")
+    parser.add_argument('--duracao', type=float, default=20, help="Segundos de carga por quantidade de workers")
+    parser.add_argument('--saida', default='bench_workers.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        base = os.path.join(diretorio, 'base.db')
+        app, pessoa_ids = criar_app_benchmark('sqlite:///' + base, args.pessoas, args.semente)
+        with app.app_context():
+            db.engine.dispose()
+        medidas = {str(workers): medir(base, diretorio, workers, args, pessoa_ids) for workers in args.workers}
+
+    print(f"{'workers':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>8}")
+    for workers, medida in medidas.items():
+        total = medida["total"]
+        print(f"{workers:>8}{total['rps']:>10.1f}{total['p50_ms']:>10.2f}{total['p95_ms']:>10.2f}"
+              f"{total['p99_ms']:>10.2f}{total['erros']:>8}")
+    resultados.salvar(args.saida, resultados.metadados(
+        pessoas=args.pessoas, semente=args.semente, threads=args.threads, concorrencia=args.concorrencia,
+        duracao=args.duracao, nucleos=os.cpu_count()
+    ), medidas)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+# cartao_vacinacao_api/benchmarks/carga.py
+# Gerador de carga concorrente: N threads fazem requisições HTTP reais durante um tempo fixo,
+# numa mistura ponderada de leituras e escritas, e o resultado (p50/p95/p99 e requisições por
+# segundo, por rota e no total) é gravado em JSON, comparável com um baseline como em bench_endpoints.
+#
+# Sem --url, sobe o app num servidor werkzeug em thread, sobre um banco gerado por benchmarks.dados.
+# Nesse modo cliente e servidor dividem o mesmo processo (e o GIL); para números isolados, suba o
+# servidor à parte (ex.: gunicorn) sobre um banco gerado por `python -m benchmarks.dados` e use --url.
+#   python -m benchmarks.carga --concorrencia 8 --duracao 30 --saida carga.json
+#   python -m benchmarks.carga --url http://127.0.0.1:5000 --usuario u --senha s
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from werkzeug.serving import make_server
+
+from benchmarks import resultados
+from benchmarks.dados import criar_app_benchmark
+from models import DOSES_VALIDAS, FORMATO_DATA_APLICACAO
+
+# Mistura padrão de rotas e seus pesos
+MISTURA = {
+    "GET /vacinas": 15,
+    "GET /pessoas": 10,
+    "GET /pessoas?nome": 5,
+    "GET /pessoas/<id>": 15,
+    "GET cartao_vacinacao": 45,
+    "POST /vacinacoes": 10,
+}
+
+class Cliente:
+    """Conexão HTTP keep-alive de uma thread, reaberta se o servidor a fechar."""
+
+    def __init__(self, url, token=None):
+        partes = urlsplit(url)
+        self.host, self.porta = partes.hostname, partes.port or 80
+        self.cabecalhos = {'Content-Type': 'application/json'}
+        if token:
+            self.cabecalhos['Authorization'] = f"Bearer {token}"
+        self.conexao = None
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        dados = json.dumps(corpo).encode() if corpo is not None else None
+        for tentativa in range(2):
+            if self.conexao is None:
+                self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=30)
+            try:
+                self.conexao.request(metodo, caminho, body=dados, headers=self.cabecalhos)
+                resposta = self.conexao.getresponse()
+                conteudo = resposta.read()
+                if resposta.will_close:
+                    self.fechar()
+                return resposta.status, conteudo, resposta.headers
+            except (http.client.HTTPException, OSError):
+                self.fechar()
+                if tentativa:
+                    raise
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
+
+
+def autenticar(url, usuario, senha):
+    cliente = Cliente(url)
+    cliente.requisitar('POST', '/register', {"username": usuario, "password": senha}) # 409 se já existir
+    status, conteudo, _ = cliente.requisitar('POST', '/login', {"username": usuario, "password": senha})
+    cliente.fechar()
+    if status != 200:
+        raise SystemExit(f"Falha no login ({status}): {conteudo[:200]!r}")
+    return json.loads(conteudo)["access_token"]
+
+
+def descobrir_pessoas(url, token, maximo=1000):
+    """Ids de pessoas existentes, pelas páginas de GET /pessoas (modo --url)."""
+    cliente = Cliente(url, token)
+    ids, caminho = [], '/pessoas?limit=200'
+    while caminho and len(ids) < maximo:
+        _, conteudo, cabecalhos = cliente.requisitar('GET', caminho)
+        ids.extend(pessoa["id"] for pessoa in json.loads(conteudo))
+        cursor = cabecalhos.get('X-Next-Cursor')
+        caminho = f'/pessoas?limit=200&after={cursor}' if cursor else None
+    cliente.fechar()
+    return ids[:maximo]
+
+
+def listar_vacinas(url, token):
+    cliente = Cliente(url, token)
+    _, conteudo, _ = cliente.requisitar('GET', '/vacinas')
+    cliente.fechar()
+    return [vacina["id"] for vacina in json.loads(conteudo)]
+
+
+class Trabalhador(threading.Thread):
+    def __init__(self, indice, url, token, pessoa_ids, vacina_ids, mistura, fim, semente):
+        super().__init__(name=f'carga-{indice}', daemon=True)
+        self.cliente = Cliente(url, token)
+        self.pessoa_ids = pessoa_ids
+        self.vacina_ids = vacina_ids
+        self.rng = random.Random(semente + indice)
+        self.rotas, self.pesos = zip(*mistura.items())
+        self.fim = fim
+        self.prefixo = f"CARGA-{uuid.uuid4().hex[:12]}-{indice}"
+        self.livres = iter(())
+        self.amostras = [] # (rota, latência, status)
+
+    def _proxima_vacinacao(self):
+        # Cada thread registra doses em pessoas próprias, criadas sob demanda (não medidas)
+        try:
+            return next(self.livres)
+        except StopIteration:
+            _, conteudo, _ = self.cliente.requisitar('POST', '/pessoas', {
+                "nome": "Pessoa Carga", "numero_identificacao": f"{self.prefixo}-{len(self.amostras)}"
+            })
+            pessoa_id = json.loads(conteudo)["id"]
+            self.livres = ((pessoa_id, vacina_id, dose) for vacina_id, dose in itertools.product(self.vacina_ids, DOSES_VALIDAS))
+            return next(self.livres)
+
+    def _requisicao(self, rota):
+        if rota == "GET /vacinas":
+            return 'GET', '/vacinas', None
+        if rota == "GET /pessoas":
+            return 'GET', '/pessoas', None
+        if rota == "GET /pessoas?nome":
+            return 'GET', '/pessoas?nome=Lima', None
+        if rota == "GET /pessoas/<id>":
+            return 'GET', f'/pessoas/{self.rng.choice(self.pessoa_ids)}', None
+        if rota == "GET cartao_vacinacao":
+            return 'GET', f'/pessoas/{self.rng.choice(self.pessoa_ids)}/cartao_vacinacao', None
+        pessoa_id, vacina_id, dose = self._proxima_vacinacao()
+        return 'POST', '/vacinacoes', {
+            "pessoa_id": pessoa_id, "vacina_id": vacina_id, "dose_aplicada": dose,
+            "data_aplicacao": time.strftime(FORMATO_DATA_APLICACAO)
+        }
+
+    def run(self):
+        while time.monotonic() < self.fim:
+            rota = self.rng.choices(self.rotas, self.pesos)[0]
+            metodo, caminho, corpo = self._requisicao(rota)
+            inicio = time.perf_counter()
+            try:
+                status, _, _ = self.cliente.requisitar(metodo, caminho, corpo)
+            except (http.client.HTTPException, OSError):
+                status = 0
+            self.amostras.append((rota, time.perf_counter() - inicio, status))
+        self.cliente.fechar()
+
+
+def executar(url, token, pessoa_ids, concorrencia, duracao, mistura, semente):
+    vacina_ids = listar_vacinas(url, token)
+    fim = time.monotonic() + duracao
+    trabalhadores = [
+        Trabalhador(i, url, token, pessoa_ids, vacina_ids, mistura, fim, semente) for i in range(concorrencia)
+    ]
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    decorrido = time.perf_counter() - inicio
+
+    amostras = [amostra for trabalhador in trabalhadores for amostra in trabalhador.amostras]
+    medidos = {}
+    for rota in mistura:
+        da_rota = [(latencia, status) for nome, latencia, status in amostras if nome == rota]
+        if da_rota:
+            medidos[rota] = resultados.estatisticas([latencia for latencia, _ in da_rota], decorrido)
+            medidos[rota]["erros"] = sum(1 for _, status in da_rota if not 200 <= status < 400)
+    medidos["total"] = resultados.estatisticas([latencia for _, latencia, _ in amostras], decorrido)
+    medidos["total"]["erros"] = sum(1 for _, _, status in amostras if not 200 <= status < 400)
+    return medidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga concorrente sobre a API, com percentis de latência.")
+    parser.add_argument('--url', help="API já em execução; sem ela, sobe um servidor local com dados gerados")
+    parser.add_argument('--usuario', default='benchmark')
+    parser.add_argument('--senha', default='benchmark')
+    parser.add_argument('--pessoas', type=int, default=10000, help="Pessoas geradas (sem --url)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--duracao', type=float, default=30, help="Segundos de carga")
+    parser.add_argument('--mistura', type=json.loads, default=MISTURA, help="JSON rota -> peso (rotas de MISTURA)")
+    parser.add_argument('--saida', default='carga.json')
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Piora máxima aceita no p95 (fração)")
+    args = parser.parse_args()
+
+    desconhecidas = set(args.mistura) - set(MISTURA)
+    if desconhecidas:
+        parser.error(f"rotas desconhecidas em --mistura: {', '.join(sorted(desconhecidas))}")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        servidor = None
+        if args.url:
+            url = args.url
+            token = autenticar(url, args.usuario, args.senha)
+            pessoa_ids = descobrir_pessoas(url, token)
+        else:
+            logging.getLogger('werkzeug').setLevel(logging.ERROR) # Sem log por requisição
+            banco = 'sqlite:///' + os.path.join(diretorio, 'carga.db')
+            app, pessoa_ids = criar_app_benchmark(banco, args.pessoas, args.semente)
+            servidor = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{servidor.server_port}"
+            token = autenticar(url, args.usuario, args.senha)
+        if not pessoa_ids:
+            raise SystemExit("Nenhuma pessoa cadastrada para as leituras; gere dados com benchmarks.dados.")
+
+        try:
+            medidos = executar(url, token, pessoa_ids, args.concorrencia, args.duracao, args.mistura, args.semente)
+        finally:
+            if servidor is not None:
+                servidor.shutdown()
+
+    resultados.imprimir(medidos)
+    regressoes = resultados.comparar(medidos, args.baseline, args.tolerancia) if args.baseline else []
+    resultados.salvar(args.saida, resultados.metadados(
+        url=args.url, pessoas=None if args.url else args.pessoas, semente=args.semente,
+        concorrencia=args.concorrencia, duracao=args.duracao, mistura=args.mistura
+    ), medidos)
+    print(f"\nErros: {medidos['total']['erros']}. Resultados gravados em {args.saida}.")
+    if regressoes:
+        print(f"p95 piorou mais de {args.tolerancia:.0%} em: {', '.join(regressoes)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
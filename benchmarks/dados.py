@@ -0,0 +1,139 @@
+# cartao_vacinacao_api/benchmarks/dados.py
+# Gerador determinístico de dados sintéticos para os benchmarks: N pessoas com vacinações
+# distribuídas pelo catálogo inicial (commands.VACINAS_INICIAIS) segundo o esquema de doses
+# de cada vacina. A mesma semente gera sempre o mesmo banco.
+#   python -m benchmarks.dados --pessoas 10000 --banco sqlite:///bench.db
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+import estatisticas
+from app import create_app
+from commands import ESQUEMAS_INICIAIS, init_db, seed_esquemas, seed_vacinas
+from models import db, Pessoa, Vacina, Vacinacao
+
+# Sequência de doses por vacina (a do esquema inicial); vacinas fora da lista recebem dose única
+ESQUEMAS_DOSES = {nome: tuple(dose for dose, _ in passos) for nome, passos in ESQUEMAS_INICIAIS.items()}
+
+# Probabilidade de a pessoa iniciar o esquema, por categoria da vacina
+COBERTURA_POR_CATEGORIA = {
+    "Nacional": 0.9,
+    "Anti Rábica": 0.03,
+    "BCG de Contato": 0.02,
+    "Vacinas Particulares": 0.2,
+    "Outra Vacina": 0.15,
+}
+COBERTURA_PADRAO = 0.1
+
+# Probabilidade de completar cada dose seguinte do esquema, e de a dose perdida virar "Faltoso"
+CONTINUIDADE = 0.85
+CHANCE_FALTOSO = 0.3
+
+# Intervalo entre doses consecutivas, em dias
+INTERVALO_DOSES = (30, 90)
+
+DATA_INICIAL = datetime(2015, 1, 1)
+DIAS_PERIODO = 3650
+
+NOMES = ("Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela",
+         "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago")
+SOBRENOMES = ("Almeida", "Barbosa", "Cardoso", "Dias", "Esteves", "Ferreira", "Gonçalves", "Lima",
+              "Martins", "Nascimento", "Oliveira", "Pereira", "Rodrigues", "Santos", "Souza")
+
+LOTE_INSERCAO = 5000
+
+
+def _lotes(linhas, tamanho):
+    for inicio in range(0, len(linhas), tamanho):
+        yield linhas[inicio:inicio + tamanho]
+
+
+def _vacinacoes_da_pessoa(rng, pessoa_id, vacinas):
+    nascimento = DATA_INICIAL + timedelta(days=rng.randrange(DIAS_PERIODO), seconds=rng.randrange(86400))
+    for vacina_id, nome, categoria in vacinas:
+        if rng.random() >= COBERTURA_POR_CATEGORIA.get(categoria, COBERTURA_PADRAO):
+            continue
+        data = nascimento + timedelta(days=rng.randrange(60))
+        for posicao, dose in enumerate(ESQUEMAS_DOSES.get(nome, ("Dose Unica",))):
+            if posicao and rng.random() >= CONTINUIDADE:
+                if rng.random() < CHANCE_FALTOSO:
+                    yield {"pessoa_id": pessoa_id, "vacina_id": vacina_id, "data_aplicacao": data, "dose_aplicada": "Faltoso"}
+                break
+            yield {"pessoa_id": pessoa_id, "vacina_id": vacina_id, "data_aplicacao": data, "dose_aplicada": dose}
+            data += timedelta(days=rng.randint(*INTERVALO_DOSES))
+
+
+def gerar_dados(pessoas, semente=42, sem_vacinacoes=0):
+    """
+    Insere `pessoas` pessoas e suas vacinações no banco do app atual (o catálogo já deve estar populado).
+
+    As últimas `sem_vacinacoes` pessoas ficam sem nenhuma vacinação, para os benchmarks de escrita
+    registrarem doses sem esbarrar na chave única. Retorna (ids das pessoas, quantidade de vacinações).
+    """
+    rng = random.Random(semente)
+    vacinas = db.session.execute(select(Vacina.id, Vacina.nome, Vacina.categoria).order_by(Vacina.id)).all()
+
+    linhas_pessoas = [
+        {"nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+         "numero_identificacao": f"BENCH{semente:04d}{indice:09d}"}
+        for indice in range(pessoas)
+    ]
+    pessoa_ids = []
+    for lote in _lotes(linhas_pessoas, LOTE_INSERCAO):
+        pessoa_ids.extend(db.session.scalars(
+            insert(Pessoa).returning(Pessoa.id, sort_by_parameter_order=True), lote
+        ))
+
+    total_vacinacoes = 0
+    lote = []
+    for pessoa_id in pessoa_ids[:len(pessoa_ids) - sem_vacinacoes]:
+        lote.extend(_vacinacoes_da_pessoa(rng, pessoa_id, vacinas))
+        if len(lote) >= LOTE_INSERCAO:
+            db.session.execute(insert(Vacinacao), lote)
+            total_vacinacoes += len(lote)
+            lote = []
+    if lote:
+        db.session.execute(insert(Vacinacao), lote)
+        total_vacinacoes += len(lote)
+    db.session.commit()
+    estatisticas.reconstruir() # As vacinações foram inseridas direto, sem passar pelas rotas
+    return pessoa_ids, total_vacinacoes
+
+
+def criar_app_benchmark(banco, pessoas, semente=42, sem_vacinacoes=0, config=None):
+    """App com o banco `banco` criado e populado por `gerar_dados`. Retorna (app, ids das pessoas)."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': banco, **(config or {})})
+    with app.app_context():
+        init_db()
+        seed_vacinas()
+        seed_esquemas()
+        pessoa_ids, _ = gerar_dados(pessoas, semente, sem_vacinacoes)
+    return app, pessoa_ids
+
+
+def token_benchmark(client, usuario='benchmark', senha='benchmark'):
+    """Registra (se preciso) o usuário de benchmark e devolve o cabeçalho Authorization."""
+    client.post('/register', json={"username": usuario, "password": senha})
+    resposta = client.post('/login', json={"username": usuario, "password": senha})
+    return f"Bearer {resposta.get_json()['access_token']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula um banco com dados sintéticos para benchmarks.")
+    parser.add_argument('--pessoas', type=int, default=10000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--banco', required=True, help="URI do banco, ex.: sqlite:///bench.db")
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.banco})
+    with app.app_context():
+        init_db()
+        seed_vacinas()
+        pessoa_ids, vacinacoes = gerar_dados(args.pessoas, args.semente)
+    print(f"{len(pessoa_ids)} pessoas e {vacinacoes} vacinações geradas (semente {args.semente}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# cartao_vacinacao_api/benchmarks/resultados.py
+# Estatísticas de latência, gravação dos resultados em JSON e comparação com um baseline,
+# compartilhadas por bench_endpoints e carga.
+import json
+import platform
+import sqlite3
+import subprocess
+from datetime import datetime, timezone
+
+
+def percentil(ordenados, p):
+    """Percentil `p` (0-100) de uma lista já ordenada, com interpolação linear."""
+    if not ordenados:
+        return 0.0
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def estatisticas(latencias, duracao):
+    """Resumo de uma série de latências (segundos) medidas ao longo de `duracao` segundos; tempos em ms."""
+    ordenados = sorted(latencias)
+    return {
+        "requisicoes": len(ordenados),
+        "p50_ms": round(percentil(ordenados, 50) * 1000, 3),
+        "p95_ms": round(percentil(ordenados, 95) * 1000, 3),
+        "p99_ms": round(percentil(ordenados, 99) * 1000, 3),
+        "media_ms": round(sum(ordenados) / len(ordenados) * 1000, 3) if ordenados else 0.0,
+        "max_ms": round(ordenados[-1] * 1000, 3) if ordenados else 0.0,
+        "rps": round(len(ordenados) / duracao, 1) if duracao > 0 else 0.0,
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadados(**parametros):
+    """Contexto da execução, gravado junto dos resultados para que comparações entre máquinas fiquem evidentes."""
+    return {
+        "data": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "parametros": parametros,
+    }
+
+
+def salvar(caminho, meta, resultados):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump({"meta": meta, "resultados": resultados}, arquivo, ensure_ascii=False, indent=2, sort_keys=True)
+        arquivo.write('\n')
+
+
+def comparar(resultados, caminho_baseline, tolerancia):
+    """
+    Imprime a variação de p50/p95 de cada cenário em relação ao baseline e retorna os cenários
+    cujo p95 piorou mais que `tolerancia` (fração, ex.: 0.2 = 20%).
+    """
+    with open(caminho_baseline, encoding='utf-8') as arquivo:
+        baseline = json.load(arquivo)["resultados"]
+
+    regressoes = []
+    print(f"\n{'cenário':<32} {'p50 base':>10} {'p50':>10} {'p95 base':>10} {'p95':>10} {'var p95':>9}")
+    for nome, atual in resultados.items():
+        anterior = baseline.get(nome)
+        if anterior is None:
+            print(f"{nome:<32} (sem baseline)")
+            continue
+        variacao = (atual["p95_ms"] - anterior["p95_ms"]) / anterior["p95_ms"] if anterior["p95_ms"] else 0.0
+        marca = " <-" if variacao > tolerancia else ""
+        print(f"{nome:<32} {anterior['p50_ms']:>10.3f} {atual['p50_ms']:>10.3f} "
+              f"{anterior['p95_ms']:>10.3f} {atual['p95_ms']:>10.3f} {variacao:>+8.1%}{marca}")
+        if variacao > tolerancia:
+            regressoes.append(nome)
+    return regressoes
+
+
+def imprimir(resultados):
+    print(f"{'cenário':<32} {'req':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>9}")
+    for nome, dados in resultados.items():
+        print(f"{nome:<32} {dados['requisicoes']:>7} {dados['p50_ms']:>9.3f} {dados['p95_ms']:>9.3f} "
+              f"{dados['p99_ms']:>9.3f} {dados['rps']:>9.1f}")
@@ -0,0 +1,134 @@
+# cartao_vacinacao_api/bulk.py
+# Registro de vacinações em lote (POST /vacinacoes/bulk): validação e checagem de duplicatas
+# por conjunto, em poucas consultas, e inserção em lotes dentro de uma única transação.
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+import estatisticas
+from models import db, Pessoa, Vacina, Vacinacao, DOSES_VALIDAS, FORMATO_DATA_APLICACAO
+
+# Limite de parâmetros por cláusula IN (o SQLite antigo aceita no máximo 999 variáveis por comando)
+IN_CHUNK_SIZE = 500
+
+CAMPOS_OBRIGATORIOS = ('pessoa_id', 'vacina_id', 'dose_aplicada')
+
+
+def _chunks(valores, tamanho):
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
+
+def _erro(indice, status, message):
+    return {"indice": indice, "status": status, "message": message}
+
+
+def _validar(indice, registro):
+    """Valida um registro isolado. Retorna (linha para inserir, None) ou (None, resultado de erro)."""
+    if not isinstance(registro, dict) or not all(campo in registro for campo in CAMPOS_OBRIGATORIOS):
+        return None, _erro(indice, 400, f"Dados inválidos: {', '.join(CAMPOS_OBRIGATORIOS)} são obrigatórios.")
+
+    pessoa_id = registro['pessoa_id']
+    vacina_id = registro['vacina_id']
+    if not all(isinstance(valor, int) and not isinstance(valor, bool) for valor in (pessoa_id, vacina_id)):
+        return None, _erro(indice, 400, "Dados inválidos: pessoa_id e vacina_id devem ser inteiros.")
+
+    dose_aplicada = registro['dose_aplicada']
+    if dose_aplicada not in DOSES_VALIDAS:
+        return None, _erro(indice, 400, f"Dose '{dose_aplicada}' inválida. Doses válidas: {', '.join(DOSES_VALIDAS)}")
+
+    data_aplicacao_str = registro.get('data_aplicacao')
+    if data_aplicacao_str:
+        try:
+            data_aplicacao = datetime.strptime(data_aplicacao_str, FORMATO_DATA_APLICACAO)
+        except (TypeError, ValueError):
+            return None, _erro(indice, 400, f"Formato de data inválido. Use {FORMATO_DATA_APLICACAO}")
+    else:
+        data_aplicacao = datetime.utcnow()
+
+    return {
+        "pessoa_id": pessoa_id,
+        "vacina_id": vacina_id,
+        "dose_aplicada": dose_aplicada,
+        "data_aplicacao": data_aplicacao,
+    }, None
+
+
+def _ids_existentes(coluna, ids):
+    existentes = set()
+    for chunk in _chunks(ids, IN_CHUNK_SIZE):
+        existentes.update(db.session.scalars(select(coluna).where(coluna.in_(chunk))))
+    return existentes
+
+
+def _nomes_vacinas(ids):
+    nomes = {}
+    for chunk in _chunks(ids, IN_CHUNK_SIZE):
+        nomes.update(db.session.execute(select(Vacina.id, Vacina.nome).where(Vacina.id.in_(chunk))).all())
+    return nomes
+
+
+def _doses_registradas(pessoa_ids):
+    """Chaves (pessoa_id, vacina_id, dose_aplicada) já gravadas para as pessoas do lote."""
+    chaves = set()
+    for chunk in _chunks(pessoa_ids, IN_CHUNK_SIZE):
+        chaves.update(db.session.execute(
+            select(Vacinacao.pessoa_id, Vacinacao.vacina_id, Vacinacao.dose_aplicada)
+            .where(Vacinacao.pessoa_id.in_(chunk))
+        ).all())
+    return chaves
+
+
+def registrar_vacinacoes_em_lote(registros, batch_size):
+    """
+    Valida e insere uma lista de vacinações, devolvendo um resultado por registro, na ordem recebida.
+
+    As linhas aceitas são inseridas na sessão atual sem commit, junto com o ajuste das estatísticas;
+    quem chama decide quando confirmar.
+    Duplicatas são detectadas contra _pessoa_vacina_dose_uc tanto no banco quanto dentro do próprio lote.
+    """
+    resultados = [None] * len(registros)
+    validos = []
+    for indice, registro in enumerate(registros):
+        linha, erro = _validar(indice, registro)
+        if erro:
+            resultados[indice] = erro
+        else:
+            validos.append((indice, linha))
+
+    pessoa_ids = {linha['pessoa_id'] for _, linha in validos}
+    pessoas_existentes = _ids_existentes(Pessoa.id, pessoa_ids)
+    nomes_vacinas = _nomes_vacinas({linha['vacina_id'] for _, linha in validos})
+    chaves_registradas = _doses_registradas(pessoas_existentes)
+
+    a_inserir = []
+    for indice, linha in validos:
+        if linha['pessoa_id'] not in pessoas_existentes:
+            resultados[indice] = _erro(indice, 404, "Pessoa não encontrada.")
+            continue
+        vacina_nome = nomes_vacinas.get(linha['vacina_id'])
+        if vacina_nome is None:
+            resultados[indice] = _erro(indice, 404, "Vacina não encontrada.")
+            continue
+        chave = (linha['pessoa_id'], linha['vacina_id'], linha['dose_aplicada'])
+        if chave in chaves_registradas:
+            resultados[indice] = _erro(indice, 409, f"Essa dose ('{linha['dose_aplicada']}') da vacina '{vacina_nome}' já foi registrada para esta pessoa.")
+            continue
+        chaves_registradas.add(chave)
+        a_inserir.append((indice, linha))
+
+    # O RETURNING devolve a chave única junto do id para casar cada id com seu registro sem depender da
+    # ordem das linhas: com sort_by_parameter_order o SQLAlchemy faria um INSERT por linha no SQLite
+    stmt = insert(Vacinacao).returning(Vacinacao.id, Vacinacao.pessoa_id, Vacinacao.vacina_id, Vacinacao.dose_aplicada)
+    for lote in _chunks(a_inserir, batch_size):
+        ids = {
+            (pessoa_id, vacina_id, dose_aplicada): novo_id
+            for novo_id, pessoa_id, vacina_id, dose_aplicada in db.session.execute(stmt, [linha for _, linha in lote])
+        }
+        for indice, linha in lote:
+            novo_id = ids[(linha['pessoa_id'], linha['vacina_id'], linha['dose_aplicada'])]
+            resultados[indice] = {"indice": indice, "status": 201, "id": novo_id}
+
+    estatisticas.ajustar(estatisticas.contagens(linha for _, linha in a_inserir))
+    return resultados
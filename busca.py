@@ -0,0 +1,76 @@
+# cartao_vacinacao_api/busca.py
+# Busca textual de pessoas (GET /pessoas/search) sobre um índice FTS5 do SQLite.
+# pessoas_fts é uma tabela virtual de conteúdo externo (content='pessoas'): guarda só o índice
+# invertido de nome e numero_identificacao, e os gatilhos abaixo o mantêm em sincronia com
+# qualquer escrita em pessoas, inclusive INSERTs em lote e exclusões feitas fora do ORM.
+# O tokenizador unicode61 com remove_diacritics 2 ignora acentos ("joao" encontra "João"),
+# e os índices de prefixo de 2 e 3 caracteres deixam as buscas por prefixo ("jo*") rápidas.
+import re
+
+from sqlalchemy import column, table, text
+
+from models import db
+
+FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pessoas_fts USING fts5(
+        nome, numero_identificacao,
+        content='pessoas', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS pessoas_fts_ai AFTER INSERT ON pessoas BEGIN
+        INSERT INTO pessoas_fts(rowid, nome, numero_identificacao) VALUES (new.id, new.nome, new.numero_identificacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pessoas_fts_ad AFTER DELETE ON pessoas BEGIN
+        INSERT INTO pessoas_fts(pessoas_fts, rowid, nome, numero_identificacao)
+        VALUES ('delete', old.id, old.nome, old.numero_identificacao);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pessoas_fts_au AFTER UPDATE OF nome, numero_identificacao ON pessoas BEGIN
+        INSERT INTO pessoas_fts(pessoas_fts, rowid, nome, numero_identificacao)
+        VALUES ('delete', old.id, old.nome, old.numero_identificacao);
+        INSERT INTO pessoas_fts(rowid, nome, numero_identificacao) VALUES (new.id, new.nome, new.numero_identificacao);
+    END""",
+)
+
+# Tabela virtual para montar as consultas (a coluna oculta com o nome da tabela recebe o MATCH)
+pessoas_fts = table('pessoas_fts', column('rowid'), column('rank'), column('pessoas_fts'))
+
+# Termos da busca: sequências de letras/dígitos (o resto é separador, como no tokenizador)
+TERMO = re.compile(r'\w+')
+
+
+def criar_indice_busca():
+    """
+    Cria o índice FTS5 e os gatilhos, se ainda não existirem (só no SQLite).
+
+    Quando o índice é criado num banco que já tem pessoas, ele é preenchido a partir da tabela.
+    Retorna True se o índice foi criado agora.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    existia = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pessoas_fts'")
+    ).first() is not None
+    for ddl in FTS_DDL:
+        db.session.execute(text(ddl))
+    if not existia:
+        reconstruir_indice_busca(commit=False)
+    db.session.commit()
+    return not existia
+
+
+def reconstruir_indice_busca(commit=True):
+    """Refaz o índice inteiro a partir de pessoas (comando 'rebuild' do FTS5)."""
+    db.session.execute(text("INSERT INTO pessoas_fts(pessoas_fts) VALUES ('rebuild')"))
+    if commit:
+        db.session.commit()
+
+
+def expressao_busca(q):
+    """
+    Converte o texto digitado numa expressão MATCH segura: cada termo vira uma busca por prefixo
+    entre aspas ("jo"* "silva"*), exigindo todos os termos. Retorna None se não houver termos.
+    """
+    termos = TERMO.findall(q or '')
+    if not termos:
+        return None
+    return ' '.join(f'"{termo}"*' for termo in termos)
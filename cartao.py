@@ -0,0 +1,301 @@
+# cartao_vacinacao_api/cartao.py
+import threading
+import time
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
+
+from flask import current_app
+
+from catalog import corpo_json, resposta_condicional
+from queries import alteracoes_para_cache_query, cartoes_query, pessoas_por_ids_query, posicao_alteracoes_query
+from replica import primario
+from serializers import CAMPOS_PESSOA, json_bytes
+
+
+def montar_cartao(pessoa, vacinacoes):
+    """
+    Monta o payload de GET /pessoas/<id>/cartao_vacinacao.
+
+    `pessoa` é o dicionário já serializado da pessoa; `vacinacoes` são as linhas de
+    `queries.cartao_query` (id, data e dose da vacinação; nome, id e categoria da vacina),
+    em ordem de aplicação.
+    """
+    vacinas_agrupadas = {}
+    for vacinacao_id, data_aplicacao, dose_aplicada, vacina_nome, vacina_db_id, vacina_categoria in vacinacoes:
+        if vacina_nome not in vacinas_agrupadas:
+            vacinas_agrupadas[vacina_nome] = {
+                "id_vacina": vacina_db_id,
+                "nome_vacina": vacina_nome,
+                "categoria_vacina": vacina_categoria,
+                "doses": []
+            }
+        vacinas_agrupadas[vacina_nome]["doses"].append({
+            "id_vacinacao": vacinacao_id,
+            "data_aplicacao": data_aplicacao.isoformat(),
+            "dose_aplicada": dose_aplicada
+        })
+
+    return {
+        "pessoa": pessoa,
+        "vacinas_registradas": list(vacinas_agrupadas.values())
+    }
+
+
+def montar_cartoes(pessoas, vacinacoes):
+    """
+    Monta os cartões de várias pessoas de uma vez: {pessoa_id: cartão}, cada um no formato de `montar_cartao`.
+
+    `pessoas` são linhas de `queries.pessoas_por_ids_query`; `vacinacoes`, as linhas de
+    `queries.cartoes_query`, já ordenadas por pessoa, agrupadas numa única passada.
+    """
+    doses = {
+        pessoa_id: [linha[1:] for linha in linhas]
+        for pessoa_id, linhas in groupby(vacinacoes, key=itemgetter(0))
+    }
+    return {
+        pessoa[0]: montar_cartao(dict(zip(CAMPOS_PESSOA, pessoa)), doses.get(pessoa[0], ()))
+        for pessoa in pessoas
+    }
+
+
+def _guardar_cartao(pessoa_id, cartao, versao_cache):
+    """Serializa o cartão e o guarda no cache. Retorna (body, etag)."""
+    body, etag = corpo_json(cartao)
+    vacina_ids = {vacina["id_vacina"] for vacina in cartao["vacinas_registradas"]}
+    vacinacao_ids = {dose["id_vacinacao"] for vacina in cartao["vacinas_registradas"] for dose in vacina["doses"]}
+    cartao_cache.set(pessoa_id, body, etag, vacina_ids, versao_cache, vacinacao_ids)
+    return body, etag
+
+
+def corpo_cartoes(pessoa_ids):
+    """
+    Corpo de POST /cartoes/batch: {"cartoes": {pessoa_id: cartão}, "nao_encontrados": [ids]}.
+
+    Os cartões em cache são reaproveitados; os demais saem de duas consultas, independentemente
+    de quantas pessoas forem (pessoas e vacinações com IN), e entram no cache. O corpo é montado
+    juntando os JSON já serializados de cada cartão, em ordem crescente de pessoa_id.
+    """
+    cartao_cache.sincronizar()
+    corpos = {}
+    faltando = []
+    for pessoa_id in pessoa_ids:
+        cached = cartao_cache.get(pessoa_id)
+        if cached is None:
+            faltando.append(pessoa_id)
+        else:
+            corpos[pessoa_id] = cached[0]
+
+    if faltando:
+        versao_cache = cartao_cache.versao
+        with primario(cartao_cache.ativo): # Os cartões vão para o cache: não podem vir de uma réplica atrasada
+            pessoas = pessoas_por_ids_query(faltando).all()
+            vacinacoes = cartoes_query([pessoa[0] for pessoa in pessoas]).all() if pessoas else []
+        for pessoa_id, cartao in montar_cartoes(pessoas, vacinacoes).items():
+            corpos[pessoa_id] = _guardar_cartao(pessoa_id, cartao, versao_cache)[0]
+
+    nao_encontrados = sorted(set(pessoa_ids) - corpos.keys())
+    cartoes = b','.join(b'"%d":%s' % (pessoa_id, corpos[pessoa_id].rstrip(b'\n')) for pessoa_id in sorted(corpos))
+    return b'{"cartoes":{' + cartoes + b'},"nao_encontrados":' + json_bytes(nao_encontrados).rstrip(b'\n') + b'}\n'
+
+
+def resposta_cartao_em_cache(pessoa_id):
+    """
+    Resposta de GET /pessoas/<id>/cartao_vacinacao servida do cache, ou None se não houver.
+    Chame antes `cartao_cache.sincronizar` (ou `sincronizar_async`).
+    """
+    cached = cartao_cache.get(pessoa_id)
+    if cached is None:
+        return None
+    body, etag = cached
+    response = resposta_condicional(body, etag, private=True)
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+
+def resposta_cartao(pessoa_id, pessoa, vacinacoes, versao_cache):
+    """
+    Monta, guarda no cache e responde o cartão a partir da linha de `queries.pessoa_query` e das
+    linhas de `queries.cartao_query`. `versao_cache` é `cartao_cache.versao` capturada antes das consultas.
+    """
+    body, etag = _guardar_cartao(pessoa_id, montar_cartao(dict(zip(CAMPOS_PESSOA, pessoa)), vacinacoes), versao_cache)
+
+    response = resposta_condicional(body, etag, private=True)
+    response.headers['X-Cache'] = 'MISS'
+    return response
+
+
+class _EstadoCartaoCache:
+    def __init__(self, capacidade, ttl):
+        self.lock = threading.Lock()
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.entradas = OrderedDict() # pessoa_id -> (body, etag, vacina_ids, expira_em, vacinacao_ids), em ordem de uso
+        self.por_vacina = {} # vacina_id -> {pessoa_id}, para invalidar só os cartões que contêm a vacina
+        self.por_vacinacao = {} # vacinacao_id -> pessoa_id, para achar o cartão de uma vacinação excluída
+        self.versao = 0 # Incrementada a cada invalidação
+        self.posicao = None # seq do feed de alterações já aplicado ao cache (None: ainda não lido)
+        self.hits = 0
+        self.misses = 0
+
+
+class CartaoCache:
+    """
+    Cache LRU com TTL dos cartões de vacinação já serializados, por pessoa_id.
+
+    As rotas de escrita invalidam exatamente os cartões afetados: a pessoa da vacinação
+    (add/delete), a pessoa excluída, ou todos os cartões que contêm a vacina excluída.
+
+    As escritas de outros processos (workers do gunicorn, comandos flask) chegam pelo feed de
+    alterações: antes de consultar o cache, a requisição chama `sincronizar`, que lê do primário as
+    linhas de `alteracoes` com seq acima da última aplicada (faixa da chave primária; em geral
+    nenhuma) e invalida as pessoas e vacinas alteradas. Uma vacinação excluída já não diz de quem
+    era: o cartão que a contém é achado pelo id da vacinação. Sem o feed (bancos que não são SQLite), só o TTL (CARTAO_CACHE_TTL)
+    limita a defasagem entre processos.
+    """
+
+    def init_app(self, app):
+        app.extensions['cartao_cache'] = _EstadoCartaoCache(
+            app.config['CARTAO_CACHE_MAX'],
+            app.config['CARTAO_CACHE_TTL']
+        )
+
+    @property
+    def _estado(self):
+        return current_app.extensions['cartao_cache']
+
+    @property
+    def ativo(self):
+        return self._estado.capacidade > 0
+
+    @property
+    def versao(self):
+        """Capture antes de montar um cartão e passe para `set`: se houve invalidação no meio, ele não é guardado."""
+        return self._estado.versao
+
+    def get(self, pessoa_id):
+        estado = self._estado
+        with estado.lock:
+            entrada = estado.entradas.get(pessoa_id)
+            if entrada is None or entrada[3] < time.monotonic():
+                if entrada is not None:
+                    self._remover(estado, pessoa_id)
+                estado.misses += 1
+                return None
+            estado.entradas.move_to_end(pessoa_id)
+            estado.hits += 1
+            return entrada[0], entrada[1]
+
+    def set(self, pessoa_id, body, etag, vacina_ids, versao, vacinacao_ids=()):
+        estado = self._estado
+        if estado.capacidade <= 0:
+            return
+        with estado.lock:
+            if versao != estado.versao:
+                return
+            self._remover(estado, pessoa_id)
+            estado.entradas[pessoa_id] = (body, etag, frozenset(vacina_ids), time.monotonic() + estado.ttl, frozenset(vacinacao_ids))
+            for vacina_id in vacina_ids:
+                estado.por_vacina.setdefault(vacina_id, set()).add(pessoa_id)
+            for vacinacao_id in vacinacao_ids:
+                estado.por_vacinacao[vacinacao_id] = pessoa_id
+            while len(estado.entradas) > estado.capacidade:
+                self._remover(estado, next(iter(estado.entradas)))
+
+    def _remover(self, estado, pessoa_id):
+        entrada = estado.entradas.pop(pessoa_id, None)
+        if entrada is None:
+            return
+        for vacina_id in entrada[2]:
+            pessoas = estado.por_vacina.get(vacina_id)
+            if pessoas is not None:
+                pessoas.discard(pessoa_id)
+                if not pessoas:
+                    del estado.por_vacina[vacina_id]
+        for vacinacao_id in entrada[4]:
+            estado.por_vacinacao.pop(vacinacao_id, None)
+
+    def invalidate_pessoas(self, pessoa_ids):
+        estado = self._estado
+        with estado.lock:
+            estado.versao += 1
+            for pessoa_id in pessoa_ids:
+                self._remover(estado, pessoa_id)
+
+    def invalidate_pessoa(self, pessoa_id):
+        self.invalidate_pessoas((pessoa_id,))
+
+    def invalidate_vacina(self, vacina_id):
+        estado = self._estado
+        with estado.lock:
+            estado.versao += 1
+            for pessoa_id in list(estado.por_vacina.get(vacina_id, ())):
+                self._remover(estado, pessoa_id)
+
+    def sincronizar(self):
+        """Aplica ao cache as alterações do feed ainda não vistas por este processo. Uma consulta."""
+        estado = self._estado
+        if estado.capacidade <= 0:
+            return
+        with primario(): # Os cartões em cache são montados a partir do primário
+            if estado.posicao is None:
+                self._posicionar(estado, posicao_alteracoes_query().scalar())
+            else:
+                self._aplicar(estado, alteracoes_para_cache_query(estado.posicao, estado.capacidade + 1).all())
+
+    async def sincronizar_async(self, sessao):
+        """Como `sincronizar`, mas lê o feed pela AsyncSession `sessao` (rotas de async_api)."""
+        estado = self._estado
+        if estado.capacidade <= 0:
+            return
+        if estado.posicao is None:
+            self._posicionar(estado, (await sessao.execute(posicao_alteracoes_query().statement)).scalar())
+        else:
+            consulta = alteracoes_para_cache_query(estado.posicao, estado.capacidade + 1)
+            self._aplicar(estado, (await sessao.execute(consulta.statement)).all())
+
+    @staticmethod
+    def _posicionar(estado, posicao):
+        # Primeira leitura do feed: o cache ainda está vazio, nada a invalidar
+        with estado.lock:
+            if estado.posicao is None:
+                estado.posicao = posicao
+
+    def _aplicar(self, estado, alteracoes):
+        if not alteracoes:
+            return
+        with estado.lock:
+            # Outra thread pode ter aplicado parte das linhas enquanto estas eram lidas
+            alteracoes = [alteracao for alteracao in alteracoes if alteracao[0] > estado.posicao]
+            if not alteracoes:
+                return
+            estado.versao += 1
+            estado.posicao = alteracoes[-1][0]
+            if len(alteracoes) > estado.capacidade: # Mais alterações do que o cache comporta: esvazia
+                estado.entradas.clear()
+                estado.por_vacina.clear()
+                estado.por_vacinacao.clear()
+                return
+            for _, tabela, registro_id, pessoa_id in alteracoes:
+                if tabela == 'pessoas':
+                    self._remover(estado, registro_id)
+                elif tabela == 'vacinas':
+                    for afetada in list(estado.por_vacina.get(registro_id, ())):
+                        self._remover(estado, afetada)
+                else:
+                    # Vacinação nova ou alterada (pessoa atual) ou excluída (pessoa do cartão que a contém)
+                    self._remover(estado, pessoa_id if pessoa_id is not None else estado.por_vacinacao.get(registro_id))
+
+    def stats(self):
+        estado = self._estado
+        with estado.lock:
+            return {
+                "hits": estado.hits,
+                "misses": estado.misses,
+                "tamanho": len(estado.entradas),
+                "capacidade": estado.capacidade,
+                "ttl": estado.ttl,
+            }
+
+
+cartao_cache = CartaoCache()
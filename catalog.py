@@ -0,0 +1,152 @@
+# cartao_vacinacao_api/catalog.py
+import hashlib
+import threading
+import time
+
+from flask import current_app, request
+
+from queries import posicao_alteracoes_query, vacinas_query
+from replica import primario
+from serializers import CAMPOS_VACINA, json_bytes, linhas_para_dicts
+
+
+class _EstadoCatalogo:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versao = 0
+        self.snapshot = None
+        self.carregado_em = 0.0
+        self.posicao = None # seq do feed de alterações das vacinas quando o snapshot foi carregado
+
+
+class CatalogoVacinas:
+    """
+    Cache em memória (por processo) do catálogo de vacinas já serializado.
+
+    O catálogo só muda por add_vacina/delete_vacina, que chamam `invalidate()`.
+    Cada versão carrega todas as vacinas com uma única consulta e guarda o JSON pronto
+    da lista completa, de cada categoria e de cada vacina, com um ETag forte (hash do corpo).
+    Outros processos não veem a invalidação: a cada uso, o maior seq das vacinas no feed de
+    alterações (uma consulta ao índice único de `alteracoes`, no primário) é comparado com o da
+    carga, e o catálogo é recarregado se mudou. Sem o feed (bancos que não são SQLite), a versão
+    expira após CATALOGO_CACHE_TTL segundos (0 desativa a expiração).
+    O estado fica em `app.extensions`, então cada app criado por create_app() tem o seu.
+    """
+
+    def init_app(self, app):
+        app.extensions['catalogo_vacinas'] = _EstadoCatalogo()
+
+    @property
+    def _estado(self):
+        return current_app.extensions['catalogo_vacinas']
+
+    @property
+    def versao(self):
+        return self._estado.versao
+
+    def invalidate(self):
+        estado = self._estado
+        with estado.lock:
+            estado.versao += 1
+            estado.snapshot = None
+
+    def _serializar(self, dados):
+        return corpo_json(dados)
+
+    def _montar(self, linhas):
+        vacinas = linhas_para_dicts(CAMPOS_VACINA, linhas)
+
+        por_categoria = {}
+        for vacina in vacinas:
+            por_categoria.setdefault(vacina['categoria'], []).append(vacina)
+
+        return {
+            'todas': self._serializar(vacinas),
+            'categorias': {categoria: self._serializar(lista) for categoria, lista in por_categoria.items()},
+            'ids': {vacina['id']: self._serializar(vacina) for vacina in vacinas},
+            'vazia': self._serializar([]),
+            'dados': vacinas,
+            'dados_categorias': por_categoria,
+        }
+
+    def _publicar(self, versao, snapshot, posicao):
+        estado = self._estado
+        with estado.lock:
+            # Uma escrita concorrente invalidou o catálogo durante a carga: não publica dados velhos
+            if versao == estado.versao:
+                estado.snapshot = snapshot
+                estado.carregado_em = time.monotonic()
+                estado.posicao = posicao
+        return snapshot
+
+    def _vigente(self, posicao):
+        """Snapshot publicado, ou None se não houver, se expirou ou se as vacinas mudaram no feed desde a carga."""
+        estado = self._estado
+        snapshot = estado.snapshot
+        ttl = current_app.config.get('CATALOGO_CACHE_TTL', 0)
+        if snapshot is None or posicao != estado.posicao or (ttl and time.monotonic() - estado.carregado_em > ttl):
+            return None
+        return snapshot
+
+    def _atual(self):
+        # Posição e carga vêm do primário: o catálogo fica em memória, não pode vir de uma réplica atrasada
+        with primario():
+            posicao = posicao_alteracoes_query('vacinas').scalar() # Lida antes da carga: na dúvida, recarrega
+            snapshot = self._vigente(posicao)
+            if snapshot is None:
+                versao = self.versao
+                linhas = vacinas_query().all()
+                snapshot = self._publicar(versao, self._montar(linhas), posicao)
+        return snapshot
+
+    async def _atual_async(self, sessao):
+        """Como `_atual`, mas consulta pela AsyncSession `sessao` (rotas de async_api)."""
+        posicao = (await sessao.execute(posicao_alteracoes_query('vacinas').statement)).scalar()
+        snapshot = self._vigente(posicao)
+        if snapshot is None:
+            versao = self.versao
+            linhas = (await sessao.execute(vacinas_query().statement)).all()
+            snapshot = self._publicar(versao, self._montar(linhas), posicao)
+        return snapshot
+
+    @staticmethod
+    def _da_categoria(snapshot, categoria):
+        if categoria:
+            return snapshot['categorias'].get(categoria, snapshot['vazia'])
+        return snapshot['todas']
+
+    def lista(self, categoria=None):
+        return self._da_categoria(self._atual(), categoria)
+
+    async def lista_async(self, sessao, categoria=None):
+        return self._da_categoria(await self._atual_async(sessao), categoria)
+
+    def vacina(self, id):
+        return self._atual()['ids'].get(id)
+
+    def vacinas(self, categoria=None):
+        """Vacinas já serializadas como dicionários (mesma ordem de GET /vacinas). Não devem ser alteradas."""
+        snapshot = self._atual()
+        if categoria:
+            return snapshot['dados_categorias'].get(categoria, [])
+        return snapshot['dados']
+
+
+def corpo_json(dados):
+    """Serializa como o jsonify do app e calcula o ETag forte (hash do corpo)."""
+    body = json_bytes(dados)
+    return body, hashlib.sha256(body).hexdigest()
+
+
+def resposta_condicional(body, etag, private=False):
+    """Monta a resposta JSON com ETag forte, devolvendo 304 quando o If-None-Match confere."""
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # O cliente pode guardar a resposta, mas deve revalidar (If-None-Match) a cada uso
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    return response.make_conditional(request)
+
+
+catalogo_vacinas = CatalogoVacinas()
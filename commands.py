@@ -0,0 +1,318 @@
+# cartao_vacinacao_api/commands.py
+# Comandos de linha de comando (flask <comando>). Toda escrita de inicialização do banco
+# acontece aqui, explicitamente, e não na importação/criação do app.
+import csv
+import time
+
+import click
+from sqlalchemy import bindparam, inspect, insert, select, text, update
+
+import estatisticas
+from alteracoes import criar_feed
+from busca import criar_indice_busca, reconstruir_indice_busca
+from faltosos import CAMPOS_PENDENCIA, SITUACOES, faltosos
+from models import db, Dose, EsquemaDose, EstatisticaVacinacao, Vacina, Vacinacao, DOSES
+
+# Catálogo inicial de vacinas
+VACINAS_INICIAIS = [
+    {"nome": "BCG", "categoria": "Nacional"},
+    {"nome": "HEPATITE B", "categoria": "Nacional"},
+    {"nome": "ANTI-POLIO (SABIN)", "categoria": "Nacional"},
+    {"nome": "TETRA VALENTE", "categoria": "Nacional"},
+    {"nome": "TRIPLICE BACTERIANA (DPT)", "categoria": "Nacional"},
+    {"nome": "HAEMOPHILUS INFLUENZAE", "categoria": "Nacional"},
+    {"nome": "TRIPLICE ACELULAR", "categoria": "Nacional"},
+    {"nome": "PNEUMO 10 VALENTE", "categoria": "Nacional"},
+    {"nome": "MENINGO C", "categoria": "Nacional"},
+    {"nome": "ROTAVIRUS", "categoria": "Nacional"},
+    {"nome": "Anti Rábica Humana", "categoria": "Anti Rábica"},
+    {"nome": "BCG Contato", "categoria": "BCG de Contato"},
+    {"nome": "Gripe Quadrivalente", "categoria": "Vacinas Particulares"},
+    {"nome": "HPV Nonavalente", "categoria": "Vacinas Particulares"},
+    {"nome": "Meningocócica ACWY", "categoria": "Vacinas Particulares"},
+    {"nome": "Febre Amarela (Reforço)", "categoria": "Outra Vacina"},
+    {"nome": "Dengue Qdenga", "categoria": "Outra Vacina"},
+]
+
+# Esquema vacinal inicial de cada vacina: (dose, intervalo mínimo em dias desde a dose anterior)
+ESQUEMAS_INICIAIS = {
+    "BCG": (("Dose Unica", 0),),
+    "HEPATITE B": (("1a Dose", 0), ("2a Dose", 30), ("3a Dose", 150)),
+    "ANTI-POLIO (SABIN)": (("1a Dose", 0), ("2a Dose", 60), ("3a Dose", 60), ("1a Reforco", 180), ("2a Reforco", 1095)),
+    "TETRA VALENTE": (("1a Dose", 0), ("2a Dose", 60), ("3a Dose", 60)),
+    "TRIPLICE BACTERIANA (DPT)": (("1a Reforco", 0), ("2a Reforco", 1095)),
+    "HAEMOPHILUS INFLUENZAE": (("1a Dose", 0), ("2a Dose", 60), ("3a Dose", 60)),
+    "TRIPLICE ACELULAR": (("1a Dose", 0), ("2a Dose", 60), ("3a Dose", 60)),
+    "PNEUMO 10 VALENTE": (("1a Dose", 0), ("2a Dose", 60), ("1a Reforco", 180)),
+    "MENINGO C": (("1a Dose", 0), ("2a Dose", 60), ("1a Reforco", 180)),
+    "ROTAVIRUS": (("1a Dose", 0), ("2a Dose", 60)),
+    "Anti Rábica Humana": (("1a Dose", 0), ("2a Dose", 3), ("3a Dose", 4), ("4a Dose", 7), ("5a Dose", 14)),
+    "BCG Contato": (("Dose Unica", 0),),
+    "Gripe Quadrivalente": (("Dose Unica", 0),),
+    "HPV Nonavalente": (("1a Dose", 0), ("2a Dose", 60), ("3a Dose", 120)),
+    "Meningocócica ACWY": (("Dose Unica", 0),),
+    "Febre Amarela (Reforço)": (("Dose Unica", 0),),
+    "Dengue Qdenga": (("1a Dose", 0), ("2a Dose", 90)),
+}
+
+# Esquema de vacinacoes (e das estatísticas) antes do catálogo de doses
+ESQUEMA_DOSES_TEXTO = (
+    """CREATE TABLE vacinacoes (
+        id INTEGER NOT NULL,
+        pessoa_id INTEGER NOT NULL,
+        vacina_id INTEGER NOT NULL,
+        data_aplicacao DATETIME NOT NULL,
+        dose_aplicada VARCHAR(50) NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT _pessoa_vacina_dose_uc UNIQUE (pessoa_id, vacina_id, dose_aplicada),
+        FOREIGN KEY(pessoa_id) REFERENCES pessoas (id),
+        FOREIGN KEY(vacina_id) REFERENCES vacinas (id)
+    )""",
+    "CREATE INDEX ix_vacinacoes_pessoa_data ON vacinacoes (pessoa_id, data_aplicacao)",
+    "CREATE INDEX ix_vacinacoes_vacina_id ON vacinacoes (vacina_id)",
+    """CREATE TABLE estatisticas_vacinacao (
+        vacina_id INTEGER NOT NULL,
+        dose_aplicada VARCHAR(50) NOT NULL,
+        mes VARCHAR(7) NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (vacina_id, dose_aplicada, mes),
+        FOREIGN KEY(vacina_id) REFERENCES vacinas (id)
+    )""",
+)
+
+
+def init_db():
+    """Cria as tabelas que não existem, os índices que faltam em tabelas já existentes, o índice de busca e o feed de alterações."""
+    db.create_all(bind_key=None) # Só o primário: a réplica recebe o esquema pela replicação
+    # create_all só cria índices junto com tabelas novas; garante os índices em bancos já existentes
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    seed_doses()
+    criar_indice_busca()
+    criar_feed()
+
+
+def seed_doses():
+    """Grava na tabela doses as entradas de models.DOSES que ainda não existem (ids fixos)."""
+    existentes = set(db.session.scalars(select(Dose.id)))
+    novas = [{"id": dose_id, "nome": nome} for dose_id, nome in DOSES.items() if dose_id not in existentes]
+    if novas:
+        db.session.execute(insert(Dose), novas)
+    db.session.commit()
+    return len(novas)
+
+
+def migrar_doses():
+    """
+    Converte um banco em que vacinacoes.dose_aplicada ainda é texto para o esquema com dose_id.
+
+    O SQLite não altera o tipo de uma coluna, então a tabela é reconstruída: a antiga é renomeada,
+    a nova é criada com os índices do modelo e preenchida com um único INSERT ... SELECT que troca
+    o rótulo pelo id do catálogo; depois a antiga é descartada, com seus gatilhos do feed de alterações,
+    recriados por `criar_feed`. A tabela de estatísticas, que também guarda a dose, é recriada e
+    recalculada. Tudo numa transação. Retorna o número de vacinações migradas, ou None se o banco
+    já estiver no esquema novo.
+    """
+    colunas = {coluna['name'] for coluna in inspect(db.engine).get_columns('vacinacoes')}
+    if 'dose_id' in colunas:
+        return None
+
+    seed_doses()
+    desconhecidas = set(db.session.scalars(text(
+        "SELECT DISTINCT dose_aplicada FROM vacinacoes WHERE dose_aplicada NOT IN (SELECT nome FROM doses)"
+    )))
+    if desconhecidas:
+        raise click.ClickException(f"Doses fora do catálogo (models.DOSES): {', '.join(sorted(desconhecidas))}")
+
+    conexao = db.session.connection()
+    conexao.execute(text("ALTER TABLE vacinacoes RENAME TO vacinacoes_texto"))
+    for index in Vacinacao.__table__.indexes:
+        conexao.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    Vacinacao.__table__.create(conexao)
+    migradas = conexao.execute(text(
+        "INSERT INTO vacinacoes (id, pessoa_id, vacina_id, data_aplicacao, dose_id) "
+        "SELECT v.id, v.pessoa_id, v.vacina_id, v.data_aplicacao, d.id "
+        "FROM vacinacoes_texto v JOIN doses d ON d.nome = v.dose_aplicada"
+    )).rowcount
+    conexao.execute(text("DROP TABLE vacinacoes_texto"))
+    EstatisticaVacinacao.__table__.drop(conexao, checkfirst=True)
+    EstatisticaVacinacao.__table__.create(conexao)
+    criar_feed(commit=False) # Gatilhos da nova vacinacoes
+    estatisticas.reconstruir() # Faz o commit de toda a migração
+    return migradas
+
+
+def converter_doses_para_texto():
+    """
+    Inverso de `migrar_doses`: reescreve vacinacoes (e as estatísticas) no esquema antigo, com o
+    rótulo da dose em texto e sem os gatilhos do feed. Serve para montar bancos no formato antigo
+    (testes da migração e benchmarks.bench_doses). Faz commit.
+    """
+    conexao = db.session.connection()
+    conexao.execute(text("ALTER TABLE vacinacoes RENAME TO vacinacoes_ids"))
+    conexao.execute(text("DROP INDEX ix_vacinacoes_pessoa_data"))
+    conexao.execute(text("DROP INDEX ix_vacinacoes_vacina_id"))
+    conexao.execute(text("DROP TABLE estatisticas_vacinacao"))
+    for ddl in ESQUEMA_DOSES_TEXTO:
+        conexao.execute(text(ddl))
+    conexao.execute(text(
+        "INSERT INTO vacinacoes (id, pessoa_id, vacina_id, data_aplicacao, dose_aplicada) "
+        "SELECT v.id, v.pessoa_id, v.vacina_id, v.data_aplicacao, d.nome "
+        "FROM vacinacoes_ids v JOIN doses d ON d.id = v.dose_id"
+    ))
+    conexao.execute(text("DROP TABLE vacinacoes_ids"))
+    db.session.commit()
+
+
+def migrar_cascata():
+    """
+    Recria com ON DELETE CASCADE as tabelas que referenciam pessoas e vacinas, em bancos criados antes
+    das exclusões em cascata pelo banco (o SQLite não altera as restrições de uma tabela existente).
+
+    vacinacoes e esquemas_doses são reconstruídas como em `migrar_doses`: a antiga é renomeada, a nova
+    é criada com o DDL do modelo e preenchida com um INSERT ... SELECT, e a antiga é descartada (com
+    seus gatilhos, recriados por `criar_feed`). estatisticas_vacinacao, derivada de vacinacoes, é
+    recriada e recalculada. Retorna os nomes das tabelas recriadas (vazio se nada mudou).
+    """
+    conexao = db.session.connection()
+    inspetor = inspect(conexao)
+    recriadas = []
+    for tabela in (Vacinacao.__table__, EsquemaDose.__table__, EstatisticaVacinacao.__table__):
+        chaves = [fk for fk in inspetor.get_foreign_keys(tabela.name) if fk['referred_table'] in ('pessoas', 'vacinas')]
+        if all((fk['options'].get('ondelete') or '').upper() == 'CASCADE' for fk in chaves):
+            continue
+        if tabela is EstatisticaVacinacao.__table__:
+            tabela.drop(conexao)
+            tabela.create(conexao)
+        else:
+            antiga = f"{tabela.name}_sem_cascata"
+            conexao.execute(text(f"ALTER TABLE {tabela.name} RENAME TO {antiga}"))
+            for index in tabela.indexes:
+                conexao.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            tabela.create(conexao)
+            colunas = ', '.join(coluna.name for coluna in tabela.columns)
+            conexao.execute(text(f"INSERT INTO {tabela.name} ({colunas}) SELECT {colunas} FROM {antiga}"))
+            conexao.execute(text(f"DROP TABLE {antiga}"))
+        recriadas.append(tabela.name)
+
+    criar_feed() # Gatilhos da nova vacinacoes; faz o commit da migração
+    if EstatisticaVacinacao.__tablename__ in recriadas:
+        estatisticas.reconstruir()
+    return recriadas
+
+
+def seed_vacinas():
+    """
+    Insere as vacinas iniciais que faltam e corrige a categoria das existentes.
+
+    Faz uma única consulta dos nomes já cadastrados e, a partir dela, um INSERT em lote
+    das vacinas novas e um UPDATE em lote das categorias divergentes.
+    Retorna (quantidade inserida, quantidade atualizada).
+    """
+    existentes = dict(db.session.execute(select(Vacina.nome, Vacina.categoria)).all())
+
+    novas = [vacina for vacina in VACINAS_INICIAIS if vacina["nome"] not in existentes]
+    alteradas = [
+        {"b_nome": vacina["nome"], "b_categoria": vacina["categoria"]}
+        for vacina in VACINAS_INICIAIS
+        if vacina["nome"] in existentes and existentes[vacina["nome"]] != vacina["categoria"]
+    ]
+
+    if novas:
+        db.session.execute(insert(Vacina), novas)
+    if alteradas:
+        db.session.execute(
+            update(Vacina.__table__)
+            .where(Vacina.__table__.c.nome == bindparam("b_nome"))
+            .values(categoria=bindparam("b_categoria")),
+            alteradas
+        )
+    db.session.commit()
+    return len(novas), len(alteradas)
+
+
+def seed_esquemas():
+    """
+    Grava o esquema de ESQUEMAS_INICIAIS das vacinas do catálogo que ainda não têm nenhum
+    (esquemas já cadastrados, inclusive alterados manualmente, são mantidos). Retorna quantas vacinas receberam esquema.
+    """
+    com_esquema = set(db.session.scalars(select(EsquemaDose.vacina_id).distinct()))
+    vacinas = db.session.execute(select(Vacina.id, Vacina.nome)).all()
+    passos = [
+        {"vacina_id": vacina_id, "ordem": ordem, "dose_aplicada": dose, "intervalo_dias": intervalo}
+        for vacina_id, nome in vacinas if vacina_id not in com_esquema and nome in ESQUEMAS_INICIAIS
+        for ordem, (dose, intervalo) in enumerate(ESQUEMAS_INICIAIS[nome], 1)
+    ]
+    if passos:
+        db.session.execute(insert(EsquemaDose), passos)
+    db.session.commit()
+    return len({passo["vacina_id"] for passo in passos})
+
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Cria as tabelas e índices do banco de dados."""
+        init_db()
+        click.echo("Banco de dados inicializado.")
+
+    @app.cli.command('seed-vacinas')
+    def seed_vacinas_command():
+        """Popula ou atualiza o catálogo inicial de vacinas e seus esquemas vacinais."""
+        inseridas, atualizadas = seed_vacinas()
+        click.echo(f"Vacinas iniciais: {inseridas} adicionada(s), {atualizadas} com categoria atualizada.")
+        click.echo(f"Esquemas vacinais: {seed_esquemas()} vacina(s) com esquema inicial.")
+
+    @app.cli.command('rebuild-estatisticas')
+    def rebuild_estatisticas_command():
+        """Recalcula do zero a tabela de estatísticas de vacinação."""
+        grupos = estatisticas.reconstruir()
+        click.echo(f"Estatísticas recalculadas: {grupos} grupo(s).")
+
+    @app.cli.command('rebuild-busca')
+    def rebuild_busca_command():
+        """Refaz do zero o índice de busca textual de pessoas."""
+        reconstruir_indice_busca()
+        click.echo("Índice de busca de pessoas reconstruído.")
+
+    @app.cli.command('migrar-doses')
+    @click.option('--vacuum', is_flag=True, help="Executa VACUUM ao final para devolver o espaço liberado ao sistema.")
+    def migrar_doses_command(vacuum):
+        """Converte vacinacoes.dose_aplicada (texto) para dose_id no catálogo de doses."""
+        migradas = migrar_doses()
+        if migradas is None:
+            click.echo("O banco já usa o catálogo de doses; nada a migrar.")
+        else:
+            click.echo(f"{migradas} vacinação(ões) migrada(s) para o catálogo de doses.")
+        if vacuum:
+            # VACUUM não roda dentro de uma transação
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+                conexao.execute(text("VACUUM"))
+            click.echo("VACUUM concluído.")
+
+    @app.cli.command('migrar-cascata')
+    def migrar_cascata_command():
+        """Recria com ON DELETE CASCADE as tabelas que referenciam pessoas e vacinas."""
+        recriadas = migrar_cascata()
+        if recriadas:
+            click.echo(f"Tabelas recriadas com exclusão em cascata: {', '.join(recriadas)}.")
+        else:
+            click.echo("O banco já exclui em cascata; nada a migrar.")
+
+    @app.cli.command('relatorio-faltosos')
+    @click.option('--hoje', type=click.DateTime(formats=['%Y-%m-%d']), help="Data de referência (padrão: hoje).")
+    @click.option('--vacina-id', type=int, help="Só esta vacina.")
+    @click.option('--situacao', type=click.Choice(SITUACOES), help="Só pendentes ou só atrasadas.")
+    @click.option('--saida', type=click.File('w', encoding='utf-8'), default='-', help="Arquivo CSV (padrão: saída padrão).")
+    def relatorio_faltosos_command(hoje, vacina_id, situacao, saida):
+        """Gera em CSV as doses pendentes e atrasadas de toda a população."""
+        inicio = time.perf_counter()
+        escritor = csv.writer(saida, delimiter=';', lineterminator='\n')
+        escritor.writerow(CAMPOS_PENDENCIA)
+        total = 0
+        for pendencia in faltosos(hoje=hoje.date() if hoje else None, tolerancia=app.config['FALTOSOS_TOLERANCIA_DIAS'],
+                                  vacina_id=vacina_id, situacao=situacao, lote=app.config['FALTOSOS_LOTE']):
+            escritor.writerow([pendencia[campo] for campo in CAMPOS_PENDENCIA])
+            total += 1
+        click.echo(f"{total} pendência(s) em {time.perf_counter() - inicio:.1f} s.", err=True)
@@ -0,0 +1,102 @@
+# cartao_vacinacao_api/compressao.py
+# Compressão das respostas dinâmicas (JSON, HTML, texto) acima de COMPRESSAO_MIN_BYTES, conforme o
+# Accept-Encoding do cliente: brotli, se o pacote estiver instalado, ou gzip. Respostas em
+# streaming (exportações CSV) e já codificadas (arquivos de assets.py) passam sem alteração.
+#
+# ETag: a representação comprimida é outra sequência de bytes, então recebe um ETag forte próprio
+# ("<etag>-gzip", como no Apache). Antes da rota, o sufixo é retirado do If-None-Match, para que as
+# rotas continuem comparando com o ETag do corpo sem compressão, e devolvido no ETag do 304.
+import gzip
+import re
+
+from flask import current_app, request
+
+try:
+    import brotli # Opcional: comprime melhor que o gzip no mesmo tempo
+except ImportError:
+    brotli = None
+
+# Sufixo do ETag de cada codificação
+_SUFIXO_ETAG = re.compile(r'-(gzip|br)"')
+# Codificação retirada do If-None-Match, guardada no environ da requisição para o ETag do 304
+_CHAVE_ENVIRON = 'compressao.codificacao_if_none_match'
+
+
+def codificacoes_disponiveis():
+    """Codificações que este processo sabe produzir, na ordem de preferência."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def codificacao_aceita(disponiveis):
+    """A codificação de `disponiveis` que o cliente aceita com maior qualidade (empate: a primeira), ou None."""
+    escolhida, melhor = None, 0
+    for codificacao in disponiveis:
+        qualidade = request.accept_encodings[codificacao]
+        if qualidade > melhor:
+            escolhida, melhor = codificacao, qualidade
+    return escolhida
+
+
+def comprimir(dados, codificacao, nivel):
+    """`dados` comprimidos em 'gzip' (nível 1-9) ou 'br' (qualidade 0-11). Saída determinística (gzip sem mtime)."""
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=nivel)
+    return gzip.compress(dados, compresslevel=nivel, mtime=0)
+
+
+class CompressaoRespostas:
+    """Comprime, no after_request, as respostas elegíveis. Desative com COMPRESSAO_MIN_BYTES=0."""
+
+    def init_app(self, app):
+        if app.config['COMPRESSAO_MIN_BYTES'] <= 0:
+            return
+        app.before_request(self._normalizar_if_none_match)
+        app.after_request(self._comprimir)
+
+    @staticmethod
+    def _normalizar_if_none_match():
+        valor = request.environ.get('HTTP_IF_NONE_MATCH')
+        if valor and '-' in valor:
+            sufixo = _SUFIXO_ETAG.search(valor)
+            if sufixo:
+                request.environ[_CHAVE_ENVIRON] = sufixo.group(1)
+                request.environ['HTTP_IF_NONE_MATCH'] = _SUFIXO_ETAG.sub('"', valor)
+
+    @staticmethod
+    def _elegivel(response, config):
+        return (response.status_code == 200
+                and response.mimetype in config['COMPRESSAO_TIPOS']
+                and not response.is_streamed
+                and 'Content-Encoding' not in response.headers
+                and not response.cache_control.no_transform
+                and (response.content_length or 0) >= config['COMPRESSAO_MIN_BYTES'])
+
+    @staticmethod
+    def _sufixar_etag(response, codificacao):
+        etag, fraco = response.get_etag()
+        if etag and not fraco and not etag.endswith(f"-{codificacao}"):
+            response.set_etag(f"{etag}-{codificacao}")
+
+    def _comprimir(self, response):
+        if response.status_code == 304:
+            # O cliente validou uma representação comprimida: o 304 leva o mesmo ETag que ela
+            codificacao = request.environ.get(_CHAVE_ENVIRON)
+            if codificacao:
+                self._sufixar_etag(response, codificacao)
+            return response
+
+        config = current_app.config
+        if not self._elegivel(response, config):
+            return response
+        response.vary.add('Accept-Encoding')
+        codificacao = codificacao_aceita(codificacoes_disponiveis())
+        if codificacao is None:
+            return response
+        nivel = config['COMPRESSAO_NIVEL_BROTLI'] if codificacao == 'br' else config['COMPRESSAO_NIVEL_GZIP']
+        response.set_data(comprimir(response.get_data(), codificacao, nivel))
+        response.headers['Content-Encoding'] = codificacao
+        self._sufixar_etag(response, codificacao)
+        return response
+
+
+compressao_respostas = CompressaoRespostas()
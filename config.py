@@ -4,4 +4,91 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///cartao_vacinacao.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = os.getenv('SECRET_KEY', 'uma_chave_secreta_para_desenvolvimento_nao_usar_em_producao') # Mudar em produção!
\ No newline at end of file
+
+    # Pool de conexões (bancos em arquivo): conexões mantidas, extras sob pico e espera máxima por uma conexão em segundos
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+
+    # PRAGMAs do SQLite aplicados a cada conexão (valor vazio mantém o padrão do SQLite)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL') # Leitores não bloqueiam o escritor
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL') # Seguro com WAL; fsync só nos checkpoints
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)) # ms esperando o lock de escrita antes de "database is locked"
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)) # bytes lidos por mmap
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000)) # Negativo = KiB de cache de páginas por conexão
+    SQLITE_FOREIGN_KEYS = os.getenv('SQLITE_FOREIGN_KEYS', 'ON') # Exigido pelas exclusões em cascata (ON DELETE CASCADE)
+    SECRET_KEY = os.getenv('SECRET_KEY', 'uma_chave_secreta_para_desenvolvimento_nao_usar_em_producao') # Mudar em produção!
+
+    # Réplica de leitura (replica.py): URI (sem ela, tudo vai ao primário), atraso máximo em alterações do feed antes de
+    # voltar ao primário, intervalo entre verificações do atraso e segundos lendo do primário após uma escrita do cliente
+    DATABASE_REPLICA_URI = os.getenv('DATABASE_REPLICA_URL')
+    REPLICA_MAX_ATRASO = int(os.getenv('REPLICA_MAX_ATRASO', 100))
+    REPLICA_VERIFICACAO_SEGUNDOS = float(os.getenv('REPLICA_VERIFICACAO_SEGUNDOS', 1))
+    REPLICA_LER_PRIMARIO_SEGUNDOS = int(os.getenv('REPLICA_LER_PRIMARIO_SEGUNDOS', 5))
+
+    # Paginação de GET /pessoas (keyset sobre Pessoa.id)
+    PESSOAS_PAGE_SIZE = int(os.getenv('PESSOAS_PAGE_SIZE', 50))
+    PESSOAS_MAX_PAGE_SIZE = int(os.getenv('PESSOAS_MAX_PAGE_SIZE', 200))
+    # GET /pessoas/search: resultados por padrão e no máximo
+    BUSCA_PAGE_SIZE = int(os.getenv('BUSCA_PAGE_SIZE', 20))
+    BUSCA_MAX_PAGE_SIZE = int(os.getenv('BUSCA_MAX_PAGE_SIZE', 100))
+
+    # Catálogo de vacinas em memória: segundos até recarregar (0 = nunca expira). As escritas de outros processos
+    # chegam pelo feed de alterações; sem ele (bancos que não são SQLite), o TTL limita a defasagem
+    CATALOGO_CACHE_TTL = int(os.getenv('CATALOGO_CACHE_TTL', 60))
+
+    # POST /vacinacoes/bulk: máximo de registros por requisição e tamanho de cada INSERT em lote
+    BULK_MAX_REGISTROS = int(os.getenv('BULK_MAX_REGISTROS', 5000))
+    BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 500))
+
+    # Hash de senhas: método completo do werkzeug (algoritmo e custo). Hashes com outros parâmetros são refeitos no login.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Pool dedicado aos hashes: threads, fila máxima (além dela responde 503) e espera máxima em segundos
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_MAX = int(os.getenv('PASSWORD_HASH_QUEUE_MAX', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+    # Cache LRU dos cartões de vacinação por pessoa: número máximo de cartões (0 desativa) e validade em segundos
+    # (as escritas de outros processos chegam pelo feed de alterações; sem ele, o TTL limita a defasagem)
+    CARTAO_CACHE_MAX = int(os.getenv('CARTAO_CACHE_MAX', 10000))
+    CARTAO_CACHE_TTL = int(os.getenv('CARTAO_CACHE_TTL', 300))
+    # POST /cartoes/batch: máximo de pessoas por requisição
+    CARTOES_BATCH_MAX = int(os.getenv('CARTOES_BATCH_MAX', 200))
+
+    # Relatório de faltosos: dias de tolerância após a data prevista, tamanho de página da rota, linhas por lote lido do banco
+    # e vacinações lidas no máximo por requisição da rota (com filtros seletivos, a página volta curta, com o cursor)
+    FALTOSOS_TOLERANCIA_DIAS = int(os.getenv('FALTOSOS_TOLERANCIA_DIAS', 30))
+    FALTOSOS_PAGE_SIZE = int(os.getenv('FALTOSOS_PAGE_SIZE', 100))
+    FALTOSOS_MAX_PAGE_SIZE = int(os.getenv('FALTOSOS_MAX_PAGE_SIZE', 1000))
+    FALTOSOS_LOTE = int(os.getenv('FALTOSOS_LOTE', 10000))
+    FALTOSOS_MAX_LINHAS = int(os.getenv('FALTOSOS_MAX_LINHAS', 100000))
+
+    # GET /changes (feed de alterações): tamanho padrão e máximo da página
+    ALTERACOES_PAGE_SIZE = int(os.getenv('ALTERACOES_PAGE_SIZE', 500))
+    ALTERACOES_MAX_PAGE_SIZE = int(os.getenv('ALTERACOES_MAX_PAGE_SIZE', 5000))
+
+    # Arquivos estáticos (assets.py): minificação na criação do app e validade no navegador dos nomes com hash
+    ASSETS_MINIFICAR = os.getenv('ASSETS_MINIFICAR', '1') == '1'
+    ASSETS_MAX_AGE = int(os.getenv('ASSETS_MAX_AGE', 365 * 24 * 3600))
+    # Compressão das respostas dinâmicas (compressao.py): tamanho mínimo do corpo (0 desativa), níveis e tipos comprimidos
+    COMPRESSAO_MIN_BYTES = int(os.getenv('COMPRESSAO_MIN_BYTES', 1024))
+    COMPRESSAO_NIVEL_GZIP = int(os.getenv('COMPRESSAO_NIVEL_GZIP', 6))
+    COMPRESSAO_NIVEL_BROTLI = int(os.getenv('COMPRESSAO_NIVEL_BROTLI', 4))
+    COMPRESSAO_TIPOS = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+    # Logs JSON (logs.py): arquivo (vazio desativa), nível mínimo, rotação por tamanho, registros aguardando gravação
+    # (além deles, são descartados) e amostragem por classe de aviso (classe=N grava um de cada N)
+    LOG_ARQUIVO = os.getenv('LOG_ARQUIVO', 'error.log')
+    LOG_NIVEL = os.getenv('LOG_NIVEL', 'WARNING')
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', 5))
+    LOG_FILA_MAX = int(os.getenv('LOG_FILA_MAX', 10000))
+    LOG_AMOSTRAGEM = os.getenv('LOG_AMOSTRAGEM', 'validacao=10,hash_indisponivel=10')
+
+    # Cabeçalho Server-Timing (tempo de SQL x Python) em todas as respostas; desative se não quiser expor tempos aos clientes
+    SERVER_TIMING = os.getenv('SERVER_TIMING', '1') == '1'
+
+    # Rotas de leitura assíncronas em /async/... (exige aiosqlite e flask[async]). Sem ASYNC_DATABASE_URI,
+    # usa SQLALCHEMY_DATABASE_URI com o driver assíncrono equivalente (sqlite -> sqlite+aiosqlite)
+    ASYNC_READS = os.getenv('ASYNC_READS', '0') == '1'
+    ASYNC_DATABASE_URI = os.getenv('ASYNC_DATABASE_URL')
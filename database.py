@@ -0,0 +1,103 @@
+# cartao_vacinacao_api/database.py
+# Configuração do engine do banco a partir do Config: pool de conexões para servir com várias
+# threads e, no SQLite, PRAGMAs aplicados a cada nova conexão (WAL, synchronous, busy_timeout,
+# mmap, cache e foreign_keys, que o SQLite deixa desligado e as exclusões em cascata exigem).
+# Com WAL, leitores não bloqueiam o escritor nem são bloqueados por ele, e o busy_timeout faz
+# escritores concorrentes esperarem a vez em vez de falhar com "database is locked".
+# Com DATABASE_REPLICA_URI, cria também o bind 'replica', para onde replica.py encaminha as leituras.
+import os
+import sqlite3
+from functools import partial
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from models import db
+from replica import BIND_REPLICA
+
+# PRAGMAs que não se aplicam a uma conexão somente leitura (réplica)
+PRAGMAS_DE_ESCRITA = ('journal_mode', 'synchronous', 'foreign_keys')
+
+
+def _sqlite_em_arquivo(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+        and not url.database.startswith('file::memory:')
+
+
+def pragmas_sqlite(config):
+    """PRAGMAs aplicados a cada conexão SQLite, na ordem de execução (valores vazios/None são ignorados)."""
+    pragmas = [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+        ('foreign_keys', config['SQLITE_FOREIGN_KEYS']),
+    ]
+    return [(nome, valor) for nome, valor in pragmas if valor not in (None, '')]
+
+
+def _aplicar_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for nome, valor in pragmas:
+            cursor.execute(f"PRAGMA {nome}={valor}")
+    finally:
+        cursor.close()
+
+
+def _opcoes_replica(app, uri):
+    """
+    Opções do bind da réplica. Uma réplica SQLite em arquivo é aberta somente leitura (mode=ro): escritas
+    falham e um arquivo ausente não é criado vazio, o que a faria parecer disponível.
+    """
+    if not _sqlite_em_arquivo(uri):
+        return {'url': uri}
+    caminho = make_url(uri).database
+    if not os.path.isabs(caminho): # Mesma regra do Flask-SQLAlchemy para caminhos relativos
+        caminho = os.path.join(app.instance_path, caminho)
+    caminho = 'file:' + caminho + '?mode=ro'
+    return {'url': uri, 'creator': lambda: sqlite3.connect(caminho, uri=True, check_same_thread=False)}
+
+
+def init_app(app):
+    """
+    Associa o `db` ao app com as opções de engine do Config.
+
+    Substitui `db.init_app(app)`: as opções de pool precisam estar no config antes de o
+    Flask-SQLAlchemy criar os engines, e os PRAGMAs são registrados logo depois.
+    Bancos SQLite em memória mantêm o pool padrão (uma única conexão compartilhada) e só
+    recebem os PRAGMAs que fazem sentido sem arquivo.
+    """
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not uri.startswith('sqlite') or _sqlite_em_arquivo(uri):
+        opcoes = {
+            'pool_size': app.config['DB_POOL_SIZE'],
+            'max_overflow': app.config['DB_MAX_OVERFLOW'],
+            'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        }
+        # Opções definidas explicitamente no config têm precedência
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**opcoes, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+
+    replica = app.config['DATABASE_REPLICA_URI']
+    if replica:
+        app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}), BIND_REPLICA: _opcoes_replica(app, replica)}
+
+    db.init_app(app)
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            registrar_pragmas(engine, app.config, somente_leitura=bind == BIND_REPLICA)
+
+
+def registrar_pragmas(engine, config, somente_leitura=False):
+    """Aplica os PRAGMAs do config a cada nova conexão de `engine`, se for SQLite (síncrono ou `async_engine.sync_engine`)."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = pragmas_sqlite(config)
+    if not _sqlite_em_arquivo(str(engine.url)):
+        pragmas = [(nome, valor) for nome, valor in pragmas if nome not in ('journal_mode', 'mmap_size')]
+    if somente_leitura:
+        pragmas = [(nome, valor) for nome, valor in pragmas if nome not in PRAGMAS_DE_ESCRITA]
+    event.listen(engine, 'connect', partial(_aplicar_pragmas, pragmas))
@@ -0,0 +1,143 @@
+# cartao_vacinacao_api/estatisticas.py
+# Cobertura vacinal pré-agregada: a tabela estatisticas_vacinacao guarda quantas doses foram
+# aplicadas por (vacina, dose, mês). As rotas de escrita ajustam as contagens na mesma transação
+# em que gravam ou excluem vacinações, então GET /estatisticas custa O(grupos), não O(vacinações).
+# As contagens de uma vacina excluída saem junto com ela (ON DELETE CASCADE).
+# A categoria vem da junção com vacinas (poucas linhas), para acompanhar mudanças no catálogo.
+# `flask rebuild-estatisticas` recalcula a tabela inteira a partir de vacinacoes.
+import re
+from collections import Counter
+
+from sqlalchemy import String, cast, delete, func, insert, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, EstatisticaVacinacao, Vacina, Vacinacao
+
+# Dimensões aceitas em `agrupar` (GET /estatisticas) e a coluna de cada uma
+DIMENSOES = {
+    'vacina': (Vacina.id.label('vacina_id'), Vacina.nome.label('nome_vacina')),
+    'categoria': (Vacina.categoria.label('categoria'),),
+    'dose': (EstatisticaVacinacao.dose_aplicada.label('dose_aplicada'),),
+    'mes': (EstatisticaVacinacao.mes.label('mes'),),
+}
+
+FORMATO_MES = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+# Dialetos com INSERT ... ON CONFLICT DO UPDATE; nos demais, `ajustar` faz UPDATE por grupo e INSERT dos novos
+INSERTS_COM_UPSERT = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+
+def mes_de(data_aplicacao):
+    """Chave do mês ('AAAA-MM') de uma data de aplicação."""
+    return data_aplicacao.strftime('%Y-%m')
+
+
+def contagens(vacinacoes, sinal=1):
+    """Counter {(vacina_id, dose_aplicada, mês): ±n} de vacinações (objetos ou dicts com as mesmas chaves)."""
+    deltas = Counter()
+    for vacinacao in vacinacoes:
+        if isinstance(vacinacao, dict):
+            chave = (vacinacao['vacina_id'], vacinacao['dose_aplicada'], mes_de(vacinacao['data_aplicacao']))
+        else:
+            chave = (vacinacao.vacina_id, vacinacao.dose_aplicada, mes_de(vacinacao.data_aplicacao))
+        deltas[chave] += sinal
+    return deltas
+
+
+def ajustar(deltas):
+    """
+    Soma `deltas` ({(vacina_id, dose_aplicada, mês): ±n}) às contagens, na sessão atual e sem commit.
+
+    Um único upsert em lote (INSERT ... ON CONFLICT DO UPDATE) no SQLite e no PostgreSQL; nos demais
+    bancos, um UPDATE por grupo e um INSERT dos grupos que ainda não existiam. Se alguma contagem
+    diminuiu, um DELETE dos grupos que chegaram a zero.
+    """
+    linhas = [
+        {"vacina_id": vacina_id, "dose_aplicada": dose, "mes": mes, "total": delta}
+        for (vacina_id, dose, mes), delta in deltas.items() if delta
+    ]
+    if not linhas:
+        return
+    insert_dialeto = INSERTS_COM_UPSERT.get(db.engine.dialect.name)
+    if insert_dialeto is not None:
+        stmt = insert_dialeto(EstatisticaVacinacao)
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[EstatisticaVacinacao.vacina_id, EstatisticaVacinacao.dose_aplicada, EstatisticaVacinacao.mes],
+                set_={"total": EstatisticaVacinacao.total + stmt.excluded.total}
+            ),
+            linhas
+        )
+    else:
+        novas = [linha for linha in linhas if not db.session.execute(
+            update(EstatisticaVacinacao)
+            .where(EstatisticaVacinacao.vacina_id == linha["vacina_id"],
+                   EstatisticaVacinacao.dose_aplicada == linha["dose_aplicada"],
+                   EstatisticaVacinacao.mes == linha["mes"])
+            .values(total=EstatisticaVacinacao.total + linha["total"])
+        ).rowcount]
+        if novas:
+            db.session.execute(insert(EstatisticaVacinacao), novas)
+    if any(linha["total"] < 0 for linha in linhas):
+        db.session.execute(delete(EstatisticaVacinacao).where(EstatisticaVacinacao.total <= 0))
+
+
+def _agregado(*criterios):
+    """SELECT (vacina_id, dose, mês, quantidade) das vacinações que satisfazem `criterios`, agrupado no banco."""
+    # 'AAAA-MM' sem funções de data de um só banco; posições literais, para o GROUP BY repetir a expressão exata
+    mes = func.substr(cast(Vacinacao.data_aplicacao, String), literal_column('1'), literal_column('7'))
+    return select(Vacinacao.vacina_id, Vacinacao.dose_aplicada, mes, func.count())\
+        .where(*criterios)\
+        .group_by(Vacinacao.vacina_id, Vacinacao.dose_aplicada, mes)
+
+
+def descontar(*criterios):
+    """
+    Desconta as vacinações que satisfazem `criterios` (ex.: Vacinacao.pessoa_id == 1) antes de uma
+    exclusão em lote: uma consulta agrupada no banco, sem carregar as vacinações, e `ajustar`.
+    """
+    ajustar({(vacina_id, dose, mes): -total for vacina_id, dose, mes, total in db.session.execute(_agregado(*criterios))})
+
+
+def reconstruir():
+    """Recalcula a tabela inteira a partir de vacinacoes (um DELETE e um INSERT ... SELECT). Faz commit."""
+    db.session.execute(delete(EstatisticaVacinacao))
+    db.session.execute(
+        insert(EstatisticaVacinacao).from_select(
+            [EstatisticaVacinacao.vacina_id, EstatisticaVacinacao.dose_aplicada, EstatisticaVacinacao.mes, EstatisticaVacinacao.total],
+            _agregado()
+        )
+    )
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(EstatisticaVacinacao))
+
+
+def consultar(agrupar, vacina_id=None, categoria=None, dose_aplicada=None, de=None, ate=None):
+    """
+    Total de doses por grupo, a partir da tabela pré-agregada.
+
+    `agrupar` é uma sequência de chaves de DIMENSOES (vazia = total geral); os filtros são opcionais
+    e `de`/`ate` são meses 'AAAA-MM', inclusivos. Retorna uma lista de dicionários ordenada pelos grupos.
+    """
+    colunas = [coluna for dimensao in agrupar for coluna in DIMENSOES[dimensao]]
+    query = select(*colunas, func.sum(EstatisticaVacinacao.total).label('total'))\
+        .select_from(EstatisticaVacinacao)\
+        .join(Vacina, Vacina.id == EstatisticaVacinacao.vacina_id)
+    if vacina_id is not None:
+        query = query.where(EstatisticaVacinacao.vacina_id == vacina_id)
+    if categoria:
+        query = query.where(Vacina.categoria == categoria)
+    if dose_aplicada:
+        query = query.where(EstatisticaVacinacao.dose_aplicada == dose_aplicada)
+    if de:
+        query = query.where(EstatisticaVacinacao.mes >= de)
+    if ate:
+        query = query.where(EstatisticaVacinacao.mes <= ate)
+    if colunas:
+        query = query.group_by(*colunas).order_by(*colunas)
+
+    return [
+        {**linha._asdict(), "total": linha.total or 0}
+        for linha in db.session.execute(query)
+    ]
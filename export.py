@@ -0,0 +1,99 @@
+# cartao_vacinacao_api/export.py
+# Exportação CSV dos cartões de vacinação no mesmo layout "dose × vacina" (separado por ';')
+# gerado por exportCartaoVacinacaoToCsv em static/script.js. As linhas são lidas do banco
+# em blocos (yield_per) e escritas conforme chegam, então a memória não cresce com o volume.
+from itertools import groupby
+
+from sqlalchemy import select
+
+from models import db, Pessoa, Vacinacao
+
+# Linhas do cartão, na ordem exibida pelo frontend
+DOSES_CARTAO = (
+    "1a Dose", "2a Dose", "3a Dose",
+    "1a Reforco", "2a Reforco",
+    "Dose Unica", "BCG", "Faltoso", "4a Dose", "5a Dose"
+)
+
+ROTULOS_DOSE_CSV = {
+    "1a Dose": "Tipo 1ª Dose",
+    "2a Dose": "Tipo 2ª Dose",
+    "3a Dose": "Tipo 3ª Dose",
+    "1a Reforco": "Tipo 1º Reforço",
+    "2a Reforco": "Tipo 2º Reforço",
+    "Dose Unica": "Dose Única",
+}
+
+# Quantidade de linhas buscadas do cursor por vez
+EXPORT_YIELD_PER = 1000
+
+
+def _aspas(valor):
+    return '"{}"'.format(str(valor).replace('"', '""'))
+
+
+def _celula(dose_aplicada, data_aplicacao):
+    if dose_aplicada == 'Faltoso':
+        return 'Faltoso'
+    return f"Aplicada: {data_aplicacao.strftime('%d/%m/%Y')}"
+
+
+def cartao_csv(pessoa, doses, vacinas):
+    """
+    Monta o CSV do cartão de uma pessoa.
+
+    `pessoa` é (id, nome, numero_identificacao); `doses` é um iterável de
+    (vacina_id, dose_aplicada, data_aplicacao); `vacinas` são as colunas (dicts com id e nome).
+    """
+    celulas = {}
+    for vacina_id, dose_aplicada, data_aplicacao in doses:
+        # Como no frontend, vale a primeira dose encontrada para cada (vacina, tipo de dose)
+        celulas.setdefault((vacina_id, dose_aplicada), _celula(dose_aplicada, data_aplicacao))
+
+    linhas = ["Dose/Vacina" + "".join(f";{_aspas(vacina['nome'])}" for vacina in vacinas)]
+    for dose in DOSES_CARTAO:
+        linha = _aspas(ROTULOS_DOSE_CSV.get(dose, dose))
+        linha += "".join(f";{_aspas(celulas.get((vacina['id'], dose), ''))}" for vacina in vacinas)
+        linhas.append(linha)
+
+    pessoa_id, nome, numero_identificacao = pessoa
+    linhas += [
+        "",
+        "Informações da Pessoa;",
+        f"Nome;{nome}",
+        f"ID;{pessoa_id}",
+        f"Identificação;{numero_identificacao}",
+    ]
+    return "\n".join(linhas) + "\n"
+
+
+def gerar_csv_pessoa(pessoa, vacinas):
+    """Gera o CSV do cartão de uma pessoa (já carregada)."""
+    doses = db.session.execute(
+        select(Vacinacao.vacina_id, Vacinacao.dose_aplicada, Vacinacao.data_aplicacao)
+        .where(Vacinacao.pessoa_id == pessoa.id)
+        .order_by(Vacinacao.data_aplicacao.asc())
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+    yield cartao_csv((pessoa.id, pessoa.nome, pessoa.numero_identificacao), doses, vacinas)
+
+
+def gerar_csv_populacao(vacinas):
+    """
+    Gera os cartões de todas as pessoas com vacinações registradas, um bloco por pessoa,
+    separados por uma linha em branco. As vacinações são percorridas em ordem de pessoa_id
+    (índice ix_vacinacoes_pessoa_data), então só o cartão corrente fica em memória.
+    """
+    linhas = db.session.execute(
+        select(Vacinacao.pessoa_id, Pessoa.nome, Pessoa.numero_identificacao,
+               Vacinacao.vacina_id, Vacinacao.dose_aplicada, Vacinacao.data_aplicacao)
+        .join(Pessoa, Pessoa.id == Vacinacao.pessoa_id)
+        .order_by(Vacinacao.pessoa_id.asc(), Vacinacao.data_aplicacao.asc())
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+    primeiro = True
+    for pessoa, doses in groupby(linhas, key=lambda linha: (linha[0], linha[1], linha[2])):
+        if not primeiro:
+            yield "\n"
+        primeiro = False
+        yield cartao_csv(pessoa, (linha[3:] for linha in doses), vacinas)
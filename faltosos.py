@@ -0,0 +1,153 @@
+# cartao_vacinacao_api/faltosos.py
+# Relatório de doses pendentes e atrasadas ("faltosos") de toda a população, a partir do
+# esquema vacinal de cada vacina (models.EsquemaDose).
+#
+# Para cada pessoa e vacina com o esquema iniciado, a próxima dose é a que segue a dose mais
+# adiantada já aplicada; a data prevista é a aplicação dessa dose mais o intervalo mínimo do passo
+# seguinte. A dose está "pendente" até a data prevista mais a tolerância e "atrasada" depois disso.
+# Registros "Faltoso" e doses fora do esquema não contam como aplicadas. Pessoas que nunca
+# receberam nenhuma dose de uma vacina não aparecem: a API não guarda a data de nascimento.
+#
+# As vacinações são lidas em streaming, em ordem de pessoa_id (índice ix_vacinacoes_pessoa_data),
+# em lotes de FALTOSOS_LOTE linhas; só o progresso da pessoa corrente fica em memória. As datas já
+# chegam do SQLite como número do dia (ordinal do calendário), então toda a aritmética de datas
+# é soma e comparação de inteiros.
+from datetime import date, datetime
+
+from sqlalchemy import Integer, cast, func, select, type_coerce
+
+from models import db, EsquemaDose, Vacinacao, DOSE_IDS
+
+SITUACOES = ('pendente', 'atrasada')
+
+# Colunas de cada pendência, na ordem do CSV de `flask relatorio-faltosos`
+CAMPOS_PENDENCIA = ('pessoa_id', 'vacina_id', 'ultima_dose', 'data_ultima_dose', 'proxima_dose',
+                    'data_prevista', 'dias_atraso', 'situacao')
+
+# julianday('0001-01-01') - date(1, 1, 1).toordinal(): converte o dia juliano no ordinal do Python
+_DESLOCAMENTO_JULIANO = 1721424.5
+
+
+class _Esquema:
+    __slots__ = ('doses', 'intervalos', 'passos')
+
+    def __init__(self):
+        self.doses = [] # Rótulo de cada passo, em ordem
+        self.intervalos = [] # Intervalo mínimo de cada passo desde o anterior
+        self.passos = {} # dose_id -> índice do passo
+
+
+def carregar_esquemas(vacina_id=None):
+    """{vacina_id: _Esquema} a partir de esquemas_doses (uma consulta)."""
+    query = select(EsquemaDose.vacina_id, EsquemaDose.dose_aplicada, EsquemaDose.intervalo_dias)\
+        .order_by(EsquemaDose.vacina_id, EsquemaDose.ordem)
+    if vacina_id is not None:
+        query = query.where(EsquemaDose.vacina_id == vacina_id)
+    esquemas = {}
+    for vacina, dose, intervalo in db.session.execute(query):
+        esquema = esquemas.setdefault(vacina, _Esquema())
+        esquema.passos[DOSE_IDS[dose]] = len(esquema.doses)
+        esquema.doses.append(dose)
+        esquema.intervalos.append(intervalo)
+    return esquemas
+
+
+def vacinacoes_query(apos=None):
+    """
+    (pessoa_id, vacina_id, dose_id, dia) de todas as vacinações em ordem de pessoa_id, com o dia de
+    aplicação como ordinal do calendário. Sem filtro por vacina, para que o SQLite percorra o índice
+    (pessoa_id, data_aplicacao) na ordem pedida em vez de ordenar a tabela.
+    """
+    dia = cast(func.julianday(func.date(Vacinacao.data_aplicacao)) - _DESLOCAMENTO_JULIANO, Integer)
+    query = select(Vacinacao.pessoa_id, Vacinacao.vacina_id, type_coerce(Vacinacao.dose_aplicada, Integer), dia)\
+        .order_by(Vacinacao.pessoa_id)
+    if apos is not None:
+        query = query.where(Vacinacao.pessoa_id > apos)
+    return query
+
+
+def _pendencias(pessoa_id, progresso, esquemas, hoje, tolerancia, situacao):
+    for vacina_id, (passo, dia) in sorted(progresso.items()):
+        esquema = esquemas[vacina_id]
+        if passo + 1 >= len(esquema.doses):
+            continue # Esquema completo
+        prevista = dia + esquema.intervalos[passo + 1]
+        atraso = hoje - prevista
+        estado = 'atrasada' if atraso > tolerancia else 'pendente'
+        if situacao and estado != situacao:
+            continue
+        yield {
+            "pessoa_id": pessoa_id,
+            "vacina_id": vacina_id,
+            "ultima_dose": esquema.doses[passo],
+            "data_ultima_dose": date.fromordinal(dia).isoformat(),
+            "proxima_dose": esquema.doses[passo + 1],
+            "data_prevista": date.fromordinal(prevista).isoformat(),
+            "dias_atraso": max(atraso, 0),
+            "situacao": estado,
+        }
+
+
+def faltosos(hoje=None, tolerancia=0, vacina_id=None, situacao=None, apos=None, lote=10000, max_linhas=None):
+    """
+    Gera as pendências (dicionários) de todas as pessoas com pessoa_id > `apos`, em ordem de
+    pessoa_id e, dentro da pessoa, de vacina_id. `hoje` é a data de referência (padrão: hoje, UTC);
+    `tolerancia` são os dias depois da data prevista em que a dose ainda conta como pendente.
+
+    Com `max_linhas`, para de ler vacinações na primeira troca de pessoa depois de lidas `max_linhas`
+    linhas e retorna (valor de StopIteration) o pessoa_id da última pessoa examinada; sem o limite,
+    ou ao chegar ao fim da tabela, retorna None.
+    """
+    hoje = (hoje or datetime.utcnow().date()).toordinal()
+    esquemas = carregar_esquemas(vacina_id)
+    if not esquemas:
+        return
+
+    # Direto na conexão (Core): sem a camada de resultados do ORM, que custa ~40% a mais por linha
+    linhas = db.session.connection().execute(vacinacoes_query(apos).execution_options(yield_per=lote))
+    pessoa_atual = None
+    progresso = {} # vacina_id -> (passo mais adiantado aplicado, dia da aplicação)
+    lidas = 0
+    for particao in linhas.partitions():
+        for pessoa_id, vacina, dose_id, dia in particao:
+            if pessoa_id != pessoa_atual:
+                if progresso:
+                    yield from _pendencias(pessoa_atual, progresso, esquemas, hoje, tolerancia, situacao)
+                    progresso = {}
+                if max_linhas is not None and lidas >= max_linhas:
+                    linhas.close()
+                    return pessoa_atual
+                pessoa_atual = pessoa_id
+            lidas += 1
+            esquema = esquemas.get(vacina)
+            if esquema is None:
+                continue
+            passo = esquema.passos.get(dose_id)
+            if passo is None:
+                continue # "Faltoso" ou dose fora do esquema
+            atual = progresso.get(vacina)
+            if atual is None or passo > atual[0]:
+                progresso[vacina] = (passo, dia)
+    if progresso:
+        yield from _pendencias(pessoa_atual, progresso, esquemas, hoje, tolerancia, situacao)
+
+
+def pagina_faltosos(limit, **filtros):
+    """
+    Até `limit` pendências a partir do cursor (`apos`), sem dividir as de uma mesma pessoa entre páginas
+    (a página pode passar um pouco de `limit`). Retorna (pendências, pessoa_id para o próximo cursor ou None).
+
+    Com `max_linhas` nos filtros, a página também termina quando a leitura atinge o limite de linhas, mesmo
+    curta ou vazia (filtros seletivos): o cursor volta assim mesmo e o cliente continua paginando.
+    """
+    pendencias = []
+    gerador = faltosos(**filtros)
+    while True:
+        try:
+            pendencia = next(gerador)
+        except StopIteration as fim:
+            return pendencias, fim.value
+        if len(pendencias) >= limit and pendencia["pessoa_id"] != pendencias[-1]["pessoa_id"]:
+            gerador.close()
+            return pendencias, pendencias[-1]["pessoa_id"]
+        pendencias.append(pendencia)
@@ -0,0 +1,50 @@
+# cartao_vacinacao_api/gunicorn.conf.py
+# Servidor de produção: gunicorn -c gunicorn.conf.py wsgi:app
+# Tudo configurável por variáveis de ambiente WEB_* (padrões entre parênteses no README).
+#
+# Workers gthread: cada worker é um processo com WEB_THREADS threads (o pool de conexões de cada
+# um, DB_POOL_SIZE, deve ser >= WEB_THREADS). Com WEB_PRELOAD=1 o app é carregado uma vez no
+# mestre e os workers nascem por fork, compartilhando as páginas; cada worker é aquecido
+# (wsgi.aquecer) antes de aceitar requisições e reciclado após WEB_MAX_REQUESTS requisições
+# (com jitter, para não reciclarem todos juntos).
+#
+# Cada worker tem seus próprios caches em memória (cartões e catálogo de vacinas). As escritas de
+# um chegam aos outros pelo feed de alterações, conferido pelos caches a cada uso (uma consulta à
+# chave primária ou ao índice de `alteracoes`), então uma leitura logo após uma escrita vê a escrita
+# em qualquer worker. Sem o feed (bancos que não são SQLite), só CARTAO_CACHE_TTL e CATALOGO_CACHE_TTL
+# limitam a defasagem entre workers: use WEB_WORKERS=1 ou TTLs de poucos segundos se ela não for aceitável.
+#
+# Sinais ao mestre: HUP recarrega a configuração e troca os workers de forma graciosa (com o app
+# pré-carregado, código novo exige USR2 + QUIT no mestre antigo, ou WEB_PRELOAD=0); TTIN/TTOU
+# somam/subtraem um worker; TERM encerra aguardando até WEB_GRACEFUL_TIMEOUT as requisições em curso.
+import gc
+import multiprocessing
+import os
+import time
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 4))
+preload_app = os.getenv('WEB_PRELOAD', '1') == '1'
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 10000)) # 0 desativa a reciclagem
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', max_requests // 10))
+timeout = int(os.getenv('WEB_TIMEOUT', 30)) # Worker sem sinal de vida por mais que isso é reiniciado
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+accesslog = os.getenv('WEB_ACCESS_LOG') or None # Ex.: '-' para o stdout; desligado por padrão
+errorlog = '-'
+
+
+def when_ready(server):
+    # Objetos do app pré-carregado saem do alcance do coletor de ciclos: sem isso, a primeira
+    # coleta em cada worker escreve em todas as páginas herdadas e desfaz o compartilhamento
+    if preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    from wsgi import aquecer
+    inicio = time.perf_counter()
+    aquecer(conexoes=threads)
+    worker.log.info("Worker aquecido (pid %s) em %.0f ms", worker.pid, (time.perf_counter() - inicio) * 1000)
@@ -0,0 +1,65 @@
+# cartao_vacinacao_api/hashing.py
+# Hash de senhas fora das threads de requisição: os hashes (caros em CPU) rodam em um pool
+# dedicado e limitado. Quando o pool e sua fila estão cheios, a requisição é recusada na hora
+# (HashingIndisponivel -> 503) em vez de prender mais uma thread do servidor.
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Quantidade de parâmetros de cada método, para exigir o método completo em PASSWORD_HASH_METHOD
+# (ex.: 'scrypt:32768:8:1', 'pbkdf2:sha256:600000') e poder compará-lo com o prefixo dos hashes salvos.
+PARTES_POR_METODO = {'scrypt': 4, 'pbkdf2': 3}
+
+
+class HashingIndisponivel(Exception):
+    """O pool de hash está saturado (ou não respondeu a tempo)."""
+
+
+class _EstadoHasher:
+    def __init__(self, workers, fila):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Vagas = hashes em execução + hashes aguardando na fila
+        self.vagas = threading.BoundedSemaphore(workers + fila)
+
+
+class PasswordHasher:
+
+    def init_app(self, app):
+        metodo = app.config['PASSWORD_HASH_METHOD']
+        if PARTES_POR_METODO.get(metodo.split(':')[0]) != len(metodo.split(':')):
+            raise ValueError(f"PASSWORD_HASH_METHOD deve trazer todos os parâmetros (ex.: 'scrypt:32768:8:1'), recebido '{metodo}'.")
+        app.extensions['password_hasher'] = _EstadoHasher(
+            app.config['PASSWORD_HASH_WORKERS'],
+            app.config['PASSWORD_HASH_QUEUE_MAX']
+        )
+
+    def _executar(self, funcao, *args):
+        estado = current_app.extensions['password_hasher']
+        if not estado.vagas.acquire(blocking=False):
+            raise HashingIndisponivel()
+        try:
+            future = estado.executor.submit(funcao, *args)
+        except Exception:
+            estado.vagas.release()
+            raise
+        # A vaga só é liberada quando o hash termina, mesmo se quem pediu desistir por timeout
+        future.add_done_callback(lambda _: estado.vagas.release())
+        try:
+            return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+        except TimeoutError:
+            raise HashingIndisponivel()
+
+    def gerar_hash(self, password):
+        return self._executar(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+    def verificar(self, password_hash, password):
+        return self._executar(check_password_hash, password_hash, password)
+
+    def precisa_rehash(self, password_hash):
+        """True se o hash salvo foi gerado com método ou custo diferente do configurado."""
+        return password_hash.split('$', 1)[0] != current_app.config['PASSWORD_HASH_METHOD']
+
+
+password_hasher = PasswordHasher()
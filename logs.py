@@ -0,0 +1,243 @@
+# cartao_vacinacao_api/logs.py
+# Logs estruturados sem E/S nas threads de requisição: o app.logger entrega cada registro a um
+# QueueHandler (fila em memória, limitada) e uma thread QueueListener grava os registros, uma linha
+# JSON cada, em LOG_ARQUIVO com rotação por tamanho. Se a fila encher, o registro é descartado
+# (e contado) em vez de esperar pelo disco.
+#
+# Cada registro emitido durante uma requisição leva o request id (cabeçalho X-Request-ID, recebido
+# do cliente ou gerado aqui e devolvido na resposta), a rota, o método e o tempo decorrido desde o
+# início da requisição. Classes de aviso de alto volume (logger.warning(..., extra={'classe': ...}))
+# podem ser amostradas: com LOG_AMOSTRAGEM='validacao=10', um de cada 10 registros é gravado.
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import current_app, has_app_context, has_request_context, request
+from flask.logging import default_handler
+
+CABECALHO_REQUEST_ID = 'X-Request-ID'
+# Request ids aceitos do cliente; outros valores são trocados por um gerado aqui
+_REQUEST_ID_VALIDO = re.compile(r'[A-Za-z0-9._:-]{1,64}')
+# Estado da requisição fica no environ (não em g, que pode sobreviver à requisição num contexto de app externo)
+_CHAVE_REQUEST_ID = 'logs.request_id'
+_CHAVE_INICIO = 'logs.inicio'
+
+# Atributos extras do registro copiados para o JSON, na ordem
+CAMPOS_EXTRAS = ('request_id', 'metodo', 'rota', 'duracao_ms', 'classe', 'amostragem')
+
+_handlers = {} # caminho do arquivo -> _HandlerFila (o app.logger é o mesmo para todos os apps do processo)
+_handlers_lock = threading.Lock()
+
+
+def ler_amostragem(valor):
+    """'validacao=10,hash_indisponivel=5' -> {'validacao': 10, 'hash_indisponivel': 5} (um de cada N é gravado)."""
+    if isinstance(valor, dict):
+        return dict(valor)
+    amostragem = {}
+    for item in filter(None, (parte.strip() for parte in valor.split(','))):
+        classe, _, taxa = item.partition('=')
+        if not taxa.strip().isdigit() or int(taxa) < 1:
+            raise ValueError(f"LOG_AMOSTRAGEM: esperado classe=N com N >= 1, recebido '{item}'.")
+        amostragem[classe.strip()] = int(taxa)
+    return amostragem
+
+
+def request_id():
+    """Request id da requisição atual (gerado na primeira chamada, se o cliente não enviou um válido), ou None."""
+    if not has_request_context():
+        return None
+    environ = request.environ
+    valor = environ.get(_CHAVE_REQUEST_ID)
+    if valor is None:
+        recebido = environ.get('HTTP_X_REQUEST_ID', '')
+        valor = environ[_CHAVE_REQUEST_ID] = recebido if _REQUEST_ID_VALIDO.fullmatch(recebido) else uuid.uuid4().hex
+    return valor
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro: ts (UTC), nivel, logger, mensagem, os CAMPOS_EXTRAS presentes e a exceção."""
+
+    def format(self, record):
+        linha = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        for campo in CAMPOS_EXTRAS:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                linha[campo] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            linha["excecao"] = record.exc_text
+        return json.dumps(linha, ensure_ascii=False, default=str)
+
+
+class _FiltroRequisicao(logging.Filter):
+    """
+    Roda na thread que emitiu o registro, antes da fila: descarta os registros de apps que gravam
+    em outro arquivo, aplica a amostragem do app atual e anota os dados da requisição.
+    """
+
+    def __init__(self, caminho):
+        super().__init__()
+        self.caminho = caminho
+
+    def filter(self, record):
+        if not has_app_context():
+            return True
+        estado = current_app.extensions.get('logs')
+        if estado is None or estado.caminho != self.caminho:
+            return False
+
+        classe = getattr(record, 'classe', None)
+        taxa = estado.amostragem.get(classe)
+        if taxa and taxa > 1:
+            if not estado.amostrar(classe, taxa):
+                return False
+            record.amostragem = taxa
+
+        if has_request_context():
+            record.request_id = request_id()
+            record.metodo = request.method
+            record.rota = request.url_rule.rule if request.url_rule is not None else request.path
+            inicio = request.environ.get(_CHAVE_INICIO)
+            if inicio is not None:
+                record.duracao_ms = round((time.perf_counter() - inicio) * 1000, 2)
+        return True
+
+
+class _HandlerFila(QueueHandler):
+    """QueueHandler que nunca bloqueia: com a fila cheia, o registro é descartado e contado."""
+
+    def __init__(self, fila, caminho):
+        super().__init__(fila)
+        self.caminho = caminho
+        self.fila_cheia = 0 # Registros descartados com a fila cheia
+        self.addFilter(_FiltroRequisicao(caminho))
+
+    def prepare(self, record):
+        # Na thread da requisição, só o indispensável: o texto final da mensagem e da exceção
+        # (os argumentos e o traceback não podem mudar depois); o JSON é montado pelo listener.
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.fila_cheia += 1 # Contagem aproximada: sem lock, para não criar disputa justo sob pico
+
+
+def _iniciar_listener(handler, arquivo):
+    handler.listener = QueueListener(handler.queue, arquivo)
+    handler.listener.start()
+
+
+def _criar_handler(config):
+    caminho = config['LOG_ARQUIVO']
+    arquivo = RotatingFileHandler(caminho, maxBytes=config['LOG_MAX_BYTES'], backupCount=config['LOG_BACKUPS'],
+                                  encoding='utf-8', delay=True)
+    arquivo.setFormatter(FormatadorJSON())
+    handler = _HandlerFila(queue.Queue(config['LOG_FILA_MAX']), caminho)
+    handler.setLevel(config['LOG_NIVEL'])
+    _iniciar_listener(handler, arquivo)
+    atexit.register(lambda: handler.listener.stop()) # Grava o que ainda está na fila
+    return handler
+
+
+def _reiniciar_apos_fork():
+    # O processo filho (ex.: worker do gunicorn com o app pré-carregado) não herda a thread do
+    # listener, e a fila pode ter sido copiada com o lock preso: cada handler ganha fila e thread novas.
+    global _handlers_lock
+    _handlers_lock = threading.Lock()
+    for handler in _handlers.values():
+        handler.queue = queue.Queue(handler.queue.maxsize)
+        _iniciar_listener(handler, *handler.listener.handlers)
+
+
+os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+
+
+class _EstadoLogs:
+    def __init__(self, caminho, amostragem):
+        self.lock = threading.Lock()
+        self.caminho = caminho
+        self.amostragem = amostragem
+        self.vistos = dict.fromkeys(amostragem, 0) # classe -> registros emitidos
+        self.descartados = 0
+
+    def amostrar(self, classe, taxa):
+        """True para o primeiro registro da classe e depois um a cada `taxa`."""
+        with self.lock:
+            vistos = self.vistos[classe]
+            self.vistos[classe] = vistos + 1
+            if vistos % taxa:
+                self.descartados += 1
+                return False
+            return True
+
+
+class RegistroLogs:
+    """Request id em todas as respostas e, fora do modo debug, logs JSON assíncronos em LOG_ARQUIVO (vazio desativa)."""
+
+    def init_app(self, app):
+        app.before_request(self._inicio)
+        app.after_request(self._fim)
+        caminho = app.config['LOG_ARQUIVO']
+        if app.debug or not caminho:
+            return
+        app.extensions['logs'] = _EstadoLogs(caminho, ler_amostragem(app.config['LOG_AMOSTRAGEM']))
+        with _handlers_lock:
+            handler = _handlers.get(caminho)
+            if handler is None:
+                handler = _handlers[caminho] = _criar_handler(app.config)
+        if handler not in app.logger.handlers:
+            app.logger.addHandler(handler)
+        app.logger.removeHandler(default_handler) # O handler padrão do Flask escreve no stderr na thread da requisição
+
+    @staticmethod
+    def _inicio():
+        request.environ[_CHAVE_INICIO] = time.perf_counter()
+
+    @staticmethod
+    def _fim(response):
+        response.headers[CABECALHO_REQUEST_ID] = request_id()
+        return response
+
+    @staticmethod
+    def _handler():
+        estado = current_app.extensions.get('logs')
+        return _handlers[estado.caminho] if estado is not None else None
+
+    def descartados(self):
+        """Registros descartados no app atual: {'amostragem': n, 'fila_cheia': n} (a fila é compartilhada por arquivo)."""
+        estado = current_app.extensions.get('logs')
+        if estado is None:
+            return {'amostragem': 0, 'fila_cheia': 0}
+        return {'amostragem': estado.descartados, 'fila_cheia': self._handler().fila_cheia}
+
+    def aguardar_gravacao(self):
+        """Bloqueia até o listener gravar os registros já enfileirados (testes, comandos de CLI)."""
+        handler = self._handler()
+        if handler is not None:
+            handler.queue.join()
+
+
+registro_logs = RegistroLogs()
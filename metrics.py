@@ -0,0 +1,199 @@
+# cartao_vacinacao_api/metrics.py
+# Instrumentação das requisições: latência, status e tamanho de resposta por rota, e quantidade
+# e tempo das instruções SQL executadas em cada requisição (eventos do engine do SQLAlchemy).
+# Tudo fica em memória, por processo, e é exposto em GET /metrics no formato texto do Prometheus;
+# cada resposta também leva um cabeçalho Server-Timing separando o tempo de banco do tempo em Python.
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+from models import db
+
+# Limites (le) dos histogramas
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_TAMANHO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+ROTA_DESCONHECIDA = 'nao_encontrada' # Rótulo das requisições que não casaram com nenhuma rota
+
+
+class _Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {} # rótulos -> [contagens por bucket (não cumulativas) + +Inf, soma]
+
+    def observar(self, rotulos, valor):
+        serie = self.series.get(rotulos)
+        if serie is None:
+            serie = self.series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0]
+        for indice, limite in enumerate(self.buckets):
+            if valor <= limite:
+                break
+        else:
+            indice = len(self.buckets)
+        serie[0][indice] += 1
+        serie[1] += valor
+
+
+class _EstadoMetricas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requisicoes = {} # (rota, método, status) -> contagem
+        self.latencia = _Histograma(BUCKETS_LATENCIA)
+        self.tamanho = _Histograma(BUCKETS_TAMANHO)
+        self.sql_consultas = _Histograma(BUCKETS_CONSULTAS)
+        self.sql_tempo = _Histograma(BUCKETS_LATENCIA)
+
+
+def _escapar_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(nomes, valores, **extras):
+    pares = list(zip(nomes, valores)) + list(extras.items())
+    return '{' + ','.join(f'{nome}="{_escapar_rotulo(valor)}"' for nome, valor in pares) + '}'
+
+
+def formatar_metrica(nome, tipo, ajuda, valor):
+    """Linhas de uma métrica simples (sem rótulos), para somar à exposição métricas de outros módulos."""
+    return [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}", f"{nome} {valor}"]
+
+
+def _formatar_histograma(nome, ajuda, nomes_rotulos, histograma):
+    linhas = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} histogram"]
+    for rotulos, (contagens, soma) in sorted(histograma.series.items()):
+        acumulado = 0
+        for limite, contagem in zip(histograma.buckets, contagens):
+            acumulado += contagem
+            linhas.append(f"{nome}_bucket{_rotulos(nomes_rotulos, rotulos, le=limite)} {acumulado}")
+        acumulado += contagens[-1]
+        linhas.append(f"{nome}_bucket{_rotulos(nomes_rotulos, rotulos, le='+Inf')} {acumulado}")
+        linhas.append(f"{nome}_sum{_rotulos(nomes_rotulos, rotulos)} {soma}")
+        linhas.append(f"{nome}_count{_rotulos(nomes_rotulos, rotulos)} {acumulado}")
+    return linhas
+
+
+def _antes_do_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+
+def _depois_do_sql(conn, cursor, statement, parameters, context, executemany):
+    decorrido = time.perf_counter() - conn.info['metricas_inicio'].pop()
+    # Só conta o SQL executado dentro de uma requisição instrumentada (não CLI nem testes diretos)
+    if has_app_context() and 'metricas_sql' in g:
+        g.metricas_sql[0] += 1
+        g.metricas_sql[1] += decorrido
+
+
+def _erro_no_sql(contexto):
+    inicios = contexto.connection.info.get('metricas_inicio') if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+class Metricas:
+    """
+    Métricas por rota (o molde da URL, ex.: /pessoas/<int:id>) e método.
+
+    O SQL de respostas em streaming (exportações CSV) roda depois de a resposta sair
+    e não entra na contagem da requisição.
+    """
+
+    def init_app(self, app):
+        app.extensions['metricas'] = _EstadoMetricas()
+        app.before_request(self._inicio)
+        app.after_request(self._fim)
+        with app.app_context():
+            for engine in db.engines.values():
+                self.instrumentar_engine(engine)
+
+    @staticmethod
+    def instrumentar_engine(engine):
+        """Conta o SQL de `engine` nas requisições (para engines criados fora do `db`, ex.: `async_engine.sync_engine`)."""
+        if not event.contains(engine, 'before_cursor_execute', _antes_do_sql):
+            event.listen(engine, 'before_cursor_execute', _antes_do_sql)
+            event.listen(engine, 'after_cursor_execute', _depois_do_sql)
+            event.listen(engine, 'handle_error', _erro_no_sql)
+
+    @property
+    def _estado(self):
+        return current_app.extensions['metricas']
+
+    def _inicio(self):
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_sql = [0, 0.0] # [instruções, segundos]
+
+    def _fim(self, response):
+        if 'metricas_inicio' not in g:
+            return response
+        total = time.perf_counter() - g.metricas_inicio
+        consultas, tempo_sql = g.metricas_sql
+        rota = request.url_rule.rule if request.url_rule is not None else ROTA_DESCONHECIDA
+        # calculate_content_length() consumiria o gerador de uma resposta em streaming para medi-la
+        tamanho = None if response.is_streamed else response.calculate_content_length()
+
+        estado = self._estado
+        with estado.lock:
+            chave = (rota, request.method, response.status_code)
+            estado.requisicoes[chave] = estado.requisicoes.get(chave, 0) + 1
+            estado.latencia.observar((rota, request.method), total)
+            if tamanho is not None:
+                estado.tamanho.observar((rota, request.method), tamanho)
+            estado.sql_consultas.observar((rota, request.method), consultas)
+            estado.sql_tempo.observar((rota, request.method), tempo_sql)
+
+        if current_app.config['SERVER_TIMING']:
+            response.headers.add('Server-Timing',
+                f'db;dur={tempo_sql * 1000:.2f};desc="{consultas} SQL", '
+                f'app;dur={(total - tempo_sql) * 1000:.2f}, total;dur={total * 1000:.2f}')
+        return response
+
+    def exposicao(self):
+        """Linhas das métricas no formato texto do Prometheus."""
+        estado = self._estado
+        with estado.lock:
+            linhas = [
+                "# HELP http_requests_total Requisições atendidas, por rota, método e status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (rota, metodo, status), contagem in sorted(estado.requisicoes.items()):
+                linhas.append(f"http_requests_total{_rotulos(('rota', 'metodo', 'status'), (rota, metodo, status))} {contagem}")
+            linhas += _formatar_histograma('http_request_duration_seconds',
+                                           'Latência das requisições em segundos.', ('rota', 'metodo'), estado.latencia)
+            linhas += _formatar_histograma('http_response_size_bytes',
+                                           'Tamanho do corpo das respostas em bytes.', ('rota', 'metodo'), estado.tamanho)
+            linhas += _formatar_histograma('db_statements_per_request',
+                                           'Instruções SQL executadas por requisição.', ('rota', 'metodo'), estado.sql_consultas)
+            linhas += _formatar_histograma('db_duration_seconds',
+                                           'Tempo total de SQL por requisição em segundos.', ('rota', 'metodo'), estado.sql_tempo)
+        return linhas
+
+
+metricas = Metricas()
+
+
+@contextmanager
+def contar_sql():
+    """
+    Registra as instruções SQL executadas pela thread atual dentro do bloco, em todos os
+    engines do app atual. Devolve a lista de instruções, preenchida conforme executam.
+    Um executemany conta como uma instrução.
+    """
+    instrucoes = []
+    thread = threading.get_ident()
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:
+            instrucoes.append(statement)
+
+    engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        yield instrucoes
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', registrar)
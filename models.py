@@ -1,17 +1,23 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash # NOVA IMPORTAÇÃO para senhas
+from replica import SessaoRoteada
 
-db = SQLAlchemy()
+# SessaoRoteada: leituras das rotas de leitura vão para a réplica, quando configurada (replica.py)
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 class Vacina(db.Model):
     __tablename__ = 'vacinas'
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), unique=True, nullable=False)
-    categoria = db.Column(db.String(100), nullable=False, default='Geral') # Campo categoria
+    categoria = db.Column(db.String(100), nullable=False, default='Geral', index=True) # Campo categoria (filtro de GET /vacinas)
 
-    # Relacionamento com Vacinacao
-    vacinacoes = db.relationship('Vacinacao', backref='vacina', lazy=True, cascade="all, delete-orphan")
+    # Relacionamento com Vacinacao. passive_deletes: ao excluir a vacina, o banco remove as vacinações
+    # (ON DELETE CASCADE) sem que o ORM as carregue; as já carregadas na sessão continuam sendo excluídas por ele
+    vacinacoes = db.relationship('Vacinacao', backref='vacina', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    # Esquema vacinal (sequência de doses e intervalos), usado pelo relatório de faltosos
+    esquema = db.relationship('EsquemaDose', lazy=True, cascade="all, delete-orphan", passive_deletes=True,
+                              order_by='EsquemaDose.ordem')
 
     def __repr__(self):
         return f"<Vacina {self.nome} ({self.categoria})>"
@@ -19,38 +25,139 @@ class Vacina(db.Model):
 class Pessoa(db.Model):
     __tablename__ = 'pessoas'
     id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), nullable=False)
+    nome = db.Column(db.String(100), nullable=False, index=True)
     numero_identificacao = db.Column(db.String(50), unique=True, nullable=False) # Ex: CPF, RG, etc.
 
-    # Relacionamento com Vacinacao
-    vacinacoes = db.relationship('Vacinacao', backref='pessoa', lazy=True, cascade="all, delete-orphan")
+    # Relacionamento com Vacinacao (exclusão em cascata pelo banco, como em Vacina.vacinacoes)
+    vacinacoes = db.relationship('Vacinacao', backref='pessoa', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Pessoa {self.nome} ({self.numero_identificacao})>"
 
+# Catálogo de doses: id fixo gravado em vacinacoes.dose_id -> rótulo usado pela API.
+# Os ids não mudam; doses novas entram no fim, com o próximo id (init-db as grava na tabela doses).
+DOSES = {
+    1: "1a Dose", 2: "2a Dose", 3: "3a Dose", 4: "Reforco", 5: "Dose Unica", 6: "BCG",
+    7: "Faltoso", 8: "4a Dose", 9: "5a Dose", 10: "1a Reforco", 11: "2a Reforco",
+}
+DOSE_IDS = {nome: dose_id for dose_id, nome in DOSES.items()}
+
+# Doses aceitas em Vacinacao.dose_aplicada
+DOSES_VALIDAS = tuple(DOSES.values())
+
+
+class DoseTipo(db.TypeDecorator):
+    """
+    Rótulo da dose ("1a Dose") gravado como o id pequeno do catálogo `doses`.
+
+    A conversão usa o dicionário em memória, sem consulta nem junção: o ORM, os filtros e o
+    RETURNING continuam recebendo e devolvendo o rótulo. Rótulos fora do catálogo são recusados.
+    """
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return DOSE_IDS[value]
+        except KeyError:
+            raise ValueError(f"Dose '{value}' inválida.")
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else DOSES[value]
+
+
+class Dose(db.Model):
+    __tablename__ = 'doses'
+    id = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    nome = db.Column(db.String(50), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<Dose {self.id}: {self.nome}>"
+
+
+class EsquemaDose(db.Model):
+    """Passo do esquema vacinal de uma vacina: a dose e o intervalo mínimo, em dias, desde a dose anterior do esquema."""
+    __tablename__ = 'esquemas_doses'
+    vacina_id = db.Column(db.Integer, db.ForeignKey('vacinas.id', ondelete='CASCADE'), primary_key=True)
+    ordem = db.Column(db.SmallInteger, primary_key=True, autoincrement=False) # 1, 2, 3... na ordem de aplicação
+    dose_aplicada = db.Column('dose_id', DoseTipo, db.ForeignKey('doses.id'), nullable=False)
+    intervalo_dias = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('vacina_id', 'dose_id', name='_esquema_vacina_dose_uc'),
+    )
+
+    def __repr__(self):
+        return f"<EsquemaDose Vacina_ID:{self.vacina_id} {self.ordem}: {self.dose_aplicada} (+{self.intervalo_dias} dias)>"
+
+# Formato de data_aplicacao aceito pela API
+FORMATO_DATA_APLICACAO = '%Y-%m-%dT%H:%M:%S'
+
 class Vacinacao(db.Model):
     __tablename__ = 'vacinacoes'
     id = db.Column(db.Integer, primary_key=True)
-    pessoa_id = db.Column(db.Integer, db.ForeignKey('pessoas.id'), nullable=False)
-    vacina_id = db.Column(db.Integer, db.ForeignKey('vacinas.id'), nullable=False)
+    pessoa_id = db.Column(db.Integer, db.ForeignKey('pessoas.id', ondelete='CASCADE'), nullable=False)
+    vacina_id = db.Column(db.Integer, db.ForeignKey('vacinas.id', ondelete='CASCADE'), nullable=False)
     data_aplicacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    dose_aplicada = db.Column(db.String(50), nullable=False) # Ex: "1a Dose", "2a Dose", "Reforco", etc.
+    dose_aplicada = db.Column('dose_id', DoseTipo, db.ForeignKey('doses.id'), nullable=False) # Ex: "1a Dose", "2a Dose", "Reforco", etc.
 
-    __table_args__ = (db.UniqueConstraint('pessoa_id', 'vacina_id', 'dose_aplicada', name='_pessoa_vacina_dose_uc'),)
+    __table_args__ = (
+        # Também serve as buscas de duplicata (pessoa, vacina, dose) em add_vacinacao
+        db.UniqueConstraint('pessoa_id', 'vacina_id', 'dose_id', name='_pessoa_vacina_dose_uc'),
+        # Cartão de vacinação: filtra por pessoa e ordena por data sem ordenação temporária
+        db.Index('ix_vacinacoes_pessoa_data', 'pessoa_id', 'data_aplicacao'),
+        # Relacionamento Vacina.vacinacoes (exclusão em cascata de uma vacina)
+        db.Index('ix_vacinacoes_vacina_id', 'vacina_id'),
+    )
 
     def __repr__(self):
         return f"<Vacinacao Pessoa_ID:{self.pessoa_id} Vacina_ID:{self.vacina_id} Dose:{self.dose_aplicada}>"
 
+class EstatisticaVacinacao(db.Model):
+    """Doses aplicadas por (vacina, dose, mês), mantidas pelas rotas de escrita (ver estatisticas.py)."""
+    __tablename__ = 'estatisticas_vacinacao'
+    vacina_id = db.Column(db.Integer, db.ForeignKey('vacinas.id', ondelete='CASCADE'), primary_key=True)
+    dose_aplicada = db.Column('dose_id', DoseTipo, db.ForeignKey('doses.id'), primary_key=True)
+    mes = db.Column(db.String(7), primary_key=True) # 'AAAA-MM' de data_aplicacao
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EstatisticaVacinacao Vacina_ID:{self.vacina_id} Dose:{self.dose_aplicada} Mes:{self.mes} Total:{self.total}>"
+
+class Alteracao(db.Model):
+    """
+    Feed de alterações para sincronização incremental (GET /changes), mantido por gatilhos (ver alteracoes.py).
+
+    Uma linha por registro alterado: cada nova escrita no registro substitui a linha anterior com
+    um seq maior, então o feed cresce com o número de registros, não de escritas. Exclusões ficam
+    como marcas ('delete').
+    """
+    __tablename__ = 'alteracoes'
+    seq = db.Column(db.Integer, primary_key=True) # AUTOINCREMENT: nunca reutilizado, sempre crescente
+    tabela = db.Column(db.String(20), nullable=False) # 'pessoas', 'vacinas' ou 'vacinacoes'
+    registro_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(6), nullable=False) # 'upsert' ou 'delete'
+
+    __table_args__ = (
+        db.UniqueConstraint('tabela', 'registro_id', name='_alteracao_registro_uc'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f"<Alteracao {self.seq}: {self.operacao} {self.tabela}/{self.registro_id}>"
+
 # NOVO: Modelo de Usuário para Autenticação
 class User(db.Model):
     __tablename__ = 'users' # Nome da tabela no banco de dados
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False) # Armazena o hash da senha
+    password_hash = db.Column(db.String(255), nullable=False) # Armazena o hash da senha (scrypt passa de 128 caracteres)
 
-    # Método para definir a senha (faz o hash)
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    # Método para definir a senha (faz o hash). As rotas usam hashing.password_hasher, que roda fora da thread da requisição.
+    def set_password(self, password, method='scrypt'):
+        self.password_hash = generate_password_hash(password, method=method)
 
     # Método para verificar a senha
     def check_password(self, password):
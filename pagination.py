@@ -0,0 +1,72 @@
+# cartao_vacinacao_api/pagination.py
+import base64
+import binascii
+
+from flask import current_app, request, url_for
+
+from serializers import CAMPOS_PESSOA, json_bytes, linhas_para_dicts, resposta_json
+
+
+class CursorInvalido(ValueError):
+    """Cursor de paginação malformado ou adulterado."""
+
+
+def encode_cursor(valor):
+    """Codifica um id (inteiro) em um cursor opaco, seguro para URL."""
+    return base64.urlsafe_b64encode(str(valor).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodifica um cursor gerado por `encode_cursor`. Levanta CursorInvalido se não for válido."""
+    if not cursor:
+        return None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        valor = int(base64.urlsafe_b64decode(cursor + padding).decode('ascii'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorInvalido("Cursor de paginação inválido.")
+    if valor < 0:
+        raise CursorInvalido("Cursor de paginação inválido.")
+    return valor
+
+
+def parse_limit(valor, padrao, maximo):
+    """Converte o parâmetro `limit` da query string, aplicando o teto de página."""
+    if valor is None or valor == '':
+        return padrao
+    try:
+        limit = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError("Parâmetro 'limit' deve ser um número inteiro.")
+    if limit < 1:
+        raise ValueError("Parâmetro 'limit' deve ser maior que zero.")
+    return min(limit, maximo)
+
+
+def parametros_pagina_pessoas():
+    """(limit, after, nome) de GET /pessoas a partir da query string. Levanta ValueError se inválidos."""
+    limit = parse_limit(request.args.get('limit'),
+                        current_app.config['PESSOAS_PAGE_SIZE'],
+                        current_app.config['PESSOAS_MAX_PAGE_SIZE'])
+    after = decode_cursor(request.args.get('after'))
+    return limit, after, request.args.get('nome', '').strip()
+
+
+def resposta_pagina_pessoas(pessoas, limit, nome, endpoint):
+    """
+    Resposta de uma página de pessoas a partir das `limit + 1` linhas de `queries.pessoas_pagina_query`.
+
+    O corpo é a lista da página; o cursor da próxima, se houver, vai em X-Next-Cursor e no Link
+    (montado com `endpoint`, a rota que atendeu a requisição).
+    """
+    has_next = len(pessoas) > limit
+    pessoas = pessoas[:limit]
+    # Caminho rápido: tuplas das colunas de saída direto para JSON (mesmos bytes de pessoas_schema.jsonify)
+    response = resposta_json(json_bytes(linhas_para_dicts(CAMPOS_PESSOA, pessoas)))
+    if has_next:
+        next_cursor = encode_cursor(pessoas[-1].id)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = '<{}>; rel="next"'.format(
+            url_for(endpoint, limit=limit, after=next_cursor, nome=nome or None)
+        )
+    return response
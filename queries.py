@@ -0,0 +1,127 @@
+# cartao_vacinacao_api/queries.py
+# Consultas quentes da API, centralizadas para que os testes de plano de execução
+# (tests/test_query_plans.py) verifiquem exatamente o SQL que as rotas executam.
+from sqlalchemy import and_, func, select
+
+from busca import pessoas_fts
+from models import db, Alteracao, Vacina, Pessoa, Vacinacao
+
+
+# Colunas de saída de Pessoa (mesma ordem de serializers.CAMPOS_PESSOA)
+COLUNAS_PESSOA = (Pessoa.id, Pessoa.nome, Pessoa.numero_identificacao)
+
+# Colunas de saída de Vacina (mesma ordem de serializers.CAMPOS_VACINA)
+COLUNAS_VACINA = (Vacina.categoria, Vacina.id, Vacina.nome)
+
+# Colunas de saída de Vacinacao no feed de alterações (mesma ordem de serializers.CAMPOS_VACINACAO)
+COLUNAS_VACINACAO = (Vacinacao.data_aplicacao, Vacinacao.dose_aplicada, Vacinacao.id, Vacinacao.pessoa_id, Vacinacao.vacina_id)
+
+
+def cartao_query(pessoa_id):
+    """Vacinações de uma pessoa com os dados da vacina, em ordem de aplicação (só as colunas do cartão)."""
+    return db.session.query(Vacinacao.id, Vacinacao.data_aplicacao, Vacinacao.dose_aplicada,
+                            Vacina.nome, Vacina.id.label('vacina_db_id'), Vacina.categoria)\
+                     .join(Vacina, Vacina.id == Vacinacao.vacina_id)\
+                     .filter(Vacinacao.pessoa_id == pessoa_id)\
+                     .order_by(Vacinacao.data_aplicacao.asc())
+
+
+def cartoes_query(pessoa_ids):
+    """
+    Vacinações de várias pessoas, com as colunas de `cartao_query` precedidas do pessoa_id,
+    agrupadas por pessoa e em ordem de aplicação (uma única consulta com IN, para POST /cartoes/batch).
+    """
+    return db.session.query(Vacinacao.pessoa_id, Vacinacao.id, Vacinacao.data_aplicacao, Vacinacao.dose_aplicada,
+                            Vacina.nome, Vacina.id.label('vacina_db_id'), Vacina.categoria)\
+                     .join(Vacina, Vacina.id == Vacinacao.vacina_id)\
+                     .filter(Vacinacao.pessoa_id.in_(pessoa_ids))\
+                     .order_by(Vacinacao.pessoa_id.asc(), Vacinacao.data_aplicacao.asc())
+
+
+def vacinacao_existente_query(pessoa_id, vacina_id, dose_aplicada):
+    """Busca pela chave única (pessoa, vacina, dose) usada para detectar duplicatas."""
+    return Vacinacao.query.filter_by(
+        pessoa_id=pessoa_id,
+        vacina_id=vacina_id,
+        dose_aplicada=dose_aplicada
+    )
+
+
+def pessoa_query(pessoa_id):
+    """Colunas de saída de uma pessoa."""
+    return db.session.query(*COLUNAS_PESSOA).filter(Pessoa.id == pessoa_id)
+
+
+def pessoas_por_ids_query(pessoa_ids):
+    """Colunas de saída das pessoas com os ids informados (as inexistentes não aparecem)."""
+    return db.session.query(*COLUNAS_PESSOA).filter(Pessoa.id.in_(pessoa_ids))
+
+
+def vacinas_query(categoria=None):
+    """Catálogo de vacinas (colunas de saída), opcionalmente filtrado por categoria."""
+    query = db.session.query(*COLUNAS_VACINA)
+    if categoria:
+        query = query.filter(Vacina.categoria == categoria)
+    return query.order_by(Vacina.id.asc())
+
+
+def escapar_like(texto):
+    """Escapa os curingas do LIKE (`%`, `_`) e o próprio escape (`\\`) para que casem literalmente."""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def pessoas_pagina_query(limit, after=None, nome=None):
+    """Página de pessoas por keyset sobre Pessoa.id. Traz `limit + 1` linhas para detectar a próxima página."""
+    query = db.session.query(*COLUNAS_PESSOA)
+    if nome:
+        query = query.filter(Pessoa.nome.ilike(f"%{escapar_like(nome)}%", escape='\\'))
+    if after is not None:
+        query = query.filter(Pessoa.id > after)
+    return query.order_by(Pessoa.id.asc()).limit(limit + 1)
+
+
+def pessoas_busca_query(expressao, limit):
+    """
+    Pessoas que casam com a expressão MATCH do índice FTS5 (busca.expressao_busca), das mais relevantes (bm25) às menos.
+
+    O bm25 pontua todos os documentos que casam e o LIMIT vem depois do ORDER BY rank, dentro do FTS5
+    (que mantém só os `limit` melhores enquanto ordena): a página traz as mais relevantes de todo o
+    conjunto, não só das primeiras por id. Um prefixo curto ou um nome muito comum custa proporcionalmente
+    ao número de documentos que casam.
+    """
+    melhores = select(pessoas_fts.c.rowid, pessoas_fts.c.rank)\
+        .where(pessoas_fts.c.pessoas_fts.op('MATCH')(expressao))\
+        .order_by(pessoas_fts.c.rank)\
+        .limit(limit)\
+        .subquery()
+    return db.session.query(*COLUNAS_PESSOA)\
+                     .join(melhores, melhores.c.rowid == Pessoa.id)\
+                     .order_by(melhores.c.rank)
+
+
+def posicao_alteracoes_query(tabela=None):
+    """Maior seq do feed de alterações (0 se vazio), de todas as tabelas ou só de `tabela`."""
+    query = db.session.query(func.coalesce(func.max(Alteracao.seq), 0))
+    if tabela is not None:
+        query = query.filter(Alteracao.tabela == tabela) # Faixa do índice único (tabela, registro_id)
+    return query
+
+
+def alteracoes_para_cache_query(since, limit):
+    """
+    Alterações com seq > `since`, em ordem de seq, com a pessoa da vacinação nas de vacinacoes
+    (None se ela foi excluída: o feed não guarda de quem era). Traz `limit` linhas.
+    """
+    return db.session.query(Alteracao.seq, Alteracao.tabela, Alteracao.registro_id, Vacinacao.pessoa_id)\
+                     .outerjoin(Vacinacao, and_(Alteracao.tabela == 'vacinacoes', Vacinacao.id == Alteracao.registro_id))\
+                     .filter(Alteracao.seq > since)\
+                     .order_by(Alteracao.seq.asc())\
+                     .limit(limit)
+
+
+def alteracoes_query(since, limit):
+    """Alterações com seq > `since`, em ordem de seq (faixa da chave primária). Traz `limit` linhas."""
+    return db.session.query(Alteracao.seq, Alteracao.tabela, Alteracao.registro_id, Alteracao.operacao)\
+                     .filter(Alteracao.seq > since)\
+                     .order_by(Alteracao.seq.asc())\
+                     .limit(limit)
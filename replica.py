@@ -0,0 +1,171 @@
+# cartao_vacinacao_api/replica.py
+# Réplica de leitura (opcional, DATABASE_REPLICA_URL): o db.session encaminha as consultas das rotas
+# de leitura (GET/HEAD e rotas marcadas com @somente_leitura) para o bind 'replica' e todo o resto
+# (escritas, flush, rotas de escrita, CLI) para o primário.
+#
+# Voltam ao primário:
+# - requisições logo depois de uma escrita do mesmo cliente ("ler as próprias escritas"): a resposta
+#   de uma escrita leva o cookie ler_primario por REPLICA_LER_PRIMARIO_SEGUNDOS; clientes sem cookies
+#   enviam o cabeçalho X-Read-Primary: 1;
+# - leituras que alimentam os caches em memória (catálogo, cartões), dentro de `primario()`: um dado
+#   velho da réplica ficaria no cache até o TTL, mesmo depois de a réplica alcançar o primário;
+# - tudo, enquanto a réplica estiver inacessível ou mais de REPLICA_MAX_ATRASO alterações atrás.
+#   O atraso é a diferença entre a última posição do feed de alterações (alteracoes.seq) no primário
+#   e na réplica, medida no máximo a cada REPLICA_VERIFICACAO_SEGUNDOS por uma única thread.
+#
+# Cada resposta leva X-Database: replica ou primario, conforme de onde a requisição leu. Respostas em
+# streaming (CSV) ainda não leram nada quando os cabeçalhos saem: levam a decisão da requisição, que
+# as consultas do gerador seguem.
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.sql.dml import UpdateBase
+
+BIND_REPLICA = 'replica'
+METODOS_LEITURA = frozenset({'GET', 'HEAD'})
+COOKIE_LER_PRIMARIO = 'ler_primario'
+CABECALHO_LER_PRIMARIO = 'X-Read-Primary'
+CABECALHO_ORIGEM = 'X-Database'
+
+# Posição do feed de alterações: comparada entre primário e réplica para medir o atraso
+SQL_POSICAO = text("SELECT COALESCE(MAX(seq), 0) FROM alteracoes")
+
+# Estado da requisição fica no environ (não em g, que pode sobreviver à requisição num contexto de app externo)
+_CHAVE_DECISAO = 'replica.usar'
+_CHAVE_PRIMARIO = 'replica.forcar_primario'
+_CHAVE_LEU_REPLICA = 'replica.leu'
+
+
+def somente_leitura(view):
+    """Marca uma rota de método não-GET que só lê (ex.: POST com corpo de consulta) para ser servida pela réplica."""
+    view.somente_leitura = True
+    return view
+
+
+def _rota_de_leitura():
+    if request.method in METODOS_LEITURA:
+        return True
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'somente_leitura', False)
+
+
+def _decidir():
+    estado = current_app.extensions.get('replica')
+    if estado is None or not _rota_de_leitura():
+        return False
+    if request.cookies.get(COOKIE_LER_PRIMARIO) or request.headers.get(CABECALHO_LER_PRIMARIO) == '1':
+        return False
+    return estado.disponivel(current_app)
+
+
+def usando_replica():
+    """True se as leituras da requisição atual vão para a réplica (decidido uma vez por requisição)."""
+    if not has_request_context():
+        return False
+    environ = request.environ
+    if environ.get(_CHAVE_PRIMARIO):
+        return False
+    decisao = environ.get(_CHAVE_DECISAO)
+    if decisao is None:
+        decisao = environ[_CHAVE_DECISAO] = _decidir()
+    return decisao
+
+
+@contextmanager
+def primario(ativo=True):
+    """As consultas do bloco vão ao primário (se `ativo`), mesmo numa rota de leitura."""
+    if not ativo or not has_request_context():
+        yield
+        return
+    environ = request.environ
+    anterior = environ.get(_CHAVE_PRIMARIO, False)
+    environ[_CHAVE_PRIMARIO] = True
+    try:
+        yield
+    finally:
+        environ[_CHAVE_PRIMARIO] = anterior
+
+
+class SessaoRoteada(Session):
+    """Session do Flask-SQLAlchemy que envia as leituras de rotas de leitura para o bind da réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and usando_replica():
+            request.environ[_CHAVE_LEU_REPLICA] = True
+            return self._db.engines[BIND_REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class _EstadoReplica:
+    def __init__(self, max_atraso, intervalo):
+        self.lock = threading.Lock()
+        self.max_atraso = max_atraso
+        self.intervalo = intervalo
+        self.verificada_em = None
+        self.ok = False # Até a primeira verificação, tudo vai ao primário
+        self.atraso = None # None = réplica inacessível ou ainda não verificada
+
+    def disponivel(self, app):
+        """Se a réplica pode servir leituras; reverifica quando o intervalo venceu, sem bloquear outras threads."""
+        if self.verificada_em is None or time.monotonic() - self.verificada_em >= self.intervalo:
+            if self.lock.acquire(blocking=False):
+                try:
+                    self._verificar(app)
+                finally:
+                    self.lock.release()
+        return self.ok
+
+    def _verificar(self, app):
+        engines = app.extensions['sqlalchemy'].engines
+        try:
+            with engines[None].connect() as conexao:
+                posicao_primario = conexao.scalar(SQL_POSICAO)
+            with engines[BIND_REPLICA].connect() as conexao:
+                posicao_replica = conexao.scalar(SQL_POSICAO)
+        except Exception as e: # Réplica (ou primário) inacessível, ou sem o feed de alterações
+            atraso, motivo = None, str(e)
+        else:
+            atraso, motivo = max(posicao_primario - posicao_replica, 0), None
+        ok = atraso is not None and atraso <= self.max_atraso
+        if ok != self.ok:
+            if ok:
+                app.logger.warning("Réplica disponível (atraso de %s alterações); leituras voltam para ela.", atraso)
+            else:
+                app.logger.warning("Réplica fora de uso, leituras vão ao primário: %s",
+                                   motivo or f"atraso de {atraso} alterações (máximo {self.max_atraso})")
+        self.ok, self.atraso = ok, atraso
+        self.verificada_em = time.monotonic()
+
+
+class RoteamentoReplica:
+    """Ativado por DATABASE_REPLICA_URI (o bind é criado por database.init_app); sem ela, nada muda."""
+
+    def init_app(self, app):
+        if not app.config['DATABASE_REPLICA_URI']:
+            return
+        app.extensions['replica'] = _EstadoReplica(app.config['REPLICA_MAX_ATRASO'], app.config['REPLICA_VERIFICACAO_SEGUNDOS'])
+        app.after_request(self._fim)
+
+    @staticmethod
+    def _fim(response):
+        leu_replica = usando_replica() if response.is_streamed else request.environ.get(_CHAVE_LEU_REPLICA)
+        response.headers[CABECALHO_ORIGEM] = 'replica' if leu_replica else 'primario'
+        if not _rota_de_leitura() and response.status_code < 400:
+            # Leituras seguintes deste cliente veem a escrita, mesmo com a réplica atrasada
+            response.set_cookie(COOKIE_LER_PRIMARIO, '1', max_age=current_app.config['REPLICA_LER_PRIMARIO_SEGUNDOS'],
+                                httponly=True, samesite='Lax')
+        return response
+
+    def situacao(self):
+        """{'disponivel': bool, 'atraso': alterações ou None}, ou None sem réplica configurada."""
+        estado = current_app.extensions.get('replica')
+        if estado is None:
+            return None
+        return {'disponivel': estado.ok, 'atraso': estado.atraso}
+
+
+roteamento_replica = RoteamentoReplica()
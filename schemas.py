@@ -23,6 +23,7 @@ class PessoaSchema(ma.SQLAlchemyAutoSchema):
 
 class VacinacaoSchema(ma.SQLAlchemyAutoSchema):
     data_aplicacao = fields.DateTime(format='%Y-%m-%dT%H:%M:%S')
+    dose_aplicada = fields.Str() # Gravada como dose_id (chave estrangeira), exposta como o rótulo
 
     class Meta:
         model = Vacinacao
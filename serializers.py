@@ -0,0 +1,46 @@
+# cartao_vacinacao_api/serializers.py
+# Serialização rápida para as listas quentes: as rotas selecionam só as colunas necessárias
+# (tuplas, sem objetos do ORM nem introspecção do marshmallow) e codificam direto para bytes.
+# A saída é idêntica, byte a byte, à do jsonify do Flask (chaves ordenadas, ensure_ascii, compacto).
+import json
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson # Opcional: codificador mais rápido, usado quando estiver instalado
+except ImportError:
+    orjson = None
+
+# Campos de saída dos schemas
+CAMPOS_PESSOA = ('id', 'nome', 'numero_identificacao')
+CAMPOS_VACINA = ('categoria', 'id', 'nome')
+CAMPOS_VACINACAO = ('data_aplicacao', 'dose_aplicada', 'id', 'pessoa_id', 'vacina_id')
+
+def _provider_padrao(provider):
+    """True se o provider JSON do app produz a saída compacta padrão que este módulo reproduz."""
+    return (type(provider) is DefaultJSONProvider
+            and provider.ensure_ascii and provider.sort_keys
+            and (provider.compact or (provider.compact is None and not current_app.debug)))
+
+
+def json_bytes(dados):
+    """Equivalente, byte a byte, a `current_app.json.response(dados).get_data()`."""
+    provider = current_app.json
+    if not _provider_padrao(provider):
+        return provider.response(dados).get_data()
+    if orjson is not None:
+        body = orjson.dumps(dados, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        # O orjson não escapa caracteres fora do ASCII; reescapá-los custa mais que o json da
+        # biblioteca padrão, então nesse caso a saída é refeita por ele
+        if body.isascii() and b'\x7f' not in body:
+            return body
+    return (json.dumps(dados, ensure_ascii=True, sort_keys=True, separators=(',', ':')) + '\n').encode('ascii')
+
+
+def linhas_para_dicts(campos, linhas):
+    return [dict(zip(campos, linha)) for linha in linhas]
+
+
+def resposta_json(body, status=200):
+    return current_app.response_class(body, status=status, mimetype='application/json')
@@ -7,6 +7,8 @@ let allVacinas = []; // Para armazenar TODAS as vacinas disponíveis (sem filtro
 let deleteTarget = { type: null, id: null }; // Para o modal de confirmação de exclusão
 let currentCartaoData = null; // Para armazenar os dados do cartão de vacinação atual
 let currentCategory = 'Nacional'; // Categoria ativa padrão (primeira aba)
+const PESSOAS_PAGE_SIZE = 50; // Tamanho da página de GET /pessoas
+let pessoasNextCursor = null; // Cursor da próxima página de pessoas (cabeçalho X-Next-Cursor)
 
 // Variáveis para autenticação
 let jwtToken = localStorage.getItem('access_token') || null; // Tenta carregar o token do localStorage
@@ -25,7 +27,7 @@ document.addEventListener('DOMContentLoaded', async () => {
 
 // --- Funções de Ajuda ---
 
-async function fetchData(url, method = 'GET', data = null) {
+async function fetchData(url, method = 'GET', data = null, withHeaders = false) {
     const options = {
         method: method,
         headers: {
@@ -79,6 +81,9 @@ async function fetchData(url, method = 'GET', data = null) {
             }
             throw new Error(errorData.message || `Erro HTTP: ${response.status}`);
         }
+        if (withHeaders) {
+            return { data: await response.json(), headers: response.headers };
+        }
         return await response.json();
     } catch (error) {
         console.error('-> fetchData: Erro geral na requisição:', error); 
@@ -215,19 +220,14 @@ function logoutUser(showAlert = true) {
 async function loadPessoas() {
     if (!isLoggedIn) return; 
 
+    // Recomeça a paginação: só a primeira página é buscada, as demais sob demanda ("Carregar mais")
+    pessoasNextCursor = null;
+    const pessoaSelect = document.getElementById('pessoaSelect');
+    pessoaSelect.innerHTML = '<option value="">-- Selecione uma pessoa --</option>'; 
+
     try {
-        console.log("-> loadPessoas: Buscando lista de pessoas...");
-        const pessoas = await fetchData(`${API_BASE_URL}/pessoas`);
-        console.log("-> loadPessoas: Pessoas carregadas:", pessoas);
+        await loadMorePessoas();
 
-        const pessoaSelect = document.getElementById('pessoaSelect');
-        pessoaSelect.innerHTML = '<option value="">-- Selecione uma pessoa --</option>'; 
-        pessoas.forEach(pessoa => { 
-            const option = document.createElement('option');
-            option.value = pessoa.id;
-            option.textContent = `${pessoa.nome} (ID: ${pessoa.id})`;
-            pessoaSelect.appendChild(option);
-        });
         document.getElementById('deletePessoaButton').style.display = 'none';
         if (currentPessoaId && document.querySelector(`#pessoaSelect option[value="${currentPessoaId}"]`)) {
             pessoaSelect.value = currentPessoaId;
@@ -242,6 +242,50 @@ async function loadPessoas() {
     }
 }
 
+async function loadMorePessoas() {
+    const params = new URLSearchParams({ limit: PESSOAS_PAGE_SIZE });
+    const filtroNome = document.getElementById('pessoaFiltroNome').value.trim();
+    let url;
+    if (filtroNome) {
+        // Com filtro, usa a busca textual do servidor (nome ou identificação, por prefixo e sem acentos),
+        // que devolve só os resultados mais relevantes, sem próxima página
+        params.set('q', filtroNome);
+        url = `${API_BASE_URL}/pessoas/search?${params.toString()}`;
+    } else {
+        if (pessoasNextCursor) {
+            params.set('after', pessoasNextCursor);
+        }
+        url = `${API_BASE_URL}/pessoas?${params.toString()}`;
+    }
+
+    console.log("-> loadMorePessoas: Buscando página de pessoas...", params.toString());
+    const { data: pessoas, headers } = await fetchData(url, 'GET', null, true);
+    console.log("-> loadMorePessoas: Pessoas carregadas:", pessoas.length);
+
+    const pessoaSelect = document.getElementById('pessoaSelect');
+    pessoas.forEach(pessoa => { 
+        appendPessoaOption(pessoaSelect, pessoa);
+    });
+
+    pessoasNextCursor = headers.get('X-Next-Cursor');
+    document.getElementById('loadMorePessoasButton').style.display = pessoasNextCursor ? 'inline-block' : 'none';
+}
+
+function appendPessoaOption(pessoaSelect, pessoa) {
+    if (pessoaSelect.querySelector(`option[value="${pessoa.id}"]`)) {
+        return;
+    }
+    const option = document.createElement('option');
+    option.value = pessoa.id;
+    option.textContent = `${pessoa.nome} (ID: ${pessoa.id})`;
+    pessoaSelect.appendChild(option);
+}
+
+async function filterPessoas() {
+    currentPessoaId = null;
+    await loadPessoas();
+}
+
 async function loadPessoaCartao() {
     if (!isLoggedIn) {
         alert("Você precisa estar logado para carregar o cartão de vacinação.");
@@ -459,7 +503,11 @@ async function addPessoa() {
         closeModal('addPessoaModal');
         document.getElementById('newPessoaNome').value = '';
         document.getElementById('newPessoaIdentificacao').value = '';
-        await loadPessoas(); 
+        // A pessoa nova fica na última página; inclui no select para já exibir o cartão
+        await loadPessoas();
+        appendPessoaOption(document.getElementById('pessoaSelect'), response);
+        document.getElementById('pessoaSelect').value = response.id;
+        await loadPessoaCartao(); 
     } catch (error) {
         messageElement.textContent = error.message; 
         console.error('Erro em addPessoa:', error); 
@@ -622,7 +670,8 @@ async function openAddVacinacaoModal() {
 }
 
 // Função para exportar dados do cartão de vacinação para CSV
-function exportCartaoVacinacaoToCsv() {
+// O CSV é gerado pelo servidor (GET /pessoas/<id>/cartao_vacinacao.csv) no layout dose × vacina da aba atual
+async function exportCartaoVacinacaoToCsv() {
     console.log("-> exportCartaoVacinacaoToCsv: Função iniciada.");
     console.log("Estado atual: currentPessoaId:", currentPessoaId, "currentCartaoData:", currentCartaoData);
 
@@ -633,83 +682,39 @@ function exportCartaoVacinacaoToCsv() {
     }
 
     const pessoa = currentCartaoData.pessoa;
-    const vacinasRegistradas = currentCartaoData.vacinas_registradas;
-
-    let csvContent = "";
+    const params = new URLSearchParams({ categoria: currentCategory });
 
-    console.log("-> exportCartaoVacinacaoToCsv: currentCategory:", currentCategory);
-    const vacinasExibirNestaCategoriaCsv = allVacinas.filter(vac => vac.categoria === currentCategory);
-    const vacinaNamesInOrderCsv = vacinasExibirNestaCategoriaCsv.map(vac => vac.nome);
-
-    console.log("-> exportCartaoVacinacaoToCsv: vacinaNamesInOrderCsv (colunas do CSV):", vacinaNamesInOrderCsv);
-
-    let headerRow = "Dose/Vacina";
-    vacinaNamesInOrderCsv.forEach(vacinaName => {
-        headerRow += `;"${vacinaName}"`; // Separador de ponto e vírgula, com aspas para nomes com espaços
-    });
-    csvContent += headerRow + "\n";
-
-    const dosesTypes = [
-        "1a Dose", "2a Dose", "3a Dose",
-        "1a Reforco", "2a Reforco",
-        "Dose Unica", "BCG", "Faltoso", "4a Dose", "5a Dose"
-    ];
-
-    dosesTypes.forEach(doseType => {
-        let rowData = ''; 
-        let displayDoseTypeCsv = ''; 
-
-        if (doseType === "1a Dose") displayDoseTypeCsv = "Tipo 1ª Dose";
-        else if (doseType === "2a Dose") displayDoseTypeCsv = "Tipo 2ª Dose";
-        else if (doseType === "3a Dose") displayDoseTypeCsv = "Tipo 3ª Dose";
-        else if (doseType === "1a Reforco") displayDoseTypeCsv = "Tipo 1º Reforço";
-        else if (doseType === "2a Reforco") displayDoseTypeCsv = "Tipo 2º Reforço";
-        else if (doseType === "Dose Unica") displayDoseTypeCsv = "Dose Única";
-        else displayDoseTypeCsv = doseType; 
-            
-        rowData = `"${displayDoseTypeCsv}"`; // Coloca o nome da dose entre aspas
-        
-        vacinaNamesInOrderCsv.forEach(vacinaName => {
-            const vacinaData = vacinasRegistradas.find(v => v.nome_vacina === vacinaName);
-            let cellContent = "";
-            if (vacinaData && vacinaData.doses) {
-                const dose = vacinaData.doses.find(d => d.dose_aplicada === doseType);
-                if (dose) {
-                    if (dose.dose_aplicada === 'Faltoso') {
-                        cellContent = 'Faltoso';
-                    } else {
-                        cellContent = `Aplicada: ${new Date(dose.data_aplicacao).toLocaleDateString()}`;
-                    }
-                }
-            }
-            rowData += `;"${cellContent}"`; // Adiciona ponto e vírgula e aspas para o conteúdo da célula
+    try {
+        const response = await fetch(`${API_BASE_URL}/pessoas/${currentPessoaId}/cartao_vacinacao.csv?${params.toString()}`, {
+            headers: { 'Authorization': `Bearer ${jwtToken}` },
         });
-        csvContent += rowData + "\n";
-    });
-
-    // Informações da Pessoa no final do CSV para clareza
-    csvContent += "\n";
-    csvContent += `Informações da Pessoa;\n`; // Linha de cabeçalho
-    csvContent += `Nome;${pessoa.nome}\n`;
-    csvContent += `ID;${pessoa.id}\n`;
-    csvContent += `Identificação;${pessoa.numero_identificacao}\n`;
-
-    console.log("-> exportCartaoVacinacaoToCsv: Conteúdo CSV gerado:\n", csvContent);
-
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' }); // type de volta para text/csv
-    const link = document.createElement('a');
-    if (link.download !== undefined) {
-        const url = URL.createObjectURL(blob);
-        link.setAttribute('href', url);
-        link.setAttribute('download', `cartao_vacinacao_${pessoa.nome.replace(/\s/g, '_')}_${pessoa.id}.csv`); // Extensão de volta para .csv
-        link.style.visibility = 'hidden';
-        document.body.appendChild(link);
-        link.click();
-        document.body.removeChild(link);
-        console.log("-> exportCartaoVacinacaoToCsv: Download do CSV disparado.");
-    } else {
-        alert('Seu navegador não suporta download direto de arquivos. Por favor, copie o conteúdo.');
-        console.error("-> exportCartaoVacinacaoToCsv: Navegador não suporta download direto.");
+        if (response.status === 401) {
+            logoutUser(false);
+            throw new Error("Não autorizado ou sessão expirada. Por favor, faça login novamente.");
+        }
+        if (!response.ok) {
+            throw new Error(`Erro HTTP: ${response.status}`);
+        }
+        const blob = await response.blob();
+
+        const link = document.createElement('a');
+        if (link.download !== undefined) {
+            const url = URL.createObjectURL(blob);
+            link.setAttribute('href', url);
+            link.setAttribute('download', `cartao_vacinacao_${pessoa.nome.replace(/\s/g, '_')}_${pessoa.id}.csv`);
+            link.style.visibility = 'hidden';
+            document.body.appendChild(link);
+            link.click();
+            document.body.removeChild(link);
+            URL.revokeObjectURL(url);
+            console.log("-> exportCartaoVacinacaoToCsv: Download do CSV disparado.");
+        } else {
+            alert('Seu navegador não suporta download direto de arquivos. Por favor, copie o conteúdo.');
+            console.error("-> exportCartaoVacinacaoToCsv: Navegador não suporta download direto.");
+        }
+    } catch (error) {
+        console.error('Erro ao exportar CSV:', error);
+        alert(`Falha ao exportar o cartão de vacinação: ${error.message}`);
     }
 }
 
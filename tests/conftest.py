@@ -0,0 +1,85 @@
+# cartao_vacinacao_api/tests/conftest.py
+from contextlib import contextmanager
+
+import pytest
+
+from app import create_app
+from commands import init_db, seed_vacinas
+from metrics import contar_sql
+from models import db
+
+
+@contextmanager
+def _app_com_banco(config):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', **config})
+    with app.app_context():
+        init_db()
+        seed_vacinas()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose() # Em memória, o banco é descartado junto com a conexão
+
+
+def _autenticar(client, usuario='teste', senha='senha_teste'):
+    client.post('/register', json={"username": usuario, "password": senha})
+    login_response = client.post('/login', json={"username": usuario, "password": senha})
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {login_response.get_json()['access_token']}"
+    return client
+
+
+@pytest.fixture(scope='session')
+def criar_app():
+    """
+    Context manager que cria um app de teste com as tabelas e o catálogo de vacinas, dentro de um
+    contexto de aplicação. A configuração recebida sobrescreve a padrão (banco em memória).
+
+        with criar_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'teste.db'}"}) as app:
+            ...
+    """
+    return _app_com_banco
+
+
+@pytest.fixture(scope='session')
+def autenticar():
+    """Registra (se preciso) e autentica um usuário de teste; o token vai em todas as requisições do cliente."""
+    return _autenticar
+
+
+@pytest.fixture(scope='module')
+def config_app():
+    """Configuração extra do `app` compartilhado; módulos de teste sobrescrevem este fixture."""
+    return {}
+
+
+@pytest.fixture(scope='module')
+def app(criar_app, config_app):
+    """App com banco em memória, compartilhado pelos testes do módulo, com o contexto de aplicação ativo."""
+    with criar_app(config_app) as app:
+        yield app
+
+
+@pytest.fixture(scope='module')
+def client(app, autenticar):
+    """Cliente de teste do `app`, já autenticado nas rotas protegidas."""
+    with app.test_client() as client:
+        yield autenticar(client)
+
+
+@pytest.fixture
+def orcamento_sql():
+    """
+    Context manager que falha o teste se o bloco executar mais instruções SQL que `maximo`,
+    listando as instruções executadas. Exige um contexto de aplicação ativo.
+
+        with orcamento_sql(2, 'GET /pessoas'):
+            client.get('/pessoas')
+    """
+    @contextmanager
+    def orcamento(maximo, descricao='bloco'):
+        with contar_sql() as instrucoes:
+            yield instrucoes
+        if len(instrucoes) > maximo:
+            listagem = '\n'.join(f"  {numero}. {' '.join(instrucao.split())}" for numero, instrucao in enumerate(instrucoes, 1))
+            pytest.fail(f"{descricao}: {len(instrucoes)} instruções SQL, orçamento de {maximo}:\n{listagem}", pytrace=False)
+    return orcamento
@@ -0,0 +1,93 @@
+# cartao_vacinacao_api/tests/test_alteracoes.py
+# Feed de alterações (GET /changes): um cliente que guarda o cursor recebe só o que mudou
+# desde a última sincronização, no estado atual, com marcas para as exclusões.
+import pytest
+from sqlalchemy import text
+
+from alteracoes import FEED_DDL, criar_feed
+from models import db, Alteracao, Pessoa
+
+
+def sincronizar(client, cursor=None, limit=None):
+    """Percorre todas as páginas a partir de `cursor`; retorna (itens, cursor final)."""
+    itens = []
+    while True:
+        params = {k: v for k, v in (('since', cursor), ('limit', limit)) if v is not None}
+        response = client.get('/changes', query_string=params)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        pagina = response.get_json()
+        itens += pagina["alteracoes"]
+        cursor = pagina["cursor"]
+        if not pagina["tem_mais"]:
+            assert 'X-Next-Cursor' not in response.headers
+            return itens, cursor
+        assert response.headers['X-Next-Cursor'] == cursor
+
+
+def chaves(itens):
+    return [(item["tabela"], item["id"], item["operacao"]) for item in itens]
+
+
+def test_sincronizacao_incremental(client):
+    # Do zero: o catálogo inteiro, em páginas
+    itens, cursor = sincronizar(client, limit=5)
+    vacinas = {item["dados"]["nome"]: item["id"] for item in itens if item["tabela"] == 'vacinas'}
+    assert len(vacinas) == len(itens) == 17
+
+    # Nada mudou: página vazia e o mesmo cursor
+    assert sincronizar(client, cursor) == ([], cursor)
+
+    pessoa_id = client.post('/pessoas', json={"nome": "Sincronizada", "numero_identificacao": "SYNC-1"}).get_json()["id"]
+    vacinacao_id = client.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica",
+                                                    "data_aplicacao": "2024-03-01T09:30:00"}).get_json()["id"]
+    itens, cursor = sincronizar(client, cursor)
+    assert chaves(itens) == [('pessoas', pessoa_id, 'upsert'), ('vacinacoes', vacinacao_id, 'upsert')]
+    assert itens[0]["dados"] == {"id": pessoa_id, "nome": "Sincronizada", "numero_identificacao": "SYNC-1"}
+    assert itens[1]["dados"] == {"id": vacinacao_id, "pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"],
+                                 "dose_aplicada": "Dose Unica", "data_aplicacao": "2024-03-01T09:30:00"}
+
+    # Várias escritas no mesmo registro chegam como uma só, no estado mais recente
+    pessoa = db.session.get(Pessoa, pessoa_id)
+    pessoa.nome = "Renomeada"
+    db.session.commit()
+    pessoa.nome = "Renomeada de novo"
+    db.session.commit()
+    itens, cursor = sincronizar(client, cursor)
+    assert chaves(itens) == [('pessoas', pessoa_id, 'upsert')]
+    assert itens[0]["dados"]["nome"] == "Renomeada de novo"
+
+    # Exclusão em cascata: marcas para a pessoa e para as vacinações dela
+    assert client.delete(f'/pessoas/{pessoa_id}').status_code == 200
+    itens, cursor = sincronizar(client, cursor)
+    assert sorted(chaves(itens)) == [('pessoas', pessoa_id, 'delete'), ('vacinacoes', vacinacao_id, 'delete')]
+    assert all("dados" not in item for item in itens)
+
+    # Um cliente novo não vê a pessoa excluída como existente, e o feed guarda uma linha por registro
+    todos, _ = sincronizar(client)
+    assert ('pessoas', pessoa_id, 'delete') in chaves(todos)
+    assert len(todos) == db.session.query(Alteracao).count() == 17 + 2
+
+
+def test_feed_criado_em_banco_existente(client):
+    # Banco anterior ao feed: sem gatilhos nem linhas em alteracoes
+    for ddl in FEED_DDL:
+        db.session.execute(text(f"DROP TRIGGER {ddl.split()[5]}"))
+    db.session.execute(text("DELETE FROM alteracoes"))
+    db.session.add(Pessoa(nome="Anterior ao feed", numero_identificacao="SYNC-2"))
+    db.session.commit()
+    assert db.session.query(Alteracao).count() == 0
+
+    assert criar_feed() is True
+    itens, _ = sincronizar(client)
+    assert [item["dados"]["nome"] for item in itens if item["tabela"] == 'pessoas'] == ["Anterior ao feed"]
+    assert criar_feed() is False
+
+
+def test_changes_parametros_invalidos(client):
+    assert client.get('/changes?since=xyz').status_code == 400
+    assert client.get('/changes?limit=0').status_code == 400
+
+
+def test_changes_exige_token(app):
+    with app.test_client() as anonimo:
+        assert anonimo.get('/changes').status_code == 401
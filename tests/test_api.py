@@ -1,33 +1,9 @@
 # cartao_vacinacao_api/tests/test_api.py
 import pytest
-from app import app, db # Importe seu aplicativo Flask e o objeto db
-from models import Pessoa, Vacina, Vacinacao # Importe os modelos necessários
-
-# Configuração do cliente de teste para o Flask
-@pytest.fixture(scope='module')
-def client():
-    app.config['TESTING'] = True
-    # Usar um banco de dados em memória para testes, para não bagunçar o DB principal
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    
-    with app.test_client() as client:
-        # PUSH do contexto de aplicação AQUI, antes de qualquer operação que possa precisar dele
-        # Isso garante que um contexto esteja ativo para toda a duração do teste que usa 'client'
-        app_ctx = app.app_context()
-        app_ctx.push() 
-
-        db.create_all() # Cria as tabelas no DB em memória
-        
-        # O app.py já popula as vacinas ao chamar db.create_all() dentro de um app_context().
-        # Portanto, isso já deve ter acontecido quando db.create_all() é executado acima.
-        
-        yield client # Retorna o cliente de teste para os testes
-        
-        # POP do contexto de aplicação AQUI, após os testes
-        # Garante que a sessão seja removida antes do pop do contexto
-        db.session.remove() 
-        db.drop_all() # Limpa o DB após os testes
-        app_ctx.pop() 
+from sqlalchemy import insert
+
+from metrics import contar_sql
+from models import db, Pessoa, Vacina, Vacinacao, User # Importe os modelos necessários
 
 # Exemplo de um teste unitário: Testar a rota principal
 def test_main_route(client):
@@ -69,6 +45,64 @@ def test_get_pessoas(client):
     assert isinstance(response_json, list)
     assert len(response_json) >= 1 # Deve ter pelo menos a Maria Souza
 
+# Teste da paginação por cursor de GET /pessoas
+def test_get_pessoas_paginado(client):
+    """Testa a paginação por cursor (limit/after) e o filtro por nome."""
+    for i in range(5):
+        client.post('/pessoas', json={"nome": f"Paginada {i}", "numero_identificacao": f"PAG{i:08d}"})
+
+    ids_vistos = []
+    cursor = None
+    while True:
+        url = '/pessoas?limit=2&nome=paginada'
+        if cursor:
+            url += f'&after={cursor}'
+        response = client.get(url)
+        assert response.status_code == 200
+        pagina = response.get_json()
+        assert len(pagina) <= 2
+        assert all(p["nome"].startswith("Paginada") for p in pagina)
+        ids_vistos.extend(p["id"] for p in pagina)
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert len(ids_vistos) == 5
+    assert ids_vistos == sorted(ids_vistos) # Ordenado por id, sem repetições
+
+def test_get_pessoas_filtro_nome_com_curingas(client):
+    """Testa que `%`, `_` e `\\` no filtro por nome casam literalmente, e não como curingas do LIKE."""
+    for nome, identificacao in (("Curinga 100% Vacinado", "CUR00001"), ("Curinga_Sublinhado", "CUR00002"),
+                                ("Curinga\\Barra", "CUR00003"), ("Curinga Comum", "CUR00004")):
+        client.post('/pessoas', json={"nome": nome, "numero_identificacao": identificacao})
+
+    def filtrar(nome):
+        response = client.get('/pessoas', query_string={"nome": nome, "limit": 200})
+        assert response.status_code == 200
+        return [pessoa["nome"] for pessoa in response.get_json()]
+
+    assert filtrar("%") == ["Curinga 100% Vacinado"]
+    assert filtrar("_") == ["Curinga_Sublinhado"]
+    assert filtrar("\\") == ["Curinga\\Barra"]
+    assert filtrar("curinga%comum") == []
+
+def test_get_pessoas_limite_e_cursor_invalidos(client):
+    """Testa o teto de página e a rejeição de parâmetros inválidos."""
+    for i in range(3):
+        client.post('/pessoas', json={"nome": f"Teto {i}", "numero_identificacao": f"TETO{i:08d}"})
+    client.application.config['PESSOAS_MAX_PAGE_SIZE'] = 2
+    try:
+        response = client.get('/pessoas?limit=1000')
+        assert response.status_code == 200
+        assert len(response.get_json()) == 2
+        assert 'X-Next-Cursor' in response.headers
+    finally:
+        client.application.config['PESSOAS_MAX_PAGE_SIZE'] = 200
+
+    assert client.get('/pessoas?limit=0').status_code == 400
+    assert client.get('/pessoas?limit=abc').status_code == 400
+    assert client.get('/pessoas?after=%%%').status_code == 400
+
 # Teste para obter uma pessoa por ID
 def test_get_pessoa_by_id(client):
     """Testa a obtenção de uma pessoa por ID."""
@@ -81,6 +115,50 @@ def test_get_pessoa_by_id(client):
     response_json = response.get_json()
     assert response_json["nome"] == "Pedro Santos"
 
+def test_search_pessoas(client):
+    """Testa a busca textual: prefixo, sem acentos, por identificação, relevância, limite e sincronia com escritas."""
+    ids = {}
+    for nome, identificacao in (("João Buscável Araújo", "BUSCA-001"), ("Joana Buscável", "BUSCA-002"),
+                                ("Buscável Buscável Costa", "BUSCA-003")):
+        ids[nome] = client.post('/pessoas', json={"nome": nome, "numero_identificacao": identificacao}).get_json()["id"]
+
+    def buscar(q, **params):
+        response = client.get('/pessoas/search', query_string={"q": q, **params})
+        assert response.status_code == 200
+        return [pessoa["nome"] for pessoa in response.get_json()]
+
+    assert buscar("joao buscavel") == ["João Buscável Araújo"] # Sem acentos
+    assert set(buscar("JO busc")) == {"João Buscável Araújo", "Joana Buscável"} # Prefixo, sem diferenciar maiúsculas
+    assert buscar("araujo") == ["João Buscável Araújo"]
+    assert buscar("busca 003") == ["Buscável Buscável Costa"] # Identificação
+    assert buscar("buscavel")[0] == "Buscável Buscável Costa" # Mais ocorrências do termo, mais relevante
+    assert len(buscar("buscavel", limit=2)) == 2
+    assert buscar("buscavel inexistente") == []
+    assert buscar('"jo*" OR -(') == [] # Sintaxe do FTS5 é tratada como texto
+
+    # Os gatilhos mantêm o índice em sincronia com alterações e exclusões
+    pessoa = db.session.get(Pessoa, ids["Joana Buscável"])
+    pessoa.nome = "Joana Renomeada"
+    db.session.commit()
+    assert buscar("renomeada") == ["Joana Renomeada"]
+    assert "Joana Renomeada" not in buscar("buscavel")
+    assert client.delete(f'/pessoas/{ids["Joana Buscável"]}').status_code == 200
+    assert buscar("renomeada") == []
+
+    assert client.get('/pessoas/search').status_code == 400
+    assert client.get('/pessoas/search?q=%20-%20').status_code == 400
+    assert client.get('/pessoas/search?q=ana&limit=0').status_code == 400
+
+def test_search_pessoas_ordena_todas_as_que_casam(client):
+    """A relevância vale para todos os documentos que casam, não só para os primeiros por id."""
+    # Mais de mil pessoas casam com o termo; a mais relevante é a última cadastrada
+    db.session.execute(insert(Pessoa), [{"nome": f"Ranqueada Silva Souza Pereira Lima {i}", "numero_identificacao": f"RANK-{i:04}"}
+                                        for i in range(1500)])
+    db.session.commit()
+    ultima = client.post('/pessoas', json={"nome": "Ranqueada Ranqueada", "numero_identificacao": "RANK-FIM"}).get_json()
+    response = client.get('/pessoas/search', query_string={"q": "ranqueada", "limit": 1})
+    assert [pessoa["id"] for pessoa in response.get_json()] == [ultima["id"]]
+
 # Teste para excluir uma pessoa
 def test_delete_pessoa(client):
     """Testa a exclusão de uma pessoa e suas vacinações."""
@@ -275,3 +353,303 @@ def test_get_vacinas_by_category(client):
     vacinas_inexistente = response_inexistente.get_json()
     assert isinstance(vacinas_inexistente, list)
     assert len(vacinas_inexistente) == 0 # Nenhuma vacina para categoria inexistente
+
+# Teste do catálogo de vacinas em cache com ETag / 304
+def test_get_vacinas_etag_304(client):
+    """Testa o ETag do catálogo, o 304 com If-None-Match e a invalidação após escrita."""
+    response = client.get('/vacinas')
+    assert response.status_code == 200
+    etag = response.headers.get('ETag')
+    assert etag and not etag.startswith('W/') # ETag forte
+
+    response_304 = client.get('/vacinas', headers={'If-None-Match': etag})
+    assert response_304.status_code == 304
+    assert response_304.data == b''
+
+    response_categoria = client.get('/vacinas?categoria=Nacional', headers={'If-None-Match': etag})
+    assert response_categoria.status_code == 200 # Cada visão por categoria tem seu próprio ETag
+
+    vacina_id = response.get_json()[0]["id"]
+    response_vacina = client.get(f'/vacinas/{vacina_id}')
+    assert response_vacina.status_code == 200
+    assert client.get(f'/vacinas/{vacina_id}', headers={'If-None-Match': response_vacina.headers['ETag']}).status_code == 304
+
+    # Escritas invalidam o catálogo: o ETag antigo deixa de valer
+    add_response = client.post('/vacinas', json={"nome": "Vacina ETag", "categoria": "Outra Vacina"})
+    assert add_response.status_code == 201
+    response_nova = client.get('/vacinas', headers={'If-None-Match': etag})
+    assert response_nova.status_code == 200
+    assert any(v["nome"] == "Vacina ETag" for v in response_nova.get_json())
+
+    nova_id = add_response.get_json()["id"]
+    etag_novo = response_nova.headers['ETag']
+    assert client.delete(f'/vacinas/{nova_id}').status_code == 200
+    response_apos_exclusao = client.get('/vacinas', headers={'If-None-Match': etag_novo})
+    assert response_apos_exclusao.status_code == 200
+    assert all(v["id"] != nova_id for v in response_apos_exclusao.get_json())
+    assert client.get(f'/vacinas/{nova_id}').status_code == 404
+
+# Teste do registro de vacinações em lote
+def test_add_vacinacoes_bulk(client):
+    """Testa o cadastro em lote com um resultado por registro (sucesso, duplicata, inexistentes e inválidos)."""
+    pessoa_id = client.post('/pessoas', json={"nome": "Lote Teste", "numero_identificacao": "LOTE0000001"}).get_json()["id"]
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+
+    client.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "1a Dose",
+                                     "data_aplicacao": "2024-01-01T08:00:00"})
+
+    registros = [
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "1a Dose", "data_aplicacao": "2024-02-01T08:00:00"},
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "1a Dose"}, # Já registrada
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "1a Dose"}, # Duplicata no próprio lote
+        {"pessoa_id": 999999, "vacina_id": vacinas["BCG"], "dose_aplicada": "1a Dose"},
+        {"pessoa_id": pessoa_id, "vacina_id": 999999, "dose_aplicada": "1a Dose"},
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Inventada"},
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["ROTAVIRUS"]}, # Sem dose
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["ROTAVIRUS"], "dose_aplicada": "1a Dose", "data_aplicacao": "01/02/2024"},
+        {"pessoa_id": True, "vacina_id": vacinas["ROTAVIRUS"], "dose_aplicada": "1a Dose"}, # Booleano não é id
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "2a Dose", "data_aplicacao": "2024-03-01T08:00:00"},
+    ]
+    response = client.post('/vacinacoes/bulk', json=registros)
+    assert response.status_code == 200
+    response_json = response.get_json()
+    assert [r["status"] for r in response_json["resultados"]] == [201, 409, 409, 404, 404, 400, 400, 400, 400, 201]
+    assert [r["indice"] for r in response_json["resultados"]] == list(range(len(registros)))
+    assert response_json["inseridos"] == 2
+    assert response_json["rejeitados"] == 8
+
+    ids_inseridos = [r["id"] for r in response_json["resultados"] if r["status"] == 201]
+    vacinacoes = Vacinacao.query.filter(Vacinacao.id.in_(ids_inseridos)).order_by(Vacinacao.id).all()
+    assert [v.dose_aplicada for v in vacinacoes] == ["1a Dose", "2a Dose"]
+
+    assert client.post('/vacinacoes/bulk', json=[]).status_code == 400
+    assert client.post('/vacinacoes/bulk', json={"pessoa_id": pessoa_id}).status_code == 400
+
+# Teste da exportação CSV em streaming
+def test_export_cartao_vacinacao_csv(client):
+    """Testa o CSV do cartão de uma pessoa e a exportação de toda a população."""
+    pessoa_id = client.post('/pessoas', json={"nome": "CSV Teste", "numero_identificacao": "CSV00000001"}).get_json()["id"]
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+    client.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "1a Dose",
+                                     "data_aplicacao": "2023-03-01T10:00:00"})
+    client.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "Faltoso",
+                                     "data_aplicacao": "2023-03-02T11:00:00"})
+
+    response = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao.csv?categoria=Nacional')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    linhas = response.get_data(as_text=True).split("\n")
+
+    colunas = linhas[0].split(";")
+    assert colunas[0] == "Dose/Vacina"
+    assert '"BCG"' in colunas and '"HEPATITE B"' in colunas
+    assert '"Anti Rábica Humana"' not in colunas # Só a categoria pedida
+
+    primeira_dose = linhas[1].split(";")
+    assert primeira_dose[0] == '"Tipo 1ª Dose"'
+    assert primeira_dose[colunas.index('"BCG"')] == '"Aplicada: 01/03/2023"'
+    faltoso = next(linha for linha in linhas if linha.startswith('"Faltoso"')).split(";")
+    assert faltoso[colunas.index('"HEPATITE B"')] == '"Faltoso"'
+    assert "Nome;CSV Teste" in linhas
+    assert f"ID;{pessoa_id}" in linhas
+
+    assert client.get('/pessoas/999999/cartao_vacinacao.csv').status_code == 404
+
+    response_populacao = client.get('/vacinacoes/export.csv')
+    assert response_populacao.status_code == 200
+    assert response_populacao.is_streamed
+    conteudo = response_populacao.get_data(as_text=True)
+    assert "Nome;CSV Teste" in conteudo
+    assert conteudo.count("Dose/Vacina") == conteudo.count("Informações da Pessoa;") >= 1
+
+# Testes do hash de senhas no pool dedicado
+def test_login_atualiza_hash_desatualizado(client):
+    """Testa o rehash transparente de senhas com método/custo diferente do configurado."""
+    user = User(username="usuario_antigo")
+    user.set_password("senha_antiga", method="pbkdf2:sha256:1000")
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.post('/login', json={"username": "usuario_antigo", "password": "senha_antiga"})
+    assert response.status_code == 200
+    db.session.refresh(user)
+    assert user.password_hash.startswith(client.application.config['PASSWORD_HASH_METHOD'] + '$')
+
+    # A senha continua válida após o rehash, e senhas erradas continuam recusadas
+    assert client.post('/login', json={"username": "usuario_antigo", "password": "senha_antiga"}).status_code == 200
+    assert client.post('/login', json={"username": "usuario_antigo", "password": "errada"}).status_code == 401
+
+def test_login_pool_de_hash_saturado(client):
+    """Testa a recusa imediata com 503 quando o pool de hash e sua fila estão cheios."""
+    vagas = client.application.extensions['password_hasher'].vagas
+    capacidade = client.application.config['PASSWORD_HASH_WORKERS'] + client.application.config['PASSWORD_HASH_QUEUE_MAX']
+    for _ in range(capacidade):
+        assert vagas.acquire(blocking=False)
+    try:
+        response = client.post('/login', json={"username": "teste", "password": "senha_teste"})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        for _ in range(capacidade):
+            vagas.release()
+
+    assert client.post('/login', json={"username": "teste", "password": "senha_teste"}).status_code == 200
+
+# Testes do cache de cartões de vacinação
+def test_cartao_vacinacao_cache(client):
+    """Testa HIT/MISS, ETag/304 e a invalidação do cartão pelas rotas de escrita."""
+    pessoa_id = client.post('/pessoas', json={"nome": "Cache Teste", "numero_identificacao": "CACHE000001"}).get_json()["id"]
+    outra_id = client.post('/pessoas', json={"nome": "Cache Outra", "numero_identificacao": "CACHE000002"}).get_json()["id"]
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+
+    primeira = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert primeira.headers['X-Cache'] == 'MISS'
+    segunda = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert segunda.headers['X-Cache'] == 'HIT'
+    assert segunda.data == primeira.data
+    assert client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao', headers={'If-None-Match': segunda.headers['ETag']}).status_code == 304
+
+    # add_vacinacao invalida o cartão da pessoa
+    add_response = client.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "1a Dose",
+                                                    "data_aplicacao": "2024-01-01T08:00:00"})
+    vacinacao_id = add_response.get_json()["id"]
+    response = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert len(response.get_json()["vacinas_registradas"]) == 1
+
+    # delete_vacinacao invalida o cartão da pessoa
+    assert client.delete(f'/vacinacoes/{vacinacao_id}').status_code == 200
+    response = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()["vacinas_registradas"] == []
+
+    # delete_vacina invalida só os cartões que contêm a vacina
+    nova_vacina_id = client.post('/vacinas', json={"nome": "Vacina Cache", "categoria": "Outra Vacina"}).get_json()["id"]
+    client.post('/vacinacoes/bulk', json=[{"pessoa_id": pessoa_id, "vacina_id": nova_vacina_id, "dose_aplicada": "Dose Unica"}])
+    assert client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao').headers['X-Cache'] == 'MISS' # bulk também invalida
+    client.get(f'/pessoas/{outra_id}/cartao_vacinacao')
+    assert client.delete(f'/vacinas/{nova_vacina_id}').status_code == 200
+    response = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()["vacinas_registradas"] == []
+    assert client.get(f'/pessoas/{outra_id}/cartao_vacinacao').headers['X-Cache'] == 'HIT'
+
+    # delete_pessoa invalida o cartão da pessoa
+    assert client.delete(f'/pessoas/{outra_id}').status_code == 200
+    assert client.get(f'/pessoas/{outra_id}/cartao_vacinacao').status_code == 404
+
+    stats = client.get('/cartoes/cache').get_json()
+    assert stats["hits"] >= 3
+    assert stats["misses"] >= 5
+
+def test_cartoes_batch(client):
+    """Testa os cartões em lote: mesmo conteúdo do cartão individual, pessoas inexistentes, cache e limites."""
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+    pessoa_ids = [client.post('/pessoas', json={"nome": f"Lote Cartão {i}", "numero_identificacao": f"BATCH000000{i}"}).get_json()["id"]
+                  for i in range(3)]
+    client.post('/vacinacoes/bulk', json=[
+        {"pessoa_id": pessoa_ids[0], "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica", "data_aplicacao": "2024-01-01T08:00:00"},
+        {"pessoa_id": pessoa_ids[0], "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "1a Dose", "data_aplicacao": "2024-01-02T08:00:00"},
+        {"pessoa_id": pessoa_ids[0], "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "2a Dose", "data_aplicacao": "2024-02-02T08:00:00"},
+        {"pessoa_id": pessoa_ids[2], "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica", "data_aplicacao": "2024-03-01T08:00:00"},
+    ])
+    client.get(f'/pessoas/{pessoa_ids[2]}/cartao_vacinacao') # Um dos cartões já em cache
+
+    response = client.post('/cartoes/batch', json={"pessoa_ids": [pessoa_ids[2], 999999, pessoa_ids[0], pessoa_ids[1], pessoa_ids[0]]})
+    assert response.status_code == 200
+    response_json = response.get_json()
+    assert response_json["nao_encontrados"] == [999999]
+    assert sorted(response_json["cartoes"]) == sorted(str(pessoa_id) for pessoa_id in pessoa_ids)
+    for pessoa_id in pessoa_ids:
+        assert response_json["cartoes"][str(pessoa_id)] == client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao').get_json()
+    assert response_json["cartoes"][str(pessoa_ids[1])]["vacinas_registradas"] == []
+    # Os cartões montados pelo lote entram no cache
+    assert client.get(f'/pessoas/{pessoa_ids[0]}/cartao_vacinacao').headers['X-Cache'] == 'HIT'
+
+    assert client.post('/cartoes/batch', json={"pessoa_ids": []}).status_code == 400
+    assert client.post('/cartoes/batch', json={"pessoa_ids": ["1"]}).status_code == 400
+    assert client.post('/cartoes/batch', json=[1, 2]).status_code == 400
+    maximo = client.application.config['CARTOES_BATCH_MAX']
+    assert client.post('/cartoes/batch', json={"pessoa_ids": list(range(1, maximo + 2))}).status_code == 413
+
+def test_cartao_cache_lru_e_ttl(criar_app):
+    """Testa o descarte LRU por capacidade e a expiração por TTL."""
+    from cartao import cartao_cache
+    with criar_app({'CARTAO_CACHE_MAX': 2}) as app:
+        versao = cartao_cache.versao
+        cartao_cache.set(1, b'1', 'e1', {10}, versao)
+        cartao_cache.set(2, b'2', 'e2', {10}, versao)
+        assert cartao_cache.get(1) == (b'1', 'e1') # 1 passa a ser o mais recente
+        cartao_cache.set(3, b'3', 'e3', {20}, versao)
+        assert cartao_cache.get(2) is None # 2 era o menos usado
+        assert cartao_cache.get(1) is not None and cartao_cache.get(3) is not None
+
+        # Cartão montado antes de uma invalidação não é guardado
+        cartao_cache.invalidate_pessoa(1)
+        cartao_cache.set(1, b'velho', 'e', {10}, versao)
+        assert cartao_cache.get(1) is None
+
+        app.extensions['cartao_cache'].ttl = -1 # Tudo o que for guardado já nasce expirado
+        cartao_cache.set(4, b'4', 'e4', set(), cartao_cache.versao)
+        assert cartao_cache.get(4) is None
+
+# Testes da serialização rápida (mesmos bytes do jsonify com marshmallow)
+@pytest.mark.parametrize('usar_orjson', [True, False])
+def test_json_bytes_igual_ao_jsonify(client, monkeypatch, usar_orjson):
+    """Testa que o caminho rápido produz exatamente os bytes do jsonify do Flask."""
+    import serializers
+    if not usar_orjson:
+        monkeypatch.setattr(serializers, 'orjson', None)
+    elif serializers.orjson is None:
+        pytest.skip("orjson não instalado")
+
+    dados = [{"nome": "João \"Zé\" d'Ávila \\ /", "id": 1, "numero_identificacao": "ção \x7f\x1f\U0001F600"},
+             {"vazio": [], "nulo": None, "b": True, "x": {"z": 1, "a": [1.5, -2]}}]
+    assert serializers.json_bytes(dados) == client.application.json.response(dados).get_data()
+
+def test_listas_rapidas_iguais_ao_schema(client):
+    """Testa GET /pessoas e GET /vacinas contra a serialização original pelos schemas do marshmallow."""
+    from app import pessoas_schema, vacinas_schema
+    client.post('/pessoas', json={"nome": "Conceição Ñandú", "numero_identificacao": "ÇÃO0000001"})
+
+    response = client.get('/pessoas?limit=200')
+    ids = [p["id"] for p in response.get_json()]
+    pessoas = Pessoa.query.filter(Pessoa.id.in_(ids)).order_by(Pessoa.id).all()
+    assert response.data == pessoas_schema.jsonify(pessoas).get_data()
+
+    response = client.get('/vacinas')
+    assert response.data == vacinas_schema.jsonify(Vacina.query.order_by(Vacina.id).all()).get_data()
+
+# Testes da instrumentação (/metrics e Server-Timing)
+def test_metrics_e_server_timing(client):
+    """Testa o Server-Timing do cartão e a exposição das métricas por rota no formato do Prometheus."""
+    pessoa_id = client.post('/pessoas', json={"nome": "Pessoa Métricas", "numero_identificacao": "MET0000001"}).get_json()["id"]
+    response = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    timing = response.headers['Server-Timing']
+    assert timing.startswith('db;dur=') and 'app;dur=' in timing and 'total;dur=' in timing
+    assert '"0 SQL"' not in timing # O cartão (fora do cache) consulta o banco
+
+    client.get('/pessoas/999999')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    texto = response.get_data(as_text=True)
+    assert 'http_requests_total{rota="/pessoas/<int:pessoa_id>/cartao_vacinacao",metodo="GET",status="200"}' in texto
+    assert 'http_requests_total{rota="/pessoas/<int:id>",metodo="GET",status="404"}' in texto
+    assert 'http_request_duration_seconds_bucket{rota="/pessoas/<int:pessoa_id>/cartao_vacinacao",metodo="GET",le="+Inf"}' in texto
+    assert 'db_statements_per_request_count{rota="/pessoas",metodo="POST"}' in texto
+    assert '# TYPE cartao_cache_hits_total counter' in texto
+
+def test_metrics_nao_consomem_respostas_em_streaming(client):
+    """Testa que os after_request (métricas, Server-Timing) não geram o corpo das exportações CSV antes do envio."""
+    app = client.application
+    with app.test_request_context('/vacinacoes/export.csv', headers={'Authorization': client.environ_base['HTTP_AUTHORIZATION']}):
+        with contar_sql() as instrucoes:
+            response = app.full_dispatch_request()
+        assert response.is_streamed
+        assert 'Server-Timing' in response.headers
+        assert not any('FROM vacinacoes' in instrucao for instrucao in instrucoes)
+        with contar_sql() as instrucoes:
+            b''.join(response.iter_encoded())
+        assert any('FROM vacinacoes' in instrucao for instrucao in instrucoes) # O SQL roda enquanto o corpo é enviado
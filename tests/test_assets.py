@@ -0,0 +1,91 @@
+# cartao_vacinacao_api/tests/test_assets.py
+# Arquivos estáticos versionados (assets.py) e compressão das respostas dinâmicas (compressao.py).
+import gzip
+import re
+
+import pytest
+
+from assets import minificar_css, minificar_js
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+@pytest.fixture(scope='module')
+def config_app():
+    return {'COMPRESSAO_MIN_BYTES': 200}
+
+
+def test_minificadores():
+    assert minificar_css("/* título */\na  >  b ,\nc {\n    color: red;\n    margin: 0 auto;\n}\n") == "a>b,c{color:red;margin:0 auto}\n"
+    js = "function f() {\n    // comentário\n    console.log('x', y);\n\n    return `a; b`;\n}\nconsole.log('a'); g();\n"
+    assert minificar_js(js) == "function f() {\nreturn `a; b`;\n}\nconsole.log('a'); g();\n"
+
+
+def test_index_referencia_assets_versionados(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.cache_control.no_cache
+    urls = re.findall(r'(?:href|src)="(/assets/[^"]+)"', response.get_data(as_text=True))
+    assert [url.rsplit('.', 1)[-1] for url in urls] == ['css', 'js']
+    assert all(re.fullmatch(r'/assets/\w+\.[0-9a-f]{12}\.(css|js)', url) for url in urls), urls
+
+    assert client.get('/', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_asset_imutavel_e_comprimido(client):
+    url = re.search(r'src="(/assets/[^"]+)"', client.get('/').get_data(as_text=True)).group(1)
+
+    original = client.get(url)
+    assert original.status_code == 200
+    assert original.mimetype == 'text/javascript'
+    assert 'Content-Encoding' not in original.headers
+    assert original.cache_control.public and original.cache_control.immutable
+    assert original.cache_control.max_age == 365 * 24 * 3600
+    corpo = original.get_data()
+    assert b'console.log(' not in corpo
+    assert len(corpo) < len(open('static/script.js', 'rb').read())
+
+    comprimido = client.get(url, headers=GZIP)
+    assert comprimido.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in comprimido.headers['Vary']
+    assert gzip.decompress(comprimido.get_data()) == corpo
+    assert comprimido.headers['ETag'] != original.headers['ETag']
+
+    revalidado = client.get(url, headers={**GZIP, 'If-None-Match': comprimido.headers['ETag']})
+    assert revalidado.status_code == 304
+    assert revalidado.headers['ETag'] == comprimido.headers['ETag']
+
+    assert client.get('/assets/script.000000000000.js').status_code == 404
+
+
+def test_respostas_json_comprimidas(client):
+    for indice in range(30):
+        client.post('/pessoas', json={"nome": f"Comprimida {indice}", "numero_identificacao": f"GZ-{indice:04d}"})
+
+    original = client.get('/pessoas?limit=20')
+    comprimido = client.get('/pessoas?limit=20', headers=GZIP)
+    assert comprimido.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in comprimido.headers['Vary']
+    assert gzip.decompress(comprimido.get_data()) == original.get_data()
+    assert len(comprimido.get_data()) < len(original.get_data()) / 2
+    assert comprimido.headers['X-Next-Cursor'] == original.headers['X-Next-Cursor']
+
+    # Abaixo do limite, sem compressão
+    pequeno = client.get('/pessoas?limit=1', headers=GZIP)
+    assert 'Content-Encoding' not in pequeno.headers
+    # Exportações em streaming passam sem compressão
+    csv = client.get('/vacinacoes/export.csv', headers=GZIP)
+    assert csv.status_code == 200 and 'Content-Encoding' not in csv.headers
+
+
+def test_etag_da_resposta_comprimida(client):
+    original = client.get('/vacinas')
+    comprimido = client.get('/vacinas', headers=GZIP)
+    assert comprimido.headers['Content-Encoding'] == 'gzip'
+    assert comprimido.headers['ETag'] == original.headers['ETag'][:-1] + '-gzip"'
+
+    # O ETag de cada representação revalida com 304 e volta igual
+    for headers, etag in ((GZIP, comprimido.headers['ETag']), ({}, original.headers['ETag'])):
+        revalidado = client.get('/vacinas', headers={**headers, 'If-None-Match': etag})
+        assert revalidado.status_code == 304
+        assert revalidado.headers['ETag'] == etag
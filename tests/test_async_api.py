@@ -0,0 +1,59 @@
+# cartao_vacinacao_api/tests/test_async_api.py
+# As rotas de leitura assíncronas (/async/...) respondem exatamente o mesmo que as síncronas.
+import pytest
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('asgiref')
+
+from benchmarks.dados import criar_app_benchmark
+from cartao import cartao_cache
+from catalog import catalogo_vacinas
+from models import db
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory, autenticar):
+    # O engine assíncrono abre suas próprias conexões: o banco precisa estar em arquivo
+    banco = 'sqlite:///' + str(tmp_path_factory.mktemp('async') / 'async.db')
+    app, pessoa_ids = criar_app_benchmark(banco, 120, config={'TESTING': True, 'ASYNC_READS': True})
+    with app.app_context(), app.test_client() as client:
+        autenticar(client)
+        client.pessoa_ids = pessoa_ids
+        yield client
+        db.engine.dispose()
+
+
+def test_pessoas_async_igual_ao_sync(client):
+    for query in ('', '?limit=7', '?limit=7&nome=Lima'):
+        sync, assincrono = client.get(f'/pessoas{query}'), client.get(f'/async/pessoas{query}')
+        assert assincrono.status_code == 200
+        assert assincrono.data == sync.data
+        assert assincrono.headers.get('X-Next-Cursor') == sync.headers.get('X-Next-Cursor')
+        if 'Link' in sync.headers:
+            assert assincrono.headers['Link'].startswith('</async/pessoas?')
+
+    assert client.get('/async/pessoas?limit=abc').status_code == 400
+
+
+def test_vacinas_async_igual_ao_sync(client):
+    catalogo_vacinas.invalidate() # Força a carga do catálogo pelo engine assíncrono
+    assincrono = client.get('/async/vacinas?categoria=Nacional')
+    sync = client.get('/vacinas?categoria=Nacional')
+    assert assincrono.status_code == 200
+    assert assincrono.data == sync.data and assincrono.headers['ETag'] == sync.headers['ETag']
+    assert client.get('/async/vacinas', headers={'If-None-Match': sync.headers['ETag']}).status_code == 200
+    assert client.get('/async/vacinas?categoria=Nacional', headers={'If-None-Match': sync.headers['ETag']}).status_code == 304
+
+
+def test_cartao_async_igual_ao_sync(client):
+    pessoa_id = client.pessoa_ids[3]
+    cartao_cache.invalidate_pessoa(pessoa_id)
+    assincrono = client.get(f'/async/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert assincrono.status_code == 200 and assincrono.headers['X-Cache'] == 'MISS'
+    cartao_cache.invalidate_pessoa(pessoa_id)
+    sync = client.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert assincrono.data == sync.data
+    assert client.get(f'/async/pessoas/{pessoa_id}/cartao_vacinacao').headers['X-Cache'] == 'HIT'
+
+    assert client.get('/async/pessoas/999999/cartao_vacinacao').status_code == 404
+    assert client.get(f'/async/pessoas/{pessoa_id}/cartao_vacinacao', headers={'Authorization': ''}).status_code == 401
@@ -0,0 +1,40 @@
+# cartao_vacinacao_api/tests/test_benchmarks.py
+# O gerador de dados dos benchmarks precisa ser determinístico para que execuções sejam comparáveis.
+from sqlalchemy import select
+
+from app import create_app
+from benchmarks.dados import gerar_dados
+from benchmarks.resultados import estatisticas
+from commands import init_db, seed_vacinas
+from models import db, Pessoa, Vacinacao
+
+
+def _gerar(semente):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        init_db()
+        seed_vacinas()
+        pessoa_ids, total = gerar_dados(50, semente, sem_vacinacoes=5)
+        pessoas = db.session.execute(select(Pessoa.nome, Pessoa.numero_identificacao).order_by(Pessoa.id)).all()
+        vacinacoes = db.session.execute(
+            select(Vacinacao.pessoa_id, Vacinacao.vacina_id, Vacinacao.dose_aplicada, Vacinacao.data_aplicacao)
+            .order_by(Vacinacao.id)
+        ).all()
+        assert total == len(vacinacoes)
+        # As últimas pessoas ficam livres para os benchmarks de escrita
+        assert not {linha.pessoa_id for linha in vacinacoes} & set(pessoa_ids[-5:])
+        db.session.remove()
+    return pessoas, vacinacoes
+
+
+def test_gerador_deterministico():
+    assert _gerar(7) == _gerar(7)
+    assert _gerar(7) != _gerar(8)
+
+
+def test_estatisticas_percentis():
+    resumo = estatisticas([i / 1000 for i in range(1, 101)], duracao=2)
+    assert resumo["requisicoes"] == 100
+    assert resumo["p50_ms"] == 50.5
+    assert resumo["p99_ms"] == 99.01
+    assert resumo["rps"] == 50.0
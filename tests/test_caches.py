@@ -0,0 +1,74 @@
+# cartao_vacinacao_api/tests/test_caches.py
+# Caches por processo (cartões e catálogo de vacinas) com vários processos sobre o mesmo banco:
+# as escritas de um processo chegam aos caches dos outros pelo feed de alterações, sem esperar o TTL.
+import pytest
+
+
+@pytest.fixture
+def processos(criar_app, autenticar, tmp_path):
+    """Dois apps sobre o mesmo arquivo, como dois workers do gunicorn: cada um com os seus caches."""
+    config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'caches.db'}"}
+    with criar_app(config) as primeiro, criar_app(config) as segundo:
+        yield autenticar(primeiro.test_client()), autenticar(segundo.test_client())
+
+
+def test_cartao_em_cache_ve_escritas_de_outro_processo(processos):
+    leitor, escritor = processos
+    vacinas = {v["nome"]: v["id"] for v in leitor.get('/vacinas').get_json()}
+    pessoa_id, outra_id = (leitor.post('/pessoas', json={"nome": nome, "numero_identificacao": f"CACHE-{i}"}).get_json()["id"]
+                           for i, nome in enumerate(("Ana Cache", "Bia Cache")))
+
+    def cartao(id):
+        return leitor.get(f'/pessoas/{id}/cartao_vacinacao')
+
+    cartao(pessoa_id), cartao(outra_id)
+    assert cartao(pessoa_id).headers['X-Cache'] == 'HIT'
+
+    # Vacinação gravada pelo outro processo: só o cartão da pessoa sai do cache
+    vacinacao_id = escritor.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica",
+                                                      "data_aplicacao": "2024-01-01T08:00:00"}).get_json()["id"]
+    response = cartao(pessoa_id)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [v["id_vacina"] for v in response.get_json()["vacinas_registradas"]] == [vacinas["BCG"]]
+    assert cartao(outra_id).headers['X-Cache'] == 'HIT'
+
+    # A vacinação excluída não tem mais pessoa: o cartão é achado pelo id da vacinação
+    assert cartao(pessoa_id).headers['X-Cache'] == 'HIT'
+    assert escritor.delete(f'/vacinacoes/{vacinacao_id}').status_code == 200
+    response = cartao(pessoa_id)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()["vacinas_registradas"] == []
+    assert cartao(outra_id).headers['X-Cache'] == 'HIT'
+
+    # Lote de outro processo e exclusão da pessoa
+    escritor.post('/vacinacoes/bulk', json=[{"pessoa_id": outra_id, "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "1a Dose"}])
+    assert len(cartao(outra_id).get_json()["vacinas_registradas"]) == 1
+    assert escritor.delete(f'/pessoas/{pessoa_id}').status_code == 200
+    assert cartao(pessoa_id).status_code == 404
+
+
+def test_lote_de_cartoes_ve_escritas_de_outro_processo(processos):
+    leitor, escritor = processos
+    pessoa_id = leitor.post('/pessoas', json={"nome": "Caio Cache", "numero_identificacao": "CACHE-LOTE"}).get_json()["id"]
+    assert leitor.post('/cartoes/batch', json={"pessoa_ids": [pessoa_id]}).get_json()["cartoes"][str(pessoa_id)]["vacinas_registradas"] == []
+
+    escritor.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": 1, "dose_aplicada": "1a Dose"})
+    cartoes = leitor.post('/cartoes/batch', json={"pessoa_ids": [pessoa_id]}).get_json()["cartoes"]
+    assert len(cartoes[str(pessoa_id)]["vacinas_registradas"]) == 1
+
+
+def test_catalogo_ve_escritas_de_outro_processo(processos):
+    leitor, escritor = processos
+    etag = leitor.get('/vacinas').headers['ETag']
+    # Escritas em outras tabelas não mudam a posição das vacinas no feed: o catálogo continua valendo
+    escritor.post('/pessoas', json={"nome": "Davi Cache", "numero_identificacao": "CACHE-CATALOGO"})
+    assert leitor.get('/vacinas', headers={'If-None-Match': etag}).status_code == 304
+
+    nova_id = escritor.post('/vacinas', json={"nome": "Vacina de Outro Processo", "categoria": "Outra Vacina"}).get_json()["id"]
+    response = leitor.get('/vacinas', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert "Vacina de Outro Processo" in [vacina["nome"] for vacina in response.get_json()]
+    assert leitor.get(f'/vacinas/{nova_id}').status_code == 200
+
+    assert escritor.delete(f'/vacinas/{nova_id}').status_code == 200
+    assert leitor.get(f'/vacinas/{nova_id}').status_code == 404
@@ -0,0 +1,96 @@
+# cartao_vacinacao_api/tests/test_doses.py
+# Catálogo de doses: vacinacoes guarda dose_id, a API continua usando os rótulos,
+# e `flask migrar-doses` converte bancos com a dose em texto.
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import StatementError
+
+from commands import converter_doses_para_texto, migrar_doses
+from models import db, Dose, Pessoa, Vacinacao, DOSES
+from queries import cartao_query
+
+
+@pytest.fixture
+def app(criar_app, tmp_path):
+    with criar_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'doses.db'}"}) as app:
+        yield app
+
+
+def _vacinar(doses):
+    pessoa = Pessoa(nome="Dose Teste", numero_identificacao="DOSE-001")
+    db.session.add(pessoa)
+    db.session.flush()
+    for vacina_id, dose in enumerate(doses, 1):
+        db.session.add(Vacinacao(pessoa_id=pessoa.id, vacina_id=vacina_id, dose_aplicada=dose))
+    db.session.commit()
+    return pessoa.id
+
+
+def test_dose_gravada_como_id(app):
+    assert {dose.id: dose.nome for dose in Dose.query} == DOSES
+    pessoa_id = _vacinar(["1a Dose", "Faltoso"])
+
+    assert db.session.execute(text("SELECT dose_id FROM vacinacoes ORDER BY id")).scalars().all() == [1, 7]
+    assert [linha.dose_aplicada for linha in cartao_query(pessoa_id)] == ["1a Dose", "Faltoso"]
+    assert Vacinacao.query.filter_by(dose_aplicada="Faltoso").count() == 1
+
+    with pytest.raises(StatementError, match="Dose 'Dose Inventada' inválida"):
+        Vacinacao.query.filter_by(dose_aplicada="Dose Inventada").count()
+    db.session.rollback()
+
+
+def test_migrar_doses(app):
+    pessoa_id = _vacinar(["1a Dose", "Reforco", "2a Reforco"])
+    cartao = [tuple(linha) for linha in cartao_query(pessoa_id)]
+    converter_doses_para_texto()
+    assert db.session.execute(text("SELECT dose_aplicada FROM vacinacoes ORDER BY id")).scalars().all() == ["1a Dose", "Reforco", "2a Reforco"]
+
+    runner = app.test_cli_runner()
+    resultado = runner.invoke(args=['migrar-doses', '--vacuum'])
+    assert resultado.exit_code == 0, resultado.output
+    assert "3 vacinação(ões) migrada(s)" in resultado.output
+    db.session.remove()
+
+    assert [tuple(linha) for linha in cartao_query(pessoa_id)] == cartao
+    assert db.session.execute(text("SELECT dose_id FROM vacinacoes ORDER BY id")).scalars().all() == [1, 4, 11]
+    indices = db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'vacinacoes'")).scalars().all()
+    assert {'ix_vacinacoes_pessoa_data', 'ix_vacinacoes_vacina_id'} <= set(indices)
+    assert db.session.execute(text("SELECT SUM(total) FROM estatisticas_vacinacao")).scalar() == 3
+
+    assert "nada a migrar" in runner.invoke(args=['migrar-doses']).output
+
+
+def test_migrar_doses_recria_feed_de_alteracoes(app, autenticar):
+    # A reconstrução de vacinacoes descarta os gatilhos do feed junto com a tabela antiga
+    pessoa_id = _vacinar(["1a Dose"])
+    converter_doses_para_texto()
+    gatilhos = "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'vacinacoes' ORDER BY name"
+    assert db.session.execute(text(gatilhos)).scalars().all() == []
+
+    assert migrar_doses() == 1
+    assert db.session.execute(text(gatilhos)).scalars().all() == [
+        'alteracoes_vacinacoes_ad', 'alteracoes_vacinacoes_ai', 'alteracoes_vacinacoes_au'
+    ]
+
+    client = autenticar(app.test_client())
+    cursor = client.get('/changes').get_json()["cursor"]
+    response = client.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": 2, "dose_aplicada": "1a Dose",
+                                                "data_aplicacao": "2024-01-10T08:00:00"})
+    assert response.status_code == 201
+    alteracoes = client.get('/changes', query_string={"since": cursor}).get_json()["alteracoes"]
+    assert [(item["tabela"], item["id"], item["operacao"]) for item in alteracoes] == [
+        ('vacinacoes', response.get_json()["id"], 'upsert')
+    ]
+
+
+def test_migrar_doses_recusa_dose_desconhecida(app):
+    _vacinar(["1a Dose"])
+    converter_doses_para_texto()
+    db.session.execute(text("UPDATE vacinacoes SET dose_aplicada = 'Dose Antiga'"))
+    db.session.commit()
+
+    resultado = app.test_cli_runner().invoke(args=['migrar-doses'])
+    assert resultado.exit_code != 0
+    assert "Dose Antiga" in resultado.output
+    db.session.rollback()
+    assert db.session.execute(text("SELECT dose_aplicada FROM vacinacoes")).scalars().all() == ["Dose Antiga"]
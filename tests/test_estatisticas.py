@@ -0,0 +1,109 @@
+# cartao_vacinacao_api/tests/test_estatisticas.py
+# Estatísticas de cobertura mantidas pelas rotas de escrita: depois de cada escrita, a tabela
+# pré-agregada precisa ser igual à recalculada do zero por `flask rebuild-estatisticas`.
+import pytest
+
+import estatisticas
+from models import db, EstatisticaVacinacao
+
+
+def _mantidas():
+    return estatisticas.consultar(['vacina', 'dose', 'mes'])
+
+
+def assert_igual_ao_recalculo():
+    mantidas = _mantidas()
+    estatisticas.reconstruir()
+    assert mantidas == _mantidas()
+
+
+def test_estatisticas_acompanham_as_escritas(client):
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+    pessoas = [client.post('/pessoas', json={"nome": f"Estatística {i}", "numero_identificacao": f"EST{i:08d}"}).get_json()["id"]
+               for i in range(3)]
+
+    vacinacao_id = client.post('/vacinacoes', json={"pessoa_id": pessoas[0], "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica",
+                                                    "data_aplicacao": "2024-01-10T08:00:00"}).get_json()["id"]
+    assert_igual_ao_recalculo()
+
+    client.post('/vacinacoes/bulk', json=[
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas[nome], "dose_aplicada": dose, "data_aplicacao": data}
+        for pessoa_id in pessoas
+        for nome, dose, data in (("HEPATITE B", "1a Dose", "2024-01-15T08:00:00"), ("HEPATITE B", "2a Dose", "2024-02-15T08:00:00"),
+                                 ("ROTAVIRUS", "1a Dose", "2024-02-20T08:00:00"))
+    ])
+    assert_igual_ao_recalculo()
+    grupos = {(g["nome_vacina"], g["dose_aplicada"], g["mes"]): g["total"] for g in _mantidas()}
+    assert grupos == {("BCG", "Dose Unica", "2024-01"): 1, ("HEPATITE B", "1a Dose", "2024-01"): 3,
+                      ("HEPATITE B", "2a Dose", "2024-02"): 3, ("ROTAVIRUS", "1a Dose", "2024-02"): 3}
+
+    # Exclusões: o grupo que chega a zero desaparece
+    assert client.delete(f'/vacinacoes/{vacinacao_id}').status_code == 200
+    assert_igual_ao_recalculo()
+    assert all(g["nome_vacina"] != "BCG" for g in _mantidas())
+
+    assert client.delete(f'/pessoas/{pessoas[0]}').status_code == 200
+    assert_igual_ao_recalculo()
+
+    assert client.delete(f'/vacinas/{vacinas["ROTAVIRUS"]}').status_code == 200
+    assert_igual_ao_recalculo()
+    assert {(g["nome_vacina"], g["total"]) for g in _mantidas()} == {("HEPATITE B", 2)}
+
+
+def test_get_estatisticas(client):
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+    pessoa_id = client.post('/pessoas', json={"nome": "Estatística Rota", "numero_identificacao": "EST-ROTA"}).get_json()["id"]
+    client.post('/vacinacoes/bulk', json=[
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica", "data_aplicacao": "2023-05-01T08:00:00"},
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["Dengue Qdenga"], "dose_aplicada": "1a Dose", "data_aplicacao": "2023-06-01T08:00:00"},
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas["Dengue Qdenga"], "dose_aplicada": "2a Dose", "data_aplicacao": "2023-09-01T08:00:00"},
+    ])
+
+    response = client.get('/estatisticas?agrupar=categoria&de=2023-01&ate=2023-12')
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "agrupar": ["categoria"],
+        "total": 3,
+        "grupos": [{"categoria": "Nacional", "total": 1}, {"categoria": "Outra Vacina", "total": 2}]
+    }
+
+    response = client.get(f'/estatisticas?agrupar=mes,dose&vacina_id={vacinas["Dengue Qdenga"]}&ate=2023-08')
+    assert response.get_json()["grupos"] == [{"mes": "2023-06", "dose_aplicada": "1a Dose", "total": 1}]
+
+    response = client.get('/estatisticas?agrupar=&categoria=Outra Vacina&dose_aplicada=2a Dose&de=2023-01&ate=2023-12')
+    assert response.get_json()["total"] == 1
+
+    assert client.get('/estatisticas?agrupar=pessoa').status_code == 400
+    assert client.get('/estatisticas?de=2023-13').status_code == 400
+    assert client.get('/estatisticas?vacina_id=abc').status_code == 400
+    assert client.get('/estatisticas?dose_aplicada=Dose Inventada').status_code == 400
+
+
+def test_rebuild_estatisticas_command(client):
+    db.session.execute(db.delete(EstatisticaVacinacao))
+    db.session.commit()
+    assert _mantidas() == []
+    resultado = client.application.test_cli_runner().invoke(args=['rebuild-estatisticas'])
+    assert resultado.exit_code == 0, resultado.output
+    assert "grupo(s)" in resultado.output
+    assert _mantidas() != []
+
+
+def test_ajuste_sem_upsert_nativo(client, monkeypatch):
+    # Caminho dos bancos sem INSERT ... ON CONFLICT: UPDATE dos grupos existentes e INSERT dos novos
+    monkeypatch.setattr(estatisticas, 'INSERTS_COM_UPSERT', {})
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+    pessoas = [client.post('/pessoas', json={"nome": f"Sem Upsert {i}", "numero_identificacao": f"EST-SU-{i}"}).get_json()["id"]
+               for i in range(2)]
+    for pessoa_id in pessoas:
+        response = client.post('/vacinacoes/bulk', json=[
+            {"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica", "data_aplicacao": "2022-03-01T08:00:00"},
+            {"pessoa_id": pessoa_id, "vacina_id": vacinas["HEPATITE B"], "dose_aplicada": "1a Dose", "data_aplicacao": "2022-03-02T08:00:00"},
+        ])
+        assert response.get_json()["inseridos"] == 2
+        assert_igual_ao_recalculo()
+    assert client.get('/estatisticas?agrupar=vacina&de=2022-03&ate=2022-03').get_json()["total"] == 4
+
+    assert client.delete(f'/pessoas/{pessoas[0]}').status_code == 200
+    assert_igual_ao_recalculo()
+    assert client.get('/estatisticas?de=2022-03&ate=2022-03').get_json()["total"] == 2
@@ -0,0 +1,164 @@
+# cartao_vacinacao_api/tests/test_exclusoes.py
+# Exclusões em cascata pelo banco (ON DELETE CASCADE + passive_deletes): excluir uma vacina ou
+# uma pessoa não carrega as vacinações no ORM, e DELETE /vacinacoes exclui em lote com uma instrução.
+# Estatísticas, feed de alterações e cache de cartões continuam coerentes.
+from itertools import count
+
+import pytest
+from sqlalchemy import MetaData, insert, inspect, text
+from sqlalchemy.schema import CreateTable
+
+import estatisticas
+from commands import ESQUEMAS_INICIAIS, migrar_cascata
+from metrics import contar_sql
+from models import db, Alteracao, EsquemaDose, Vacinacao
+
+_lotes = count()
+
+
+@pytest.fixture(scope='module')
+def config_app(tmp_path_factory):
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path_factory.mktemp('exclusoes') / 'exclusoes.db'}"}
+
+
+def _popular(client, pessoas=3):
+    """
+    Cria duas vacinas com os esquemas de Hepatite B e BCG, e cada pessoa nova recebe as duas doses
+    da primeira e a dose única da segunda. Retorna (pessoa_ids, {"HEPATITE B" ou "BCG": id da vacina}).
+    """
+    lote = next(_lotes)
+    vacinas = {nome: client.post('/vacinas', json={"nome": f"{nome} Exclusão {lote}"}).get_json()["id"] for nome in ("HEPATITE B", "BCG")}
+    db.session.execute(insert(EsquemaDose), [
+        {"vacina_id": vacina_id, "ordem": ordem, "dose_aplicada": dose, "intervalo_dias": intervalo}
+        for nome, vacina_id in vacinas.items()
+        for ordem, (dose, intervalo) in enumerate(ESQUEMAS_INICIAIS[nome], 1)
+    ])
+    db.session.commit()
+    pessoa_ids = [client.post('/pessoas', json={"nome": f"Exclusão {lote}.{i}", "numero_identificacao": f"EXC-{lote}-{i}"}).get_json()["id"]
+                  for i in range(pessoas)]
+    client.post('/vacinacoes/bulk', json=[
+        {"pessoa_id": pessoa_id, "vacina_id": vacinas[nome], "dose_aplicada": dose, "data_aplicacao": "2024-01-10T08:00:00"}
+        for pessoa_id in pessoa_ids
+        for nome, dose in (("HEPATITE B", "1a Dose"), ("HEPATITE B", "2a Dose"), ("BCG", "Dose Unica"))
+    ])
+    return pessoa_ids, vacinas
+
+
+def _vacinacoes(pessoa_ids, **filtros):
+    """Vacinações das pessoas em `pessoa_ids`: cada teste só olha para as pessoas que criou."""
+    return Vacinacao.query.filter(Vacinacao.pessoa_id.in_(pessoa_ids)).filter_by(**filtros).count()
+
+
+def _exclusoes_no_feed():
+    return Alteracao.query.filter_by(tabela='vacinacoes', operacao='delete').count()
+
+
+def assert_estatisticas_coerentes():
+    mantidas = estatisticas.consultar(['vacina', 'dose', 'mes'])
+    estatisticas.reconstruir()
+    assert mantidas == estatisticas.consultar(['vacina', 'dose', 'mes'])
+
+
+def test_chaves_estrangeiras_ativas(app):
+    assert db.session.execute(text("PRAGMA foreign_keys")).scalar() == 1
+
+
+def test_excluir_vacina_sem_carregar_vacinacoes(client):
+    pessoa_ids, vacinas = _popular(client)
+    hepatite = vacinas["HEPATITE B"]
+    client.get(f'/pessoas/{pessoa_ids[0]}/cartao_vacinacao') # Cartão em cache, com a vacina
+    exclusoes = _exclusoes_no_feed()
+
+    with contar_sql() as instrucoes:
+        assert client.delete(f'/vacinas/{hepatite}').status_code == 200
+    assert not any('FROM vacinacoes' in instrucao for instrucao in instrucoes), instrucoes
+
+    assert _vacinacoes(pessoa_ids, vacina_id=hepatite) == 0
+    assert _vacinacoes(pessoa_ids) == len(pessoa_ids)
+    assert EsquemaDose.query.filter_by(vacina_id=hepatite).count() == 0
+    assert_estatisticas_coerentes()
+    # As vacinações removidas pela cascata também deixam marcas no feed
+    assert _exclusoes_no_feed() - exclusoes == 2 * len(pessoa_ids)
+    cartao = client.get(f'/pessoas/{pessoa_ids[0]}/cartao_vacinacao')
+    assert cartao.headers['X-Cache'] == 'MISS'
+    assert [v["id_vacina"] for v in cartao.get_json()["vacinas_registradas"]] == [vacinas["BCG"]]
+
+
+def test_excluir_pessoa_sem_carregar_vacinacoes(client):
+    pessoa_ids, _ = _popular(client)
+    with contar_sql() as instrucoes:
+        assert client.delete(f'/pessoas/{pessoa_ids[0]}').status_code == 200
+    # Só a consulta agrupada das estatísticas lê vacinacoes
+    assert [instrucao for instrucao in instrucoes if 'FROM vacinacoes' in instrucao and 'GROUP BY' not in instrucao] == []
+    assert _vacinacoes(pessoa_ids, pessoa_id=pessoa_ids[0]) == 0
+    assert _vacinacoes(pessoa_ids) == 3 * (len(pessoa_ids) - 1)
+    assert_estatisticas_coerentes()
+
+
+def test_excluir_vacinacoes_em_lote(client):
+    pessoa_ids, vacinas = _popular(client)
+    client.get(f'/pessoas/{pessoa_ids[0]}/cartao_vacinacao')
+
+    response = client.delete(f'/vacinacoes?pessoa_id={pessoa_ids[0]}&vacina_id={vacinas["HEPATITE B"]}')
+    assert response.status_code == 200
+    assert response.get_json()["removidas"] == 2
+    assert _vacinacoes(pessoa_ids, pessoa_id=pessoa_ids[0]) == 1
+    assert client.get(f'/pessoas/{pessoa_ids[0]}/cartao_vacinacao').headers['X-Cache'] == 'MISS'
+    assert_estatisticas_coerentes()
+
+    response = client.delete(f'/vacinacoes?vacina_id={vacinas["BCG"]}')
+    assert response.get_json()["removidas"] == len(pessoa_ids)
+    assert _vacinacoes(pessoa_ids, vacina_id=vacinas["BCG"]) == 0
+    assert_estatisticas_coerentes()
+
+    assert client.delete(f'/vacinacoes?pessoa_id={pessoa_ids[1]}').get_json()["removidas"] == 2
+    assert client.delete(f'/vacinacoes?pessoa_id={pessoa_ids[1]}').get_json()["removidas"] == 0
+    assert _vacinacoes(pessoa_ids) == 2
+    assert_estatisticas_coerentes()
+
+
+def test_excluir_vacinacoes_em_lote_exige_filtro(client):
+    pessoa_ids, _ = _popular(client, pessoas=1)
+    assert client.delete('/vacinacoes').status_code == 400
+    assert client.delete('/vacinacoes?pessoa_id=abc').status_code == 400
+    assert _vacinacoes(pessoa_ids) == 3
+
+
+def _remover_cascata(tabela):
+    """Recria `tabela` como em bancos antigos: mesmas colunas e dados, chaves estrangeiras sem ON DELETE CASCADE."""
+    metadata = MetaData()
+    for original in db.metadata.sorted_tables:
+        original.to_metadata(metadata)
+    copia = metadata.tables[tabela.name]
+    for restricao in copia.foreign_key_constraints:
+        restricao.ondelete = None
+    conexao = db.session.connection()
+    conexao.execute(text(f"ALTER TABLE {tabela.name} RENAME TO antiga"))
+    for index in tabela.indexes:
+        conexao.execute(text(f"DROP INDEX {index.name}"))
+    conexao.execute(CreateTable(copia))
+    conexao.execute(text(f"INSERT INTO {tabela.name} SELECT * FROM antiga"))
+    conexao.execute(text("DROP TABLE antiga"))
+    db.session.commit()
+
+
+def test_migrar_cascata(client):
+    pessoa_ids, _ = _popular(client)
+    for tabela in (Vacinacao.__table__, EsquemaDose.__table__):
+        _remover_cascata(tabela)
+    assert {fk['options'].get('ondelete') for fk in inspect(db.engine).get_foreign_keys('vacinacoes')} == {None}
+    assert client.delete(f'/pessoas/{pessoa_ids[0]}').status_code == 500 # Sem cascata, a chave estrangeira impede a exclusão
+
+    assert migrar_cascata() == ['vacinacoes', 'esquemas_doses']
+    for nome in ('vacinacoes', 'esquemas_doses', 'estatisticas_vacinacao'):
+        chaves = [fk for fk in inspect(db.engine).get_foreign_keys(nome) if fk['referred_table'] in ('pessoas', 'vacinas')]
+        assert {fk['options'].get('ondelete') for fk in chaves} == {'CASCADE'}, nome
+    assert _vacinacoes(pessoa_ids) == 3 * len(pessoa_ids)
+    assert {index['name'] for index in inspect(db.engine).get_indexes('vacinacoes')} >= {'ix_vacinacoes_pessoa_data', 'ix_vacinacoes_vacina_id'}
+    assert migrar_cascata() == []
+    exclusoes = _exclusoes_no_feed()
+
+    # A exclusão em cascata passa a funcionar, e os gatilhos do feed voltam na nova tabela
+    assert client.delete(f'/pessoas/{pessoa_ids[0]}').status_code == 200
+    assert _vacinacoes(pessoa_ids, pessoa_id=pessoa_ids[0]) == 0
+    assert _exclusoes_no_feed() - exclusoes == 3
@@ -0,0 +1,129 @@
+# cartao_vacinacao_api/tests/test_faltosos.py
+# Relatório de doses pendentes e atrasadas (faltosos.py, GET /relatorios/faltosos e
+# `flask relatorio-faltosos`) com uma data de referência fixa.
+from datetime import date
+
+import pytest
+
+from commands import seed_esquemas
+from faltosos import faltosos, pagina_faltosos
+
+HOJE = '2024-06-01'
+
+
+@pytest.fixture(scope='module')
+def app(criar_app):
+    with criar_app({'FALTOSOS_TOLERANCIA_DIAS': 30}) as app:
+        seed_esquemas()
+        yield app
+
+
+@pytest.fixture(scope='module')
+def dados(client):
+    """Quatro pessoas com situações conhecidas em 2024-06-01 (tolerância de 30 dias)."""
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+    pessoas = {
+        nome: client.post('/pessoas', json={"nome": nome, "numero_identificacao": f"FALT-{indice}"}).get_json()["id"]
+        for indice, nome in enumerate(("Atrasada", "Pendente", "Completa", "Sem doses"))
+    }
+    aplicacoes = [
+        # Hepatite B: 2ª dose aplicada em 2024-01-01; a 3ª (150 dias) venceu em 2024-05-30, ainda dentro da tolerância
+        ("Pendente", "HEPATITE B", "1a Dose", "2023-12-01T08:00:00"),
+        ("Pendente", "HEPATITE B", "2a Dose", "2024-01-01T08:00:00"),
+        # Rotavírus: 1ª dose em 2024-01-01, 2ª prevista para 2024-03-01 (92 dias de atraso); "Faltoso" não conta
+        ("Atrasada", "ROTAVIRUS", "1a Dose", "2024-01-01T08:00:00"),
+        ("Atrasada", "ROTAVIRUS", "Faltoso", "2024-03-05T08:00:00"),
+        # Esquemas completos não geram pendência
+        ("Atrasada", "BCG", "Dose Unica", "2024-01-01T08:00:00"),
+        ("Completa", "ROTAVIRUS", "1a Dose", "2024-01-01T08:00:00"),
+        ("Completa", "ROTAVIRUS", "2a Dose", "2024-03-01T08:00:00"),
+    ]
+    response = client.post('/vacinacoes/bulk', json=[
+        {"pessoa_id": pessoas[pessoa], "vacina_id": vacinas[vacina], "dose_aplicada": dose, "data_aplicacao": data}
+        for pessoa, vacina, dose, data in aplicacoes
+    ])
+    assert response.get_json()["inseridos"] == len(aplicacoes), response.get_data(as_text=True)
+    return pessoas, vacinas
+
+
+def test_motor_de_faltosos(app, dados):
+    pessoas, vacinas = dados
+    pendencias = list(faltosos(hoje=date(2024, 6, 1), tolerancia=30))
+    assert pendencias == [
+        {"pessoa_id": pessoas["Atrasada"], "vacina_id": vacinas["ROTAVIRUS"], "ultima_dose": "1a Dose",
+         "data_ultima_dose": "2024-01-01", "proxima_dose": "2a Dose", "data_prevista": "2024-03-01",
+         "dias_atraso": 92, "situacao": "atrasada"},
+        {"pessoa_id": pessoas["Pendente"], "vacina_id": vacinas["HEPATITE B"], "ultima_dose": "2a Dose",
+         "data_ultima_dose": "2024-01-01", "proxima_dose": "3a Dose", "data_prevista": "2024-05-30",
+         "dias_atraso": 2, "situacao": "pendente"},
+    ]
+    # Sem tolerância, a 3ª dose de Hepatite B também está atrasada; antes da data prevista, atraso zero
+    assert {p["situacao"] for p in faltosos(hoje=date(2024, 6, 1))} == {"atrasada"}
+    antes = list(faltosos(hoje=date(2024, 2, 1), vacina_id=vacinas["HEPATITE B"]))
+    assert [(p["dias_atraso"], p["situacao"]) for p in antes] == [(0, "pendente")]
+    # Lotes menores que o total de linhas não mudam o resultado
+    assert list(faltosos(hoje=date(2024, 6, 1), tolerancia=30, lote=2)) == pendencias
+
+
+def test_relatorio_faltosos_rota(client, dados):
+    pessoas, vacinas = dados
+    response = client.get(f'/relatorios/faltosos?hoje={HOJE}')
+    assert response.status_code == 200
+    itens = response.get_json()
+    assert [(i["nome"], i["nome_vacina"], i["situacao"]) for i in itens] == [
+        ("Atrasada", "ROTAVIRUS", "atrasada"), ("Pendente", "HEPATITE B", "pendente")
+    ]
+    assert 'X-Next-Cursor' not in response.headers
+
+    # Filtros
+    assert [i["nome"] for i in client.get(f'/relatorios/faltosos?hoje={HOJE}&situacao=atrasada').get_json()] == ["Atrasada"]
+    assert [i["nome"] for i in client.get(f'/relatorios/faltosos?hoje={HOJE}&vacina_id={vacinas["HEPATITE B"]}').get_json()] == ["Pendente"]
+
+    # Paginação por pessoa_id
+    primeira = client.get(f'/relatorios/faltosos?hoje={HOJE}&limit=1')
+    assert [i["nome"] for i in primeira.get_json()] == ["Atrasada"]
+    cursor = primeira.headers['X-Next-Cursor']
+    assert f'hoje={HOJE}' in primeira.headers['Link']
+    segunda = client.get(f'/relatorios/faltosos?hoje={HOJE}&limit=1&after={cursor}')
+    assert [i["nome"] for i in segunda.get_json()] == ["Pendente"]
+    assert 'X-Next-Cursor' not in segunda.headers
+
+
+def test_relatorio_faltosos_limite_de_linhas_lidas(client, dados):
+    # Com o limite atingido, a página termina na troca de pessoa, mesmo curta ou vazia, e o cursor continua
+    pessoas, _ = dados
+    pendencias, proxima = pagina_faltosos(10, hoje=date(2024, 6, 1), situacao='pendente', max_linhas=1)
+    assert (pendencias, proxima) == ([], pessoas["Atrasada"])
+    client.application.config['FALTOSOS_MAX_LINHAS'] = 1
+    try:
+        paginas, cursor = [], None
+        while True:
+            response = client.get('/relatorios/faltosos', query_string={"hoje": HOJE, "situacao": "atrasada", "after": cursor})
+            assert response.status_code == 200
+            paginas.append([i["nome"] for i in response.get_json()])
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+    finally:
+        client.application.config['FALTOSOS_MAX_LINHAS'] = 100000
+    # Atrasada (3 linhas), Pendente (2) e Completa (2, a última pessoa com vacinações): uma pessoa por página
+    assert paginas == [["Atrasada"], [], []]
+
+
+def test_relatorio_faltosos_parametros_invalidos(client):
+    for consulta in ('hoje=01/06/2024', 'situacao=faltosa', 'vacina_id=abc', 'limit=0', 'after=xyz'):
+        assert client.get(f'/relatorios/faltosos?{consulta}').status_code == 400, consulta
+
+
+def test_relatorio_faltosos_exige_token(app, dados):
+    with app.test_client() as anonimo:
+        assert anonimo.get('/relatorios/faltosos').status_code == 401
+
+
+def test_comando_relatorio_faltosos(app, dados):
+    resultado = app.test_cli_runner().invoke(args=['relatorio-faltosos', '--hoje', HOJE, '--situacao', 'atrasada'])
+    assert resultado.exit_code == 0, resultado.output
+    linhas = resultado.stdout.splitlines()
+    assert linhas[0] == 'pessoa_id;vacina_id;ultima_dose;data_ultima_dose;proxima_dose;data_prevista;dias_atraso;situacao'
+    assert len(linhas) == 2 and linhas[1].endswith(';2024-03-01;92;atrasada')
+    assert '1 pendência(s)' in resultado.stderr
@@ -0,0 +1,137 @@
+# cartao_vacinacao_api/tests/test_logs.py
+# Logs estruturados (logs.py): linhas JSON com request id, rota e duração gravadas pela thread do
+# QueueListener, amostragem das classes de aviso, rotação por tamanho e descarte com a fila cheia.
+import json
+import logging
+import os
+import queue
+
+import pytest
+
+from app import create_app
+from logs import CABECALHO_REQUEST_ID, _HandlerFila, ler_amostragem, registro_logs
+
+
+def _criar(tmp_path, **config):
+    return create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                       'LOG_ARQUIVO': str(tmp_path / 'api.log'), **config})
+
+
+def _linhas(app, caminho):
+    with app.app_context():
+        registro_logs.aguardar_gravacao()
+    if not caminho.exists():
+        return []
+    return [json.loads(linha) for linha in caminho.read_text(encoding='utf-8').splitlines()]
+
+
+def test_registro_json_com_request_id(tmp_path):
+    app = _criar(tmp_path, LOG_AMOSTRAGEM='')
+    client = app.test_client()
+
+    response = client.post('/register', data='não é json', content_type='application/json')
+    assert response.status_code == 422
+    gerado = response.headers[CABECALHO_REQUEST_ID]
+    assert len(gerado) == 32
+
+    # O request id enviado pelo cliente é mantido; valores inválidos são trocados
+    assert client.get('/', headers={CABECALHO_REQUEST_ID: 'abc-123'}).headers[CABECALHO_REQUEST_ID] == 'abc-123'
+    assert client.get('/', headers={CABECALHO_REQUEST_ID: 'x' * 100}).headers[CABECALHO_REQUEST_ID] != 'x' * 100
+    client.post('/register', data='{', content_type='application/json', headers={CABECALHO_REQUEST_ID: 'cliente-7'})
+
+    primeira, segunda = _linhas(app, tmp_path / 'api.log')
+    assert primeira["request_id"] == gerado
+    assert segunda["request_id"] == 'cliente-7'
+    assert primeira["nivel"] == 'WARNING'
+    assert primeira["classe"] == 'validacao'
+    assert primeira["metodo"] == 'POST' and primeira["rota"] == '/register'
+    assert primeira["duracao_ms"] >= 0
+    assert primeira["mensagem"].startswith("Erro de validação/requisição inválida")
+    assert "amostragem" not in primeira
+
+
+def test_excecao_registrada_com_traceback(tmp_path):
+    app = _criar(tmp_path, PROPAGATE_EXCEPTIONS=False)
+
+    @app.route('/falha')
+    def falha():
+        raise RuntimeError("quebrou")
+
+    response = app.test_client().get('/falha')
+    assert response.status_code == 500
+    # O Flask registra a exceção e o manipulador de 500 também
+    linhas = _linhas(app, tmp_path / 'api.log')
+    assert linhas
+    for linha in linhas:
+        assert linha["nivel"] == 'ERROR'
+        assert linha["rota"] == '/falha'
+        assert linha["request_id"] == response.headers[CABECALHO_REQUEST_ID]
+        assert 'RuntimeError: quebrou' in linha["excecao"]
+
+
+def test_amostragem_de_avisos(tmp_path):
+    app = _criar(tmp_path, LOG_AMOSTRAGEM='validacao=5')
+    client = app.test_client()
+    for _ in range(12):
+        assert client.post('/register', data='{', content_type='application/json').status_code == 422
+
+    linhas = _linhas(app, tmp_path / 'api.log')
+    assert len(linhas) == 3 # 1a, 6a e 11a
+    assert {linha["amostragem"] for linha in linhas} == {5}
+    with app.app_context():
+        assert registro_logs.descartados() == {'amostragem': 9, 'fila_cheia': 0}
+    assert b'logs_descartados_amostragem_total 9' in client.get('/metrics').get_data()
+
+
+def test_ler_amostragem():
+    assert ler_amostragem('validacao=10, hash_indisponivel=2,') == {'validacao': 10, 'hash_indisponivel': 2}
+    assert ler_amostragem('') == {}
+    with pytest.raises(ValueError):
+        ler_amostragem('validacao=0')
+
+
+def test_rotacao_por_tamanho(tmp_path):
+    app = _criar(tmp_path, LOG_AMOSTRAGEM='', LOG_MAX_BYTES=2000, LOG_BACKUPS=2)
+    client = app.test_client()
+    for _ in range(40):
+        client.post('/register', data='{', content_type='application/json')
+    _linhas(app, tmp_path / 'api.log')
+    assert sorted(caminho.name for caminho in tmp_path.iterdir()) == ['api.log', 'api.log.1', 'api.log.2']
+    assert (tmp_path / 'api.log').stat().st_size <= 2000
+
+
+def test_fila_cheia_descarta_sem_bloquear():
+    # Sem listener consumindo: a fila enche e os registros seguintes são descartados na hora
+    handler = _HandlerFila(queue.Queue(2), 'sem-listener.log')
+    logger = logging.getLogger('teste_fila_cheia')
+    logger.propagate = False
+    logger.addHandler(handler)
+    for indice in range(5):
+        logger.warning("registro %d", indice)
+    assert handler.fila_cheia == 3
+    assert [handler.queue.get_nowait().msg for _ in range(2)] == ["registro 0", "registro 1"]
+
+
+def test_listener_recriado_apos_fork(tmp_path):
+    app = _criar(tmp_path, LOG_AMOSTRAGEM='')
+    app.test_client().post('/register', data='{', content_type='application/json')
+    pid = os.fork()
+    if pid == 0: # Filho: sem a thread herdada, só grava se o listener foi recriado
+        try:
+            app.test_client().post('/register', data='{', content_type='application/json')
+            with app.app_context():
+                registro_logs.aguardar_gravacao()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    linhas = _linhas(app, tmp_path / 'api.log')
+    assert len(linhas) == 2
+    assert len({linha["request_id"] for linha in linhas}) == 2
+
+
+def test_testes_nao_gravam_no_log_padrao(tmp_path):
+    # Com TESTING, o LOG_ARQUIVO padrão (error.log na raiz do projeto) fica desativado; um explícito vale
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    assert app.config['LOG_ARQUIVO'] == ''
+    assert 'logs' not in app.extensions
+    assert 'logs' in _criar(tmp_path).extensions
@@ -0,0 +1,129 @@
+# cartao_vacinacao_api/tests/test_query_budgets.py
+# Orçamentos de SQL por rota (proteção contra N+1): cada rota tem um número máximo de instruções,
+# e as rotas de leitura precisam executar o mesmo número de instruções qualquer que seja o volume
+# (doses no cartão, linhas na página). Os relacionamentos lazy de models.py não podem ser tocados.
+import pytest
+
+from catalog import catalogo_vacinas
+from models import db, Pessoa, Vacina, DOSES_VALIDAS
+
+# Máximo de instruções SQL por requisição
+ORCAMENTOS = {
+    'GET /pessoas': 1,
+    'GET /pessoas/<id>': 1,
+    'GET /pessoas/search': 1,
+    'GET /vacinas': 2, # Posição das vacinas no feed e, se o catálogo em memória mudou, a recarga
+    'GET /vacinas/<id>': 2,
+    'GET cartao_vacinacao': 2, # Pessoa + vacinações (cache de cartões desativado neste módulo)
+    'POST /cartoes/batch': 2, # Pessoas + vacinações de todas elas, com IN
+    'GET cartao_vacinacao.csv': 4, # Pessoa, vacinações, posição do catálogo no feed e, se ele mudou, a recarga
+    'GET /vacinacoes/export.csv': 2,
+    'POST /vacinacoes': 6, # Inclui o ajuste das estatísticas
+    'POST /vacinacoes/bulk': 5, # Pessoas, vacinas, doses já registradas, um INSERT por lote e as estatísticas
+    'DELETE /pessoas/<id>': 5, # Pessoa, estatísticas (consulta agrupada, upsert e zerados) e o DELETE; as vacinações saem em cascata
+    'DELETE /vacinacoes': 4, # Estatísticas (consulta agrupada, upsert e zerados) e um único DELETE
+    'GET /changes': 4, # Feed e o estado atual dos registros, uma consulta por tabela
+}
+
+
+@pytest.fixture(scope='module')
+def config_app():
+    return {'CARTAO_CACHE_MAX': 0}
+
+
+def _nova_pessoa(client, identificacao):
+    return client.post('/pessoas', json={"nome": f"Pessoa {identificacao}", "numero_identificacao": identificacao}).get_json()["id"]
+
+
+def _vacinar(client, pessoa_id, quantidade):
+    vacina_ids = [vacina.id for vacina in Vacina.query.order_by(Vacina.id)]
+    registros = [
+        {"pessoa_id": pessoa_id, "vacina_id": vacina_id, "dose_aplicada": dose}
+        for vacina_id in vacina_ids for dose in DOSES_VALIDAS
+    ][:quantidade]
+    assert client.post('/vacinacoes/bulk', json=registros).get_json()["inseridos"] == quantidade
+
+
+def _contar(client, orcamento_sql, rota, metodo, url, **kwargs):
+    with orcamento_sql(ORCAMENTOS[rota], rota) as instrucoes:
+        response = client.open(url, method=metodo, **kwargs)
+        response.get_data() # Consome respostas em streaming dentro do bloco
+    assert response.status_code < 400, response.get_data(as_text=True)
+    return len(instrucoes)
+
+
+def test_orcamento_cartao_constante(client, orcamento_sql):
+    """O cartão (JSON e CSV) executa as mesmas instruções com 1 ou 60 doses."""
+    client.get('/vacinas') # Carrega o catálogo em memória usado pelo CSV antes de medir
+    contagens = set()
+    for indice, doses in enumerate((1, 60)):
+        pessoa_id = _nova_pessoa(client, f"ORC-CARTAO-{indice}")
+        _vacinar(client, pessoa_id, doses)
+        contagens.add((
+            _contar(client, orcamento_sql, 'GET cartao_vacinacao', 'GET', f'/pessoas/{pessoa_id}/cartao_vacinacao'),
+            _contar(client, orcamento_sql, 'GET cartao_vacinacao.csv', 'GET', f'/pessoas/{pessoa_id}/cartao_vacinacao.csv'),
+        ))
+    assert len(contagens) == 1, contagens
+
+
+def test_orcamento_cartoes_batch_constante(client, orcamento_sql):
+    """POST /cartoes/batch executa as mesmas instruções para 1 ou 40 pessoas."""
+    pessoa_ids = [_nova_pessoa(client, f"ORC-BATCH-{indice}") for indice in range(40)]
+    for pessoa_id in pessoa_ids[:5]:
+        _vacinar(client, pessoa_id, 3)
+    contagens = {
+        _contar(client, orcamento_sql, 'POST /cartoes/batch', 'POST', '/cartoes/batch', json={"pessoa_ids": ids})
+        for ids in (pessoa_ids[:1], pessoa_ids)
+    }
+    assert len(contagens) == 1, contagens
+
+
+def test_orcamento_pessoas_constante(client, orcamento_sql):
+    """GET /pessoas executa as mesmas instruções para 1 ou 200 linhas, com ou sem filtro."""
+    for indice in range(200):
+        db.session.add(Pessoa(nome=f"Orçamento {indice}", numero_identificacao=f"ORC-PAG-{indice}"))
+    db.session.commit()
+    contagens = {
+        _contar(client, orcamento_sql, 'GET /pessoas', 'GET', url)
+        for url in ('/pessoas?limit=1', '/pessoas?limit=200', '/pessoas?nome=Orçamento&limit=200')
+    }
+    assert len(contagens) == 1, contagens
+    _contar(client, orcamento_sql, 'GET /pessoas/search', 'GET', '/pessoas/search?q=orcamento')
+
+
+def test_orcamento_vacinas(client, orcamento_sql):
+    catalogo_vacinas.invalidate()
+    _contar(client, orcamento_sql, 'GET /vacinas', 'GET', '/vacinas')
+    # Com o catálogo carregado, lista, filtro e detalhe só conferem a posição das vacinas no feed
+    with orcamento_sql(2, 'GET /vacinas (catálogo em memória)'):
+        client.get('/vacinas?categoria=Nacional')
+        client.get('/vacinas/1')
+    catalogo_vacinas.invalidate()
+    _contar(client, orcamento_sql, 'GET /vacinas/<id>', 'GET', '/vacinas/1')
+
+
+def test_orcamento_escritas(client, orcamento_sql):
+    pessoa_id = _nova_pessoa(client, "ORC-ESCRITA")
+    _contar(client, orcamento_sql, 'POST /vacinacoes', 'POST', '/vacinacoes',
+            json={"pessoa_id": pessoa_id, "vacina_id": 1, "dose_aplicada": "1a Dose"})
+
+    # O lote inteiro (várias pessoas e vacinas) cabe num único INSERT
+    outras = [_nova_pessoa(client, f"ORC-BULK-{indice}") for indice in range(5)]
+    registros = [{"pessoa_id": outra, "vacina_id": vacina_id, "dose_aplicada": "1a Dose"}
+                 for outra in outras for vacina_id in range(1, 18)]
+    _contar(client, orcamento_sql, 'POST /vacinacoes/bulk', 'POST', '/vacinacoes/bulk', json=registros)
+
+    _contar(client, orcamento_sql, 'GET /pessoas/<id>', 'GET', f'/pessoas/{pessoa_id}')
+    _contar(client, orcamento_sql, 'GET /vacinacoes/export.csv', 'GET', '/vacinacoes/export.csv')
+    _contar(client, orcamento_sql, 'DELETE /pessoas/<id>', 'DELETE', f'/pessoas/{outras[0]}')
+    _contar(client, orcamento_sql, 'DELETE /vacinacoes', 'DELETE', '/vacinacoes?vacina_id=1')
+
+
+def test_orcamento_alteracoes_constante(client, orcamento_sql):
+    """GET /changes executa as mesmas instruções com 3 ou 60 vacinações a mais no feed."""
+    contagens = set()
+    for indice, doses in enumerate((3, 60)):
+        pessoa_id = _nova_pessoa(client, f"ORC-CHANGES-{indice}")
+        _vacinar(client, pessoa_id, doses)
+        contagens.add(_contar(client, orcamento_sql, 'GET /changes', 'GET', '/changes?limit=5000'))
+    assert len(contagens) == 1, contagens
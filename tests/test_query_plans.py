@@ -0,0 +1,113 @@
+# cartao_vacinacao_api/tests/test_query_plans.py
+# Testes de regressão de plano de execução (SQLite): as consultas quentes da API
+# não podem cair em varredura completa de tabela nem em ordenação temporária (TEMP B-TREE).
+import pytest
+from sqlalchemy import text
+from app import create_app
+from models import db
+from busca import criar_indice_busca, expressao_busca
+from faltosos import vacinacoes_query as faltosos_query
+from queries import alteracoes_para_cache_query, alteracoes_query, cartao_query, cartoes_query, posicao_alteracoes_query, vacinacao_existente_query, vacinas_query, pessoas_pagina_query, pessoas_busca_query
+
+
+@pytest.fixture(scope='module')
+def app_ctx():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    app_ctx = app.app_context()
+    app_ctx.push()
+    db.create_all()
+    criar_indice_busca()
+    yield
+    db.session.remove()
+    db.drop_all()
+    app_ctx.pop()
+
+
+def explain(query):
+    """Retorna as linhas de detalhe do EXPLAIN QUERY PLAN para uma Query do ORM (ou um select())."""
+    compiled = getattr(query, 'statement', query).compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return [row[-1] for row in rows]
+
+
+def assert_sem_varredura(plano, tabelas):
+    for linha in plano:
+        assert 'USE TEMP B-TREE' not in linha, f"Ordenação temporária no plano: {plano}"
+        for tabela in tabelas:
+            assert not linha.startswith(f"SCAN {tabela}"), f"Varredura completa de '{tabela}' no plano: {plano}"
+
+
+def test_plano_cartao_vacinacao(app_ctx):
+    plano = explain(cartao_query(1))
+    assert_sem_varredura(plano, ['vacinacoes', 'vacinas'])
+    assert any('ix_vacinacoes_pessoa_data' in linha for linha in plano), plano
+
+
+def test_plano_cartoes_em_lote(app_ctx):
+    # O IN percorre o índice uma pessoa por vez, já na ordem (pessoa, data): sem ordenação temporária
+    plano = explain(cartoes_query([7, 3, 12]))
+    assert_sem_varredura(plano, ['vacinacoes', 'vacinas'])
+    assert any('ix_vacinacoes_pessoa_data' in linha for linha in plano), plano
+
+
+def test_plano_vacinacao_existente(app_ctx):
+    plano = explain(vacinacao_existente_query(1, 1, '1a Dose'))
+    assert_sem_varredura(plano, ['vacinacoes'])
+    # O SQLite nomeia o índice da UniqueConstraint como sqlite_autoindex_*; verifica as colunas usadas
+    assert any('pessoa_id=? AND vacina_id=? AND dose_id=?' in linha for linha in plano), plano
+
+
+def test_plano_vacinas_por_categoria(app_ctx):
+    plano = explain(vacinas_query('Nacional'))
+    assert_sem_varredura(plano, ['vacinas'])
+    assert any('ix_vacinas_categoria' in linha for linha in plano), plano
+
+
+@pytest.mark.parametrize('nome', [None, 'silva'])
+def test_plano_pagina_de_pessoas(app_ctx, nome):
+    # Páginas seguintes: busca por faixa da chave primária, sem ordenação temporária
+    plano = explain(pessoas_pagina_query(50, after=1000, nome=nome))
+    assert_sem_varredura(plano, ['pessoas'])
+    assert any('INTEGER PRIMARY KEY' in linha for linha in plano), plano
+
+    # Primeira página: percorre na ordem da chave primária e para no LIMIT, sem ordenar
+    plano = explain(pessoas_pagina_query(50, nome=nome))
+    assert all('USE TEMP B-TREE' not in linha for linha in plano), plano
+
+
+def test_plano_busca_de_pessoas(app_ctx):
+    # As mais relevantes pelo índice FTS5 (MATCH, ORDER BY rank), pessoas pela chave primária
+    plano = explain(pessoas_busca_query(expressao_busca('joão silva'), 20))
+    assert not any(linha.split()[:2] == ['SCAN', 'pessoas'] for linha in plano), plano
+    assert any(linha.startswith('SCAN pessoas_fts VIRTUAL TABLE INDEX') and ':M' in linha for linha in plano), plano
+    assert any('pessoas USING INTEGER PRIMARY KEY' in linha for linha in plano), plano
+
+
+@pytest.mark.parametrize('apos', [None, 500])
+def test_plano_relatorio_faltosos(app_ctx, apos):
+    # Percorre vacinacoes pelo índice (pessoa_id, data_aplicacao), já na ordem de pessoa_id: sem ordenar a tabela
+    plano = explain(faltosos_query(apos))
+    assert all('USE TEMP B-TREE' not in linha for linha in plano), plano
+    assert any('vacinacoes USING INDEX ix_vacinacoes_pessoa_data' in linha for linha in plano), plano
+
+
+def test_plano_feed_de_alteracoes(app_ctx):
+    # Faixa da chave primária (seq), já na ordem do cursor
+    plano = explain(alteracoes_query(1000, 500))
+    assert_sem_varredura(plano, ['alteracoes'])
+    assert any('alteracoes USING INTEGER PRIMARY KEY' in linha for linha in plano), plano
+
+
+def test_plano_sincronizacao_do_cache_de_cartoes(app_ctx):
+    # Faixa da chave primária do feed e, nas vacinações, a pessoa pela chave primária de vacinacoes
+    plano = explain(alteracoes_para_cache_query(1000, 10001))
+    assert_sem_varredura(plano, ['alteracoes', 'vacinacoes'])
+    assert any('alteracoes USING INTEGER PRIMARY KEY' in linha for linha in plano), plano
+    assert any('vacinacoes USING INTEGER PRIMARY KEY' in linha for linha in plano), plano
+
+
+def test_plano_posicao_do_catalogo_no_feed(app_ctx):
+    # Só as linhas das vacinas, pelo índice único (tabela, registro_id)
+    plano = explain(posicao_alteracoes_query('vacinas'))
+    assert_sem_varredura(plano, ['alteracoes'])
+    assert any(linha.startswith('SEARCH alteracoes USING') and 'tabela=?' in linha for linha in plano), plano
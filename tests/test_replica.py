@@ -0,0 +1,179 @@
+# cartao_vacinacao_api/tests/test_replica.py
+# Réplica de leitura (replica.py) com dois arquivos SQLite: a réplica é uma cópia do primário feita
+# pela API de backup do sqlite3, como faria uma ferramenta de replicação. Leituras vão à réplica,
+# escritas ao primário; o cliente que escreveu lê do primário; réplica atrasada ou ausente -> primário.
+import sqlite3
+
+import pytest
+from flask import Response, stream_with_context
+from sqlalchemy import select, text
+
+from app import create_app
+from commands import init_db
+from metrics import contar_sql
+from models import db, Pessoa
+from replica import CABECALHO_LER_PRIMARIO, CABECALHO_ORIGEM, COOKIE_LER_PRIMARIO
+
+
+def replicar(primario, replica):
+    """Copia o estado atual do arquivo `primario` para `replica`."""
+    origem, destino = sqlite3.connect(primario), sqlite3.connect(replica)
+    try:
+        origem.backup(destino)
+    finally:
+        origem.close()
+        destino.close()
+
+
+@pytest.fixture
+def arquivos(tmp_path):
+    return str(tmp_path / 'primario.db'), str(tmp_path / 'replica.db')
+
+
+@pytest.fixture
+def app(criar_app, arquivos):
+    primario, replica = arquivos
+    with criar_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primario}', 'DATABASE_REPLICA_URI': f'sqlite:///{replica}',
+                    'REPLICA_MAX_ATRASO': 0, 'REPLICA_VERIFICACAO_SEGUNDOS': 0}) as app:
+        yield app
+
+
+@pytest.fixture
+def novo_cliente(app, autenticar):
+    """Cria clientes autenticados sem o cookie ler_primario (o login é uma escrita)."""
+    def criar():
+        client = autenticar(app.test_client())
+        client.delete_cookie(COOKIE_LER_PRIMARIO)
+        return client
+    return criar
+
+
+def _pessoa(client, nome, identificacao):
+    response = client.post('/pessoas', json={"nome": nome, "numero_identificacao": identificacao})
+    assert response.status_code == 201
+    return response.get_json()["id"]
+
+
+def test_leituras_na_replica_escritas_no_primario(arquivos, novo_cliente):
+    client = novo_cliente()
+    pessoa_id = _pessoa(client, "Ana Réplica", "REP-1")
+    replicar(*arquivos)
+
+    leitor = novo_cliente()
+    replicar(*arquivos) # Registro/login do leitor também alteram o primário
+    response = leitor.get('/pessoas')
+    assert response.headers[CABECALHO_ORIGEM] == 'replica'
+    assert [pessoa["id"] for pessoa in response.get_json()] == [pessoa_id]
+
+    # Escritas vão ao primário, mesmo numa rota que também lê
+    response = leitor.post('/pessoas', json={"nome": "Bruno Primário", "numero_identificacao": "REP-2"})
+    assert response.status_code == 201
+    assert response.headers[CABECALHO_ORIGEM] == 'primario'
+    with sqlite3.connect(arquivos[1]) as replica:
+        assert replica.execute("SELECT COUNT(*) FROM pessoas").fetchone()[0] == 1
+
+
+def test_resposta_em_streaming(app, arquivos, novo_cliente):
+    # Os cabeçalhos saem antes de o gerador ler: X-Database precisa refletir de onde o corpo será lido
+    @app.route('/teste/streaming')
+    def streaming():
+        def gerar():
+            for nome in db.session.scalars(select(Pessoa.nome)):
+                yield nome + "\n"
+        return Response(stream_with_context(gerar()))
+
+    client = novo_cliente()
+    _pessoa(client, "Gil Streaming", "REP-7")
+    leitor = novo_cliente()
+    replicar(*arquivos)
+    response = leitor.get('/teste/streaming')
+    assert response.get_data(as_text=True) == "Gil Streaming\n"
+    assert response.headers[CABECALHO_ORIGEM] == 'replica'
+
+    response = leitor.get('/teste/streaming', headers={CABECALHO_LER_PRIMARIO: '1'})
+    assert response.get_data(as_text=True) == "Gil Streaming\n"
+    assert response.headers[CABECALHO_ORIGEM] == 'primario'
+
+
+def test_ler_as_proprias_escritas(arquivos, novo_cliente):
+    client = novo_cliente()
+    replicar(*arquivos)
+    assert client.get('/pessoas').headers[CABECALHO_ORIGEM] == 'replica'
+
+    response = client.post('/pessoas', json={"nome": "Carla", "numero_identificacao": "REP-3"})
+    assert COOKIE_LER_PRIMARIO in response.headers['Set-Cookie']
+    assert 'Max-Age=5' in response.headers['Set-Cookie']
+    replicar(*arquivos) # Mesmo com a réplica em dia, o cookie manda ao primário
+    response = client.get('/pessoas')
+    assert response.headers[CABECALHO_ORIGEM] == 'primario'
+    assert [pessoa["nome"] for pessoa in response.get_json()] == ["Carla"]
+
+    # Sem cookies, o cabeçalho tem o mesmo efeito
+    outro = novo_cliente()
+    replicar(*arquivos)
+    assert outro.get('/pessoas').headers[CABECALHO_ORIGEM] == 'replica'
+    assert outro.get('/pessoas', headers={CABECALHO_LER_PRIMARIO: '1'}).headers[CABECALHO_ORIGEM] == 'primario'
+
+
+def test_replica_atrasada_volta_ao_primario(arquivos, novo_cliente):
+    client = novo_cliente()
+    replicar(*arquivos)
+    _pessoa(client, "Davi", "REP-4")
+
+    leitor = novo_cliente() # Sem o cookie de quem escreveu; a réplica não tem Davi nem o leitor
+    response = leitor.get('/pessoas')
+    assert response.headers[CABECALHO_ORIGEM] == 'primario'
+    assert [pessoa["nome"] for pessoa in response.get_json()] == ["Davi"]
+    assert b'replica_disponivel 0' in leitor.get('/metrics').get_data()
+
+    replicar(*arquivos)
+    assert leitor.get('/pessoas').headers[CABECALHO_ORIGEM] == 'replica'
+    metricas = leitor.get('/metrics').get_data()
+    assert b'replica_disponivel 1' in metricas and b'replica_atraso_alteracoes 0' in metricas
+
+
+def test_replica_ausente(arquivos, novo_cliente):
+    client = novo_cliente()
+    _pessoa(client, "Eva", "REP-5")
+    leitor = novo_cliente()
+
+    response = leitor.get('/pessoas')
+    assert response.status_code == 200
+    assert response.headers[CABECALHO_ORIGEM] == 'primario'
+    assert b'replica_atraso_alteracoes -1' in leitor.get('/metrics').get_data()
+    # Aberta somente leitura: a réplica ausente não é criada vazia
+    with pytest.raises(FileNotFoundError):
+        open(arquivos[1])
+
+
+def test_caches_alimentados_pelo_primario(app, arquivos, novo_cliente):
+    client = novo_cliente()
+    pessoa_id = _pessoa(client, "Fábio", "REP-6")
+    replicar(*arquivos) # A réplica não terá a vacinação abaixo
+    vacinas = {v["nome"]: v["id"] for v in client.get('/vacinas').get_json()}
+    client.post('/vacinacoes', json={"pessoa_id": pessoa_id, "vacina_id": vacinas["BCG"], "dose_aplicada": "Dose Unica",
+                                     "data_aplicacao": "2024-01-10T08:00:00"})
+    app.config['REPLICA_MAX_ATRASO'] = 100 # Réplica atrasada, mas dentro do tolerado
+
+    leitor = novo_cliente()
+    with contar_sql() as instrucoes:
+        response = leitor.get(f'/pessoas/{pessoa_id}/cartao_vacinacao')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [v["nome_vacina"] for v in response.get_json()["vacinas_registradas"]] == ["BCG"]
+    assert instrucoes
+    # O cartão em cache também está correto para quem lê da réplica depois
+    assert [v["nome_vacina"] for v in leitor.get(f'/pessoas/{pessoa_id}/cartao_vacinacao').get_json()["vacinas_registradas"]] == ["BCG"]
+    # POST /cartoes/batch é rota de leitura: não marca o cliente para ler do primário
+    assert COOKIE_LER_PRIMARIO not in leitor.post('/cartoes/batch', json={"pessoa_ids": [pessoa_id]}).headers.get('Set-Cookie', '')
+
+
+def test_sem_replica_configurada(tmp_path):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'unico.db'}"})
+    with app.app_context():
+        init_db()
+        response = app.test_client().get('/vacinas')
+        assert CABECALHO_ORIGEM not in response.headers
+        assert 'replica' not in db.engines
+        assert db.session.execute(text("SELECT 1")).scalar() == 1
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,36 @@
+# cartao_vacinacao_api/tests/test_sqlite_concorrencia.py
+# Banco SQLite em arquivo com a configuração de database.py: PRAGMAs aplicados a cada conexão
+# e escritores e leitores em paralelo sem "database is locked".
+import pytest
+from sqlalchemy import text
+
+from benchmarks.bench_sqlite import executar_concorrencia, resumir
+from benchmarks.dados import criar_app_benchmark
+from models import db
+
+
+@pytest.fixture(scope='module')
+def app_arquivo(tmp_path_factory):
+    banco = 'sqlite:///' + str(tmp_path_factory.mktemp('sqlite') / 'concorrencia.db')
+    app, pessoa_ids = criar_app_benchmark(banco, 200, sem_vacinacoes=3, config={'TESTING': True, 'CARTAO_CACHE_MAX': 0})
+    yield app, pessoa_ids
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_pragmas_aplicados(app_arquivo):
+    app, _ = app_arquivo
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1 # NORMAL
+        assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == app.config['SQLITE_BUSY_TIMEOUT']
+        assert db.session.execute(text("PRAGMA cache_size")).scalar() == app.config['SQLITE_CACHE_SIZE']
+        assert db.engine.pool.size() == app.config['DB_POOL_SIZE']
+
+
+def test_escritores_e_leitores_concorrentes(app_arquivo):
+    app, pessoa_ids = app_arquivo
+    amostras, duracao = executar_concorrencia(app, pessoa_ids, pessoa_ids[-3:], escritores=3, leitores=3, operacoes=20)
+    resumo = resumir(amostras, duracao)
+    assert resumo['escrita']['requisicoes'] == 60 and resumo['escrita']['erros'] == 0, amostras['escrita']
+    assert resumo['leitura']['requisicoes'] == 60 and resumo['leitura']['erros'] == 0, amostras['leitura']
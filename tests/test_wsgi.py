@@ -0,0 +1,48 @@
+# cartao_vacinacao_api/tests/test_wsgi.py
+# Aquecimento dos workers de produção (wsgi.aquecer): conexões do pool abertas e catálogo carregado
+# antes da primeira requisição.
+from app import create_app
+from benchmarks.dados import criar_app_benchmark
+from metrics import contar_sql
+from models import db
+from wsgi import aquecer
+
+
+def test_aquecer_worker(tmp_path):
+    banco = f"sqlite:///{tmp_path / 'wsgi.db'}"
+    app, _ = criar_app_benchmark(banco, 20)
+    with app.app_context():
+        db.engine.dispose()
+
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': banco})
+    aquecer(app, conexoes=3)
+    with app.app_context():
+        assert db.engine.pool.checkedin() == 3
+        with contar_sql() as instrucoes:
+            assert app.test_client().get('/vacinas').status_code == 200
+        # Catálogo já carregado: só a posição das vacinas no feed de alterações
+        assert len(instrucoes) == 1 and 'FROM alteracoes' in instrucoes[0], instrucoes
+        db.engine.dispose()
+
+
+def test_aquecer_sem_tabelas(tmp_path):
+    # Banco ainda sem `flask init-db`: o worker sobe mesmo assim
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'vazio.db'}"})
+    aquecer(app)
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_aquecer_com_replica_ausente(tmp_path):
+    banco = f"sqlite:///{tmp_path / 'wsgi.db'}"
+    app, _ = criar_app_benchmark(banco, 5)
+    with app.app_context():
+        db.engine.dispose()
+
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': banco,
+                      'DATABASE_REPLICA_URI': f"sqlite:///{tmp_path / 'ausente.db'}"})
+    aquecer(app, conexoes=2)
+    with app.app_context():
+        assert db.engine.pool.checkedin() == 2
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,50 @@
+# cartao_vacinacao_api/wsgi.py
+# Ponto de entrada WSGI para produção: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Com o app pré-carregado (WEB_PRELOAD=1, padrão), este módulo é importado uma vez no processo
+# mestre: o app, os assets minificados e os templates compilados ficam em páginas de memória
+# compartilhadas com os workers (copy-on-write). Nada aqui abre conexões com o banco; cada worker
+# abre as suas em aquecer(), chamado pelo gunicorn.conf.py antes de o worker aceitar requisições.
+from flask import render_template
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import create_app
+from catalog import catalogo_vacinas
+from models import db
+
+app = create_app()
+
+# Compilados no mestre, herdados já prontos pelos workers
+TEMPLATES = ('index.html',)
+for nome in TEMPLATES:
+    app.jinja_env.get_template(nome)
+
+
+def aquecer(app=app, conexoes=1):
+    """
+    Prepara um worker recém-criado antes do primeiro request: descarta conexões herdadas do mestre
+    (sem fechá-las, pois o mestre é o dono), abre `conexoes` conexões do pool (cada uma recebe os
+    PRAGMAs do SQLite), carrega o catálogo de vacinas e renderiza os templates uma vez.
+    """
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            engine.dispose(close=False)
+            try:
+                abertas = [engine.connect() for _ in range(min(conexoes, app.config['DB_POOL_SIZE']))]
+            except SQLAlchemyError as e: # Ex.: réplica ainda ausente; as leituras vão ao primário até ela aparecer
+                app.logger.warning("Aquecimento: sem conexão com o bind %s: %s", bind or 'primário', e)
+                continue
+            for conexao in abertas:
+                conexao.execute(text("SELECT 1"))
+                conexao.close() # Volta ao pool, já aberta
+        try:
+            catalogo_vacinas.lista()
+        except SQLAlchemyError as e: # Ex.: banco ainda sem `flask init-db`; o worker sobe e carrega na primeira requisição
+            db.session.rollback()
+            app.logger.warning("Aquecimento: catálogo de vacinas não carregado: %s", e)
+        finally:
+            db.session.remove()
+    with app.test_request_context('/'):
+        for nome in TEMPLATES:
+            render_template(nome)